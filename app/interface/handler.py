@@ -3,7 +3,7 @@ from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 from fastapi.routing import APIRouter
 from mangum import Mangum
-from icav2_wes_api.api import analysis
+from icav2_wes_api.api import analysis, analysis_stats
 
 openapi_url = "/schema/openapi.json"
 app = FastAPI(
@@ -13,6 +13,7 @@ app = FastAPI(
 )
 router = APIRouter(prefix="/api/v1")
 router.include_router(analysis.router, prefix="/analysis")
+router.include_router(analysis_stats.router)
 app.include_router(router)
 
 def custom_openapi():
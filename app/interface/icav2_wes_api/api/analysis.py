@@ -13,13 +13,16 @@ This is the list of routes available
 from datetime import datetime, timezone
 from os import environ
 from textwrap import dedent
-from typing import Annotated
+from typing import Annotated, Optional, Union
 
-from fastapi import Depends, Query, Body
+from fastapi import Depends, Query, Body, Header
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter, HTTPException
 from dyntastic import A, DoesNotExist
 
+# Layer imports
 from fastapi_tools import QueryPagination
+from icav2_wes_manager_tools.tracing import span
 
 # Model imports
 from ..models.analysis import (
@@ -27,7 +30,9 @@ from ..models.analysis import (
     Icav2WesAnalysisQueryPaginatedResponse,
     Icav2WesAnalysisCreate,
     Icav2WesAnalysisResponse,
-    Icav2WesAnalysisPatch
+    Icav2WesAnalysisPatch,
+    STATUS_TIME_ATTRIBUTES,
+    POST_PROCESSING_STAGE_TIME_ATTRIBUTES
 )
 from ..models.analysis_query import AnalysisQueryParameters
 from ..globals import (
@@ -39,6 +44,20 @@ from ..utils import (
     launch_sfn
 )
 from ..events.events import put_icav2_wes_analysis_update_event
+from ..stats.stats import record_status_transition
+from ..export.export import (
+    iter_icav2_wes_analyses,
+    iter_ndjson_chunks,
+    is_ndjson_accepted,
+    NDJSON_MEDIA_TYPE,
+    NDJSON_STREAM_CHUNK_SIZE
+)
+from ..scheduler.scheduler import (
+    is_scheduler_enabled,
+    release_pending_analyses,
+    REQUEST_PATH_MAX_RELEASES,
+    release_analysis_slot
+)
 
 router = APIRouter()
 
@@ -57,13 +76,34 @@ def get_pagination_params(
 # - Get /analysis endpoint for a given fastq list row id
 @router.get(
     "/",
-    tags=["query"]
+    tags=["query"],
+    description=dedent("""
+    List the analyses.
+    Use the header 'Accept: application/x-ndjson' to instead stream every matching analysis
+    as newline delimited JSON (one analysis per line, without pagination).
+    """),
+    # The response is either the paginated JSON or the NDJSON stream, so we document both
+    response_model=None,
+    responses={
+        200: {
+            "model": Icav2WesAnalysisQueryPaginatedResponse,
+            "content": {
+                NDJSON_MEDIA_TYPE: {
+                    "schema": {
+                        "type": "string",
+                        "description": "One analysis (as in the results of the paginated response) per line"
+                    }
+                }
+            },
+        }
+    }
 )
 async def get_icav2_wes_analysis_list(
         analysis_query_parameters: AnalysisQueryParameters = Depends(),
         # Pagination options
         pagination: QueryPagination = Depends(get_pagination_params),
-) -> Icav2WesAnalysisQueryPaginatedResponse:
+        accept: Optional[str] = Header(None, include_in_schema=False),
+) -> Union[Icav2WesAnalysisQueryPaginatedResponse, StreamingResponse]:
     # Job Query Parameters include start time, end time and status
     # We also include the fastq id as a parameter however this is not indexed and so needs to be filtered manually
     # As such we will first filter by the indexed parameters and then filter by the fastq id
@@ -84,34 +124,33 @@ async def get_icav2_wes_analysis_list(
 
     # To query or to scan, depends on if the status is provided
     # Since the status is indexed to the jobs
-    if analysis_query_parameters.status_list is not None:
-        # - start_time
-        # - end_time
-        # With the following query parameters
-        # - created_before
-        # - created_after
-        # - completed_before
-        # - completed_after
-        icav2_wes_analysis_list = []
-        for status_iter in analysis_query_parameters.status_list:
-            icav2_wes_analysis_list += list(Icav2WesAnalysisData.query(
-                A.status == status_iter,
-                filter_condition=filter_expression,
-                index="status-index",
-                load_full_item=True
-            ))
-    else:
-        icav2_wes_analysis_list = list(Icav2WesAnalysisData.scan(
-            filter_condition=filter_expression,
-            load_full_item=True
-        ))
+    # Without a status, the whole table is scanned in parallel
+    # The name is then filtered manually
+    # - start_time
+    # - end_time
+    # With the following query parameters
+    # - created_before
+    # - created_after
+    # - completed_before
+    # - completed_after
+    icav2_wes_analysis_iter = iter_icav2_wes_analyses(
+        status_list=analysis_query_parameters.status_list,
+        name_list=analysis_query_parameters.name_list
+    )
 
-    # Now check if the fastq_id_list is in the query parameters
-    if analysis_query_parameters.name_list is not None:
-        icav2_wes_analysis_list = list(filter(
-            lambda analysis_iter_: analysis_iter_.name in analysis_query_parameters.name_list,
-            icav2_wes_analysis_list
-        ))
+    # Stream the rows as they come off the query / scan, rather than building the whole page
+    if is_ndjson_accepted(accept):
+        return StreamingResponse(
+            iter_ndjson_chunks(icav2_wes_analysis_iter, chunk_size=NDJSON_STREAM_CHUNK_SIZE),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
+    icav2_wes_analysis_list = list(icav2_wes_analysis_iter)
+
+    # The parallel scan returns the segments in whichever order they complete,
+    # so we sort by id to keep the pages stable between requests
+    if analysis_query_parameters.status_list is None:
+        icav2_wes_analysis_list.sort(key=lambda analysis_iter_: analysis_iter_.id)
 
     return Icav2WesAnalysisQueryPaginatedResponse.from_results_list(
         results=list(map(
@@ -156,14 +195,17 @@ async def create_job(analysis_obj: Icav2WesAnalysisCreate) -> Icav2WesAnalysisRe
     # First convert the CreateFastqListRow to a FastqListRow
     analysis_obj = Icav2WesAnalysisData.from_dict(**dict(analysis_obj.model_dump(by_alias=True)))
 
-    if (
-            # Check if the analysis name already exists in the database
-            len(list(Icav2WesAnalysisData.query(
-                A.name == analysis_obj.name,
-                index="name-index",
-                load_full_item=True
-            ))) > 0
-    ):
+    # The analysis id is the trace id for the whole submission and state change pipeline
+    trace_id = analysis_obj.id
+
+    # Check if the analysis name already exists in the database
+    with span("dynamodb.query", trace_id, index="name-index"):
+        existing_analysis_list = list(Icav2WesAnalysisData.query(
+            A.name == analysis_obj.name,
+            index="name-index",
+            load_full_item=True
+        ))
+    if len(existing_analysis_list) > 0:
         raise HTTPException(
         status_code=409,
         detail=f"Analysis with name '{analysis_obj.name}' already exists"
@@ -171,30 +213,54 @@ async def create_job(analysis_obj: Icav2WesAnalysisCreate) -> Icav2WesAnalysisRe
 
 
     # Can't solve every race condition, but this is pretty close to immediate
-    analysis_obj.save()
+    with span("dynamodb.save", trace_id):
+        analysis_obj.save()
+    with span("dynamodb.record_status_transition", trace_id):
+        record_status_transition(analysis_obj, analysis_obj.status)
+
+    # With the scheduler enabled, the analysis is left as 'PENDING'
+    # and is launched by the scheduler once there is capacity
+    if is_scheduler_enabled():
+        # Create the dictionary
+        analysis_dict = analysis_obj.to_dict()
+
+        # Generate a create event
+        with span("events.put_events", trace_id):
+            put_icav2_wes_analysis_update_event(analysis_dict)
+
+        # Try and release the next pending analysis straight away (usually this one when there is capacity)
+        # the scheduler lambda releases the rest
+        with span("scheduler.release_pending_analyses", trace_id):
+            released_analysis_ids = release_pending_analyses(max_releases=REQUEST_PATH_MAX_RELEASES)
+        if analysis_obj.id in released_analysis_ids:
+            analysis_dict = Icav2WesAnalysisData.get(analysis_obj.id, consistent_read=True).to_dict()
+
+        return analysis_dict
 
     # Now launch the job - we skip the 'PENDING' phase for now
     # Instead we go straight to 'SUBMITTED'
     analysis_obj.start_time = datetime.now(timezone.utc)
-    # Now launch the job - we skip the 'PENDING' phase for now
-    # Instead we go straight to 'SUBMITTED'
-    analysis_obj.start_time = datetime.now(timezone.utc)
-    analysis_obj.steps_launch_execution_arn = launch_sfn(
-        sfn_name=environ[ICAV2_WES_LAUNCH_STATE_MACHINE_ARN_ENV_VAR],
-        sfn_input=dict(analysis_obj.to_dict())
-    )
+    with span("sfn.start_execution", trace_id, stateMachine="launchIcav2Analysis"):
+        analysis_obj.steps_launch_execution_arn = launch_sfn(
+            sfn_name=environ[ICAV2_WES_LAUNCH_STATE_MACHINE_ARN_ENV_VAR],
+            sfn_input=dict(analysis_obj.to_dict())
+        )
 
     # Save the analysis (so two events dont get created)
     analysis_obj.status = 'SUBMITTED'
 
     # Re-save the object
-    analysis_obj.save()
+    with span("dynamodb.save", trace_id):
+        analysis_obj.save()
+    with span("dynamodb.record_status_transition", trace_id):
+        record_status_transition(analysis_obj, analysis_obj.status, 'PENDING')
 
     # Create the dictionary
     analysis_dict = analysis_obj.to_dict()
 
     # Generate a create event
-    put_icav2_wes_analysis_update_event(analysis_dict)
+    with span("events.put_events", trace_id):
+        put_icav2_wes_analysis_update_event(analysis_dict)
 
     # Return the fastq as a dictionary
     return analysis_dict
@@ -212,7 +278,10 @@ async def update_job(
         analysis_change_object: Annotated[Icav2WesAnalysisPatch, Body()] = get_default_job_patch_entry()
 ) -> Icav2WesAnalysisResponse:
     # Validate the status
-    if analysis_change_object.status not in ['RUNNABLE', 'STARTING', 'RUNNING', 'SUCCEEDED', 'FAILED', 'ABORTED']:
+    if (
+            analysis_change_object.status is not None and
+            analysis_change_object.status not in ['RUNNABLE', 'STARTING', 'RUNNING', 'SUCCEEDED', 'FAILED', 'ABORTED']
+    ):
         raise HTTPException(
             status_code=400,
             detail="Invalid status provided, "
@@ -220,21 +289,68 @@ async def update_job(
         )
     try:
         # Get the analysis object from the database
-        analysis_obj = Icav2WesAnalysisData.get(analysis_id)
+        with span("dynamodb.get", analysis_id):
+            analysis_obj = Icav2WesAnalysisData.get(analysis_id)
+
+        # Metadata only update, the state hasn't changed so we don't generate an event
+        # We only set the provided attributes so we don't overwrite a concurrent status update
+        if analysis_change_object.status is None:
+            update_actions = []
+            if analysis_change_object.pipelineLanguage is not None:
+                update_actions.append(A.pipeline_language.set(analysis_change_object.pipelineLanguage))
+            if analysis_change_object.icav2EndTime is not None:
+                update_actions.append(A.icav2_end_time.set(analysis_change_object.icav2EndTime))
+            if analysis_change_object.postProcessingStage is not None:
+                update_actions.append(
+                    getattr(
+                        A, POST_PROCESSING_STAGE_TIME_ATTRIBUTES[analysis_change_object.postProcessingStage]
+                    ).set(datetime.now(timezone.utc))
+                )
+            if (
+                    analysis_obj.icav2_analysis_id is None and
+                    analysis_change_object.icav2AnalysisId is not None
+            ):
+                update_actions.append(A.icav2_analysis_id.set(analysis_change_object.icav2AnalysisId))
+            if len(update_actions) > 0:
+                with span("dynamodb.update", analysis_id):
+                    analysis_obj.update(*update_actions)
+            return analysis_obj.to_dict()
 
         # Assign the new status
+        previous_status = analysis_obj.status
         analysis_obj.status = analysis_change_object.status
 
+        # Timestamp the first transition to each status
+        if (
+                analysis_obj.status in STATUS_TIME_ATTRIBUTES and
+                getattr(analysis_obj, STATUS_TIME_ATTRIBUTES[analysis_obj.status]) is None
+        ):
+            setattr(analysis_obj, STATUS_TIME_ATTRIBUTES[analysis_obj.status], datetime.now(timezone.utc))
+
         # Add in end time if the job is in a terminal state
         if analysis_obj.status in ['SUCCEEDED', 'FAILED', 'ABORTED']:
             analysis_obj.end_time = datetime.now(timezone.utc)
 
+        # Add the ICAv2 end time and post-processing stage timestamps if provided
+        if analysis_change_object.icav2EndTime is not None:
+            analysis_obj.icav2_end_time = analysis_change_object.icav2EndTime
+        if analysis_change_object.postProcessingStage is not None:
+            setattr(
+                analysis_obj,
+                POST_PROCESSING_STAGE_TIME_ATTRIBUTES[analysis_change_object.postProcessingStage],
+                datetime.now(timezone.utc)
+            )
+
         # Add error type and error message uri if provided
         if analysis_change_object.errorType is not None:
             analysis_obj.error_type = analysis_change_object.errorType
         if analysis_change_object.errorMessageUri is not None:
             analysis_obj.error_message_uri = analysis_change_object.errorMessageUri
 
+        # Add the pipeline language if provided
+        if analysis_change_object.pipelineLanguage is not None:
+            analysis_obj.pipeline_language = analysis_change_object.pipelineLanguage
+
         # Update the ICAv2 analysis id if provided and not already set
         if (
                 analysis_obj.icav2_analysis_id is None and
@@ -243,11 +359,22 @@ async def update_job(
             analysis_obj.icav2_analysis_id = analysis_change_object.icav2AnalysisId
 
         # Save the object
-        analysis_obj.save()
+        with span("dynamodb.save", analysis_id, status=analysis_obj.status):
+            analysis_obj.save()
+        with span("dynamodb.record_status_transition", analysis_id, status=analysis_obj.status):
+            record_status_transition(analysis_obj, analysis_obj.status, previous_status)
 
         # Create the response, and event
         analysis_dict = analysis_obj.to_dict()
-        put_icav2_wes_analysis_update_event(analysis_dict)
+        with span("events.put_events", analysis_id, status=analysis_obj.status):
+            put_icav2_wes_analysis_update_event(analysis_dict)
+
+        # Give back the scheduler slot and let the next analyses through
+        if is_scheduler_enabled() and analysis_obj.status in ['SUCCEEDED', 'FAILED', 'ABORTED']:
+            with span("scheduler.release_analysis_slot", analysis_id):
+                if release_analysis_slot(analysis_obj.id):
+                    release_pending_analyses(max_releases=REQUEST_PATH_MAX_RELEASES)
+
         return analysis_dict
     except DoesNotExist as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -266,6 +393,19 @@ async def abort_job(analysis_id: str = Depends(sanitise_icav2_wes_analysis_orcab
     try:
         analysis_obj = Icav2WesAnalysisData.get(analysis_id)
 
+        # Analyses still waiting on the scheduler have nothing to abort on ICAv2
+        if analysis_obj.status == 'PENDING':
+            # Conditional on the status, so we don't race a release from the scheduler
+            analysis_obj.update(
+                A.status.set('ABORTED'),
+                A.end_time.set(datetime.now(timezone.utc)),
+                condition=A.status == 'PENDING',
+                require_condition=True
+            )
+            record_status_transition(analysis_obj, 'ABORTED', 'PENDING')
+            put_icav2_wes_analysis_update_event(analysis_obj.to_dict())
+            return f"Aborted pending analysis {analysis_obj.id}"
+
         if not analysis_obj.status in ['STARTING', 'RUNNING']:
             raise AssertionError("Job is not in a state that can be aborted")
 
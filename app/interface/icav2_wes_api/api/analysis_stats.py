@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+"""
+Aggregate routes for the API V1 analysis endpoint
+
+These are registered on the analysis collection (i.e. /analysis:timings) rather than under it,
+so they don't collide with the /analysis/{analysis_id} routes
+"""
+
+# Standard imports
+from collections import defaultdict
+from datetime import date
+from textwrap import dedent
+from typing import Dict, List, Literal, Optional
+
+from fastapi import Depends, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.routing import APIRouter
+from dyntastic import A
+
+# Model imports
+from ..models.analysis import Icav2WesAnalysisData
+from ..models.analysis_query import AnalysisQueryParameters
+from ..models.analysis_stats import (
+    DurationStats,
+    PipelineTimingsSummary,
+    AnalysisTimingsSummaryResponse,
+    AnalysisStatsResponse
+)
+from ..models.analysis_export import AnalysisExportResponse
+from ..stats.stats import get_status_counts
+from ..export.export import (
+    ExportCompressionType,
+    iter_icav2_wes_analyses,
+    iter_ndjson_chunks,
+    export_analyses_to_s3,
+    get_export_file_name,
+    get_export_content_type
+)
+
+router = APIRouter()
+
+
+@router.get(
+    "/analysis:stats",
+    tags=["query"],
+    description=dedent("""
+    Get the number of analyses in each status.
+    Use the pipelineId and / or submissionDate (UTC) parameters to only count the analyses of a pipeline,
+    or those submitted on a given day.
+    Counts are kept as each analysis changes status, and are rebuilt daily from the analysis table.
+    """)
+)
+async def get_icav2_wes_analysis_stats(
+        pipeline_id: Optional[str] = Query(
+            None,
+            alias="pipelineId",
+            description="The ICAv2 pipeline id to count the analyses of"
+        ),
+        submission_date: Optional[date] = Query(
+            None,
+            alias="submissionDate",
+            description="The date (UTC) to count the analyses submitted on"
+        ),
+) -> AnalysisStatsResponse:
+    status_counts = get_status_counts(
+        pipeline_id=pipeline_id,
+        submission_date=submission_date.isoformat() if submission_date is not None else None
+    )
+
+    return AnalysisStatsResponse(
+        pipeline_id=pipeline_id,
+        submission_date=submission_date,
+        total=sum(status_counts.values()),
+        status_counts=status_counts
+    ).model_dump(by_alias=True, exclude_none=True)
+
+
+@router.get(
+    "/analysis:timings",
+    tags=["query"],
+    description=dedent("""
+    Get the p50 / p95 of each analysis phase duration (in seconds), per pipeline id.
+    By default only SUCCEEDED analyses are included, use the status / status[] parameters to change this.
+    """)
+)
+async def get_icav2_wes_analysis_timings_summary(
+        analysis_query_parameters: AnalysisQueryParameters = Depends(),
+        pipeline_id: Optional[str] = Query(
+            None,
+            alias="pipelineId",
+            description="The ICAv2 pipeline id to summarise, defaults to all pipelines"
+        ),
+) -> AnalysisTimingsSummaryResponse:
+    # Query each status on the status index
+    icav2_wes_analysis_list: List[Icav2WesAnalysisData] = []
+    for status_iter in (analysis_query_parameters.status_list or ['SUCCEEDED']):
+        icav2_wes_analysis_list += list(Icav2WesAnalysisData.query(
+            A.status == status_iter,
+            index="status-index",
+            load_full_item=True
+        ))
+
+    # Now check if the name_list is in the query parameters
+    if analysis_query_parameters.name_list is not None:
+        icav2_wes_analysis_list = list(filter(
+            lambda analysis_iter_: analysis_iter_.name in analysis_query_parameters.name_list,
+            icav2_wes_analysis_list
+        ))
+
+    # Collect the durations of each analysis by pipeline id
+    analysis_count_by_pipeline: Dict[str, int] = defaultdict(int)
+    durations_by_pipeline: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    for analysis_iter_ in icav2_wes_analysis_list:
+        pipeline_id_iter_ = analysis_iter_.get_pipeline_id()
+        if pipeline_id_iter_ is None or (pipeline_id is not None and pipeline_id_iter_ != pipeline_id):
+            continue
+        analysis_count_by_pipeline[pipeline_id_iter_] += 1
+        for duration_name_iter_, duration_iter_ in analysis_iter_.get_timings().durations.items():
+            durations_by_pipeline[pipeline_id_iter_][duration_name_iter_].append(duration_iter_)
+
+    return AnalysisTimingsSummaryResponse(
+        results=[
+            PipelineTimingsSummary(
+                pipeline_id=pipeline_id_iter_,
+                analysis_count=analysis_count_iter_,
+                durations={
+                    duration_name_iter_: DurationStats.from_values(duration_list_iter_)
+                    for duration_name_iter_, duration_list_iter_ in durations_by_pipeline[pipeline_id_iter_].items()
+                }
+            )
+            for pipeline_id_iter_, analysis_count_iter_ in sorted(analysis_count_by_pipeline.items())
+        ]
+    ).model_dump(by_alias=True)
+
+
+@router.get(
+    "/analysis:export",
+    tags=["query"],
+    description=dedent("""
+    Export the analyses as newline delimited JSON (one analysis per line), optionally gzipped.
+    Use the status / status[] and name / name[] parameters to filter the analyses,
+    without a status the whole table is scanned in parallel.
+    By default the export is returned in the response, use destination=s3 for large exports,
+    the export is then written to the artefacts bucket and a presigned url is returned.
+    """)
+)
+async def export_icav2_wes_analyses(
+        analysis_query_parameters: AnalysisQueryParameters = Depends(),
+        compression: ExportCompressionType = Query(
+            'none',
+            description="Compress the export with gzip"
+        ),
+        destination: Literal['response', 's3'] = Query(
+            'response',
+            description="Return the export in the response, or write it to S3 and return a presigned url"
+        ),
+) -> Response:
+    analyses = iter_icav2_wes_analyses(
+        status_list=analysis_query_parameters.status_list,
+        name_list=analysis_query_parameters.name_list
+    )
+
+    if destination == 's3':
+        return JSONResponse(
+            content=AnalysisExportResponse(
+                **export_analyses_to_s3(analyses, compression)
+            ).model_dump(by_alias=True)
+        )
+
+    return StreamingResponse(
+        iter_ndjson_chunks(analyses, compression),
+        media_type=get_export_content_type(compression),
+        headers={
+            "Content-Disposition": f'attachment; filename="{get_export_file_name(compression)}"'
+        }
+    )
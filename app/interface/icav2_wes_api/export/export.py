@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+"""
+Analysis exports, backing the /analysis:export endpoint
+
+Analyses are read lazily (a status index query per status, or a parallel scan of the whole table)
+and written out as newline delimited JSON (optionally gzipped), one analysis per line,
+so the whole table is never held in memory.
+
+Exports are either streamed back in the response, or uploaded to the artefacts bucket with a multipart upload
+and returned as a presigned url.
+The API lambda (through mangum) buffers the response body, so large exports should be sent to S3.
+"""
+
+# Standard imports
+import json
+import logging
+import zlib
+from datetime import datetime, timezone
+from os import environ
+from typing import Dict, Iterable, Iterator, List, Literal, Optional
+
+from dyntastic import A
+
+# Local imports
+from ..globals import (
+    DYNAMODB_ICAV2_WES_ANALYSIS_TABLE_NAME_ENV_VAR,
+    PARALLEL_SCAN_SEGMENTS_ENV_VAR,
+    DEFAULT_PARALLEL_SCAN_SEGMENTS,
+    S3_ANALYSIS_ARTEFACTS_BUCKET_NAME_ENV_VAR,
+    S3_ANALYSIS_EXPORTS_PREFIX_ENV_VAR,
+    EXPORT_PRESIGNED_URL_EXPIRY_SECONDS,
+)
+from ..models import AnalysisStatusType
+from ..models.analysis import Icav2WesAnalysisData
+from ..utils import (
+    get_ulid,
+    get_s3_client,
+    parallel_scan,
+    deserialize_dynamodb_item
+)
+
+# Set logging
+logger = logging.getLogger(__name__)
+
+# Globals
+ExportCompressionType = Literal['none', 'gzip']
+NDJSON_CHUNK_SIZE = 64 * 1024  # 64 KiB
+NDJSON_STREAM_CHUNK_SIZE = 4 * 1024  # 4 KiB, flush the first rows sooner when streaming to a client
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MULTIPART_UPLOAD_PART_SIZE = 8 * 1024 * 1024  # Every part but the last must be at least 5 MiB
+
+
+def get_parallel_scan_segments() -> int:
+    return int(environ.get(PARALLEL_SCAN_SEGMENTS_ENV_VAR, DEFAULT_PARALLEL_SCAN_SEGMENTS))
+
+
+def iter_icav2_wes_analyses(
+        status_list: Optional[List[AnalysisStatusType]] = None,
+        name_list: Optional[List[str]] = None
+) -> Iterator[Icav2WesAnalysisData]:
+    """
+    Iterate over the analyses, querying the status index if we have a status, otherwise scanning the table in parallel
+    """
+    if status_list is not None:
+        analysis_iter = (
+            analysis_iter_
+            for status_iter_ in status_list
+            for analysis_iter_ in Icav2WesAnalysisData.query(
+                A.status == status_iter_,
+                index="status-index",
+                load_full_item=True
+            )
+        )
+    else:
+        analysis_iter = (
+            Icav2WesAnalysisData(**deserialize_dynamodb_item(item_iter_))
+            for item_iter_ in parallel_scan(
+                environ[DYNAMODB_ICAV2_WES_ANALYSIS_TABLE_NAME_ENV_VAR],
+                get_parallel_scan_segments()
+            )
+        )
+
+    # The name is not indexed (other than by the name index), so we filter these manually
+    for analysis_iter_ in analysis_iter:
+        if name_list is not None and analysis_iter_.name not in name_list:
+            continue
+        yield analysis_iter_
+
+
+def iter_ndjson_chunks(
+        analyses: Iterable[Icav2WesAnalysisData],
+        compression: ExportCompressionType = 'none',
+        chunk_size: int = NDJSON_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Serialise the analyses as newline delimited JSON, in chunks of roughly chunk_size bytes
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compression == 'gzip' else None
+
+    buffer = bytearray()
+    for analysis_iter_ in analyses:
+        line = (json.dumps(analysis_iter_.to_dict(), separators=(",", ":")) + "\n").encode("utf-8")
+        buffer.extend(compressor.compress(line) if compressor is not None else line)
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if compressor is not None:
+        buffer.extend(compressor.flush())
+    if len(buffer) > 0:
+        yield bytes(buffer)
+
+
+def upload_chunks_to_s3(chunks: Iterable[bytes], bucket: str, key: str, content_type: str):
+    """
+    Upload the chunks with a multipart upload, buffering at most MULTIPART_UPLOAD_PART_SIZE bytes at a time
+    """
+    s3_client = get_s3_client()
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=bucket,
+        Key=key,
+        ContentType=content_type,
+    )['UploadId']
+
+    parts = []
+
+    def _upload_part(body: bytes):
+        part_number = len(parts) + 1
+        parts.append({
+            "PartNumber": part_number,
+            "ETag": s3_client.upload_part(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=body
+            )['ETag']
+        })
+
+    try:
+        buffer = bytearray()
+        for chunk_iter_ in chunks:
+            buffer.extend(chunk_iter_)
+            if len(buffer) >= MULTIPART_UPLOAD_PART_SIZE:
+                _upload_part(bytes(buffer))
+                buffer.clear()
+
+        # The last part may be smaller than the minimum part size (and empty if there were no analyses)
+        if len(buffer) > 0 or len(parts) == 0:
+            _upload_part(bytes(buffer))
+
+        s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts}
+        )
+    except Exception:
+        s3_client.abort_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id
+        )
+        raise
+
+
+def get_export_file_name(compression: ExportCompressionType) -> str:
+    return (
+        f"icav2-wes-analyses-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.ndjson" +
+        (".gz" if compression == 'gzip' else "")
+    )
+
+
+def get_export_content_type(compression: ExportCompressionType) -> str:
+    return "application/gzip" if compression == 'gzip' else NDJSON_MEDIA_TYPE
+
+
+def get_accepted_media_types(accept: str) -> Dict[str, float]:
+    """
+    Parse an Accept header into the quality of each media type, i.e.
+    'application/x-ndjson;q=0.9, application/json' -> {'application/x-ndjson': 0.9, 'application/json': 1.0}
+    """
+    accepted_media_types: Dict[str, float] = {}
+    for media_range_iter_ in accept.split(","):
+        media_type, *params = map(str.strip, media_range_iter_.split(";"))
+        if not media_type:
+            continue
+        quality = 1.0
+        for param_iter_ in params:
+            key, _, value = param_iter_.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+        accepted_media_types[media_type.lower()] = quality
+    return accepted_media_types
+
+
+def is_ndjson_accepted(accept: Optional[str]) -> bool:
+    """
+    True if the client explicitly accepts NDJSON, and does not prefer JSON over it
+    """
+    if accept is None:
+        return False
+    accepted_media_types = get_accepted_media_types(accept)
+    ndjson_quality = accepted_media_types.get(NDJSON_MEDIA_TYPE, 0.0)
+    return ndjson_quality > 0 and ndjson_quality >= accepted_media_types.get("application/json", 0.0)
+
+
+def export_analyses_to_s3(analyses: Iterable[Icav2WesAnalysisData], compression: ExportCompressionType) -> dict:
+    """
+    Export the analyses to the artefacts bucket, returns the export uri, a presigned url and the analysis count
+    """
+    bucket = environ[S3_ANALYSIS_ARTEFACTS_BUCKET_NAME_ENV_VAR]
+    key = f"{environ[S3_ANALYSIS_EXPORTS_PREFIX_ENV_VAR].rstrip('/')}/{get_ulid()}/{get_export_file_name(compression)}"
+
+    analysis_count = 0
+
+    def _count(analyses_iter: Iterable[Icav2WesAnalysisData]) -> Iterator[Icav2WesAnalysisData]:
+        nonlocal analysis_count
+        for analysis_iter_ in analyses_iter:
+            analysis_count += 1
+            yield analysis_iter_
+
+    upload_chunks_to_s3(
+        iter_ndjson_chunks(_count(analyses), compression),
+        bucket=bucket,
+        key=key,
+        content_type=get_export_content_type(compression)
+    )
+
+    return {
+        "exportUri": f"s3://{bucket}/{key}",
+        "presignedUrl": get_s3_client().generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket, "Key": key},
+            ExpiresIn=EXPORT_PRESIGNED_URL_EXPIRY_SECONDS
+        ),
+        "analysisCount": analysis_count,
+    }
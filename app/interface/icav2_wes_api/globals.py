@@ -31,6 +31,47 @@ DYNAMODB_HOST_ENV_VAR = "DYNAMODB_HOST"
 ICAV2_WES_LAUNCH_STATE_MACHINE_ARN_ENV_VAR = "ICAV2_WES_LAUNCH_STATE_MACHINE_ARN"
 ICAV2_WES_ABORT_MACHINE_ARN_ENV_VAR = "ICAV2_WES_ABORT_STATE_MACHINE_ARN"
 
+# Scheduler Env vars
+SCHEDULER_ENABLED_ENV_VAR = "SCHEDULER_ENABLED"
+DYNAMODB_ICAV2_WES_SCHEDULER_TABLE_NAME_ENV_VAR = "DYNAMODB_ICAV2_WES_SCHEDULER_TABLE_NAME"
+SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT_ENV_VAR = "SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT"
+SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE_ENV_VAR = "SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE"
+SCHEDULER_LAUNCH_RATE_PER_SECOND_ENV_VAR = "SCHEDULER_LAUNCH_RATE_PER_SECOND"
+SCHEDULER_LAUNCH_BURST_ENV_VAR = "SCHEDULER_LAUNCH_BURST"
+
+# Scheduler defaults
+DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT = 100
+DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE = 50
+DEFAULT_SCHEDULER_LAUNCH_RATE_PER_SECOND = 0.5
+DEFAULT_SCHEDULER_LAUNCH_BURST = 5
+
+# Stats Env vars
+DYNAMODB_ICAV2_WES_STATS_TABLE_NAME_ENV_VAR = "DYNAMODB_ICAV2_WES_STATS_TABLE_NAME"
+STATS_RECONCILIATION_SCAN_SEGMENTS_ENV_VAR = "STATS_RECONCILIATION_SCAN_SEGMENTS"
+
+# Stats defaults
+DEFAULT_STATS_RECONCILIATION_SCAN_SEGMENTS = 8
+
+# Parallel scan Env vars
+PARALLEL_SCAN_SEGMENTS_ENV_VAR = "PARALLEL_SCAN_SEGMENTS"
+DEFAULT_PARALLEL_SCAN_SEGMENTS = 8
+
+# Export Env vars
+S3_ANALYSIS_ARTEFACTS_BUCKET_NAME_ENV_VAR = "S3_ANALYSIS_ARTEFACTS_BUCKET_NAME"
+S3_ANALYSIS_EXPORTS_PREFIX_ENV_VAR = "S3_ANALYSIS_EXPORTS_PREFIX"
+
+# Export defaults
+EXPORT_PRESIGNED_URL_EXPIRY_SECONDS = 60 * 60  # One hour
+
+# Priority classes, read from the 'priority' tag, lower values are released first
+PRIORITY_TAG_KEY = "priority"
+PRIORITY_CLASSES = {
+    "high": 0,
+    "normal": 1,
+    "low": 2,
+}
+DEFAULT_PRIORITY_CLASS = "normal"
+
 
 # Event enums
 class AnalysisEventDetailTypeEnum(Enum):
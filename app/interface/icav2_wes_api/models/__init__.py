@@ -24,3 +24,9 @@ ErrorType = Literal[
     'AnalysisFailure',
     'AnalysisOutputFileCorruption',
 ]
+
+# Post-processing stages, recorded against the analysis as they complete
+PostProcessingStageType = Literal[
+    'FILEMANAGER_SYNCED',
+    'CORRUPTION_CHECKED',
+]
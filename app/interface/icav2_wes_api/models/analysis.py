@@ -16,7 +16,7 @@ from typing import (
 )
 from os import environ
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 
 # API imports
 from dyntastic import Dyntastic
@@ -32,7 +32,61 @@ from ..utils import (
     to_camel, get_ulid,
     get_icav2_wes_analysis_endpoint_url
 )
-from . import AnalysisStatusType, AnalysisStorageSizeType, ErrorType
+from . import AnalysisStatusType, AnalysisStorageSizeType, ErrorType, PostProcessingStageType
+
+# The phases of an analysis, in order, and the attribute each phase timestamp is stored under
+# submissionTime is the POST, startTime is the launch (SUBMITTED), icav2EndTime is the ICAv2 terminal state
+# and endTime is once post-processing is complete and the terminal status is set
+ANALYSIS_PHASE_TIME_ATTRIBUTES = [
+    'submission_time',
+    'start_time',
+    'runnable_time',
+    'starting_time',
+    'running_time',
+    'icav2_end_time',
+    'filemanager_synced_time',
+    'corruption_checked_time',
+    'end_time',
+]
+
+# The status transitions we timestamp in update_job, the terminal statuses set the end time
+STATUS_TIME_ATTRIBUTES: Dict[AnalysisStatusType, str] = {
+    'RUNNABLE': 'runnable_time',
+    'STARTING': 'starting_time',
+    'RUNNING': 'running_time',
+}
+
+# The post-processing stages we timestamp in update_job
+POST_PROCESSING_STAGE_TIME_ATTRIBUTES: Dict[PostProcessingStageType, str] = {
+    'FILEMANAGER_SYNCED': 'filemanager_synced_time',
+    'CORRUPTION_CHECKED': 'corruption_checked_time',
+}
+
+# Duration name: (from phase, to phase)
+ANALYSIS_PHASE_DURATIONS = {
+    # Waiting on the scheduler
+    'pending': ('submission_time', 'start_time'),
+    # Launch step function, up until ICAv2 has accepted the analysis
+    'launch': ('start_time', 'runnable_time'),
+    # Queued on ICAv2
+    'icav2Queue': ('runnable_time', 'starting_time'),
+    # ICAv2 startup, i.e. provisioning and staging the inputs
+    'icav2Startup': ('starting_time', 'running_time'),
+    'running': ('running_time', 'icav2_end_time'),
+    'filemanagerSync': ('icav2_end_time', 'filemanager_synced_time'),
+    'corruptionCheck': ('filemanager_synced_time', 'corruption_checked_time'),
+    'postProcessing': ('icav2_end_time', 'end_time'),
+    'total': ('submission_time', 'end_time'),
+}
+
+
+def to_utc(timestamp: Optional[datetime]) -> Optional[datetime]:
+    """
+    The submission time is stored without a timezone, all other timestamps are in UTC
+    """
+    if timestamp is None or timestamp.tzinfo is not None:
+        return timestamp
+    return timestamp.replace(tzinfo=timezone.utc)
 
 
 class EngineParameters(BaseModel):
@@ -84,6 +138,49 @@ class EngineParameters(BaseModel):
     )
 
 
+class Icav2WesAnalysisTimings(BaseModel):
+    """
+    The per-phase timestamps of an analysis, and the durations (in seconds) between them
+    A phase timestamp is missing if the analysis skipped (or has not yet reached) the phase
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        validate_by_name=True,
+        validate_by_alias=True
+    )
+
+    submission_time: Optional[datetime] = None
+    start_time: Optional[datetime] = None
+    runnable_time: Optional[datetime] = None
+    starting_time: Optional[datetime] = None
+    running_time: Optional[datetime] = None
+    icav2_end_time: Optional[datetime] = None
+    filemanager_synced_time: Optional[datetime] = None
+    corruption_checked_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    durations: Dict[str, float] = Field(default_factory=dict)
+
+    @classmethod
+    def from_phase_times(cls, **phase_times: Optional[datetime]) -> 'Icav2WesAnalysisTimings':
+        phase_times = {
+            attribute_iter_: to_utc(phase_times.get(attribute_iter_))
+            for attribute_iter_ in ANALYSIS_PHASE_TIME_ATTRIBUTES
+        }
+
+        durations = {}
+        for duration_name_iter_, (from_phase_iter_, to_phase_iter_) in ANALYSIS_PHASE_DURATIONS.items():
+            if phase_times[from_phase_iter_] is None or phase_times[to_phase_iter_] is None:
+                continue
+            durations[duration_name_iter_] = round(
+                (phase_times[to_phase_iter_] - phase_times[from_phase_iter_]).total_seconds(), 3
+            )
+
+        return cls(
+            **phase_times,
+            durations=durations
+        )
+
+
 class Icav2WesAnalysisBase(BaseModel):
     name: str
     inputs: Dict[str, Any]
@@ -106,6 +203,7 @@ class Icav2WesAnalysisWithId(Icav2WesAnalysisBase, Icav2WesAnalysisOrcabusId):
     submission_time: datetime = Field(default_factory=datetime.now)
     steps_launch_execution_arn: Optional[str] = None
     icav2_analysis_id: Optional[str] = None
+    pipeline_language: Optional[str] = None
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
     error_type: Optional[ErrorType] = None
@@ -119,6 +217,8 @@ class Icav2WesAnalysisResponse(Icav2WesAnalysisWithId):
         validate_by_alias=True,
     )
 
+    timings: Optional[Icav2WesAnalysisTimings] = None
+
     # Set the model_dump method response
     if typing.TYPE_CHECKING:
         def model_dump(self, **kwargs) -> Self:
@@ -141,9 +241,15 @@ class Icav2WesAnalysisCreate(Icav2WesAnalysisBase):
 
 class Icav2WesAnalysisPatch(BaseModel):
     icav2AnalysisId: Optional[str] = None
-    status: AnalysisStatusType
+    # Status may be omitted for metadata only updates
+    status: Optional[AnalysisStatusType] = None
+    pipelineLanguage: Optional[str] = None
     errorType: Optional[ErrorType] = None
     errorMessageUri: Optional[str] = None
+    # Timing metadata
+    # The time the analysis reached a terminal state on ICAv2, before post-processing
+    icav2EndTime: Optional[datetime] = None
+    postProcessingStage: Optional[PostProcessingStageType] = None
 
 
 class Icav2WesAnalysisData(Icav2WesAnalysisWithId, Dyntastic):
@@ -158,6 +264,14 @@ class Icav2WesAnalysisData(Icav2WesAnalysisWithId, Dyntastic):
     tags: str
     engine_parameters: str
 
+    # Phase timestamps, returned in the timings block rather than as top-level attributes
+    runnable_time: Optional[datetime] = None
+    starting_time: Optional[datetime] = None
+    running_time: Optional[datetime] = None
+    icav2_end_time: Optional[datetime] = None
+    filemanager_synced_time: Optional[datetime] = None
+    corruption_checked_time: Optional[datetime] = None
+
     @classmethod
     def from_dict(cls, **kwargs: Dict[str, Any]) -> 'Icav2WesAnalysisData':
         """
@@ -165,6 +279,8 @@ class Icav2WesAnalysisData(Icav2WesAnalysisWithId, Dyntastic):
         :param data: The dictionary to convert
         :return: An Icav2WesAnalysisData object
         """
+        # Timings are derived, not stored
+        kwargs.pop('timings', None)
         return cls(
             inputs=json.dumps(jsonable_encoder(kwargs.pop('inputs'))),
             engine_parameters=json.dumps(jsonable_encoder(kwargs.pop('engine_parameters'))),
@@ -187,14 +303,19 @@ class Icav2WesAnalysisData(Icav2WesAnalysisWithId, Dyntastic):
         model_dump = self.model_dump(
             by_alias=True,
             exclude_none=True,
-            exclude_unset=True
+            exclude_unset=True,
+            exclude=set(POST_PROCESSING_STAGE_TIME_ATTRIBUTES.values()).union(
+                STATUS_TIME_ATTRIBUTES.values(),
+                ['icav2_end_time']
+            )
         )
 
-        # Update the model dump with the inputs, tags and engine parameters
+        # Update the model dump with the inputs, tags, engine parameters and timings
         model_dump.update({
             'inputs': inputs,
             'tags': tags,
-            'engineParameters': engine_parameters
+            'engineParameters': engine_parameters,
+            'timings': self.get_timings(),
         })
 
         return jsonable_encoder(
@@ -203,6 +324,15 @@ class Icav2WesAnalysisData(Icav2WesAnalysisWithId, Dyntastic):
             ).model_dump(by_alias=True)
         )
 
+    def get_timings(self) -> Icav2WesAnalysisTimings:
+        return Icav2WesAnalysisTimings.from_phase_times(**{
+            attribute_iter_: getattr(self, attribute_iter_)
+            for attribute_iter_ in ANALYSIS_PHASE_TIME_ATTRIBUTES
+        })
+
+    def get_pipeline_id(self) -> Optional[str]:
+        return json.loads(self.engine_parameters).get('pipelineId') if self.engine_parameters else None
+
 
 class Icav2WesAnalysisQueryPaginatedResponse(QueryPaginatedResponse):
     """
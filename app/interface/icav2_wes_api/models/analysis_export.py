@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+"""
+Analysis export models, used by the analysis export route
+"""
+
+# API imports
+from pydantic import BaseModel, ConfigDict
+
+# Local imports
+from ..utils import to_camel
+
+
+class AnalysisExportResponse(BaseModel):
+    """
+    An export written to the artefacts bucket
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        validate_by_name=True,
+        validate_by_alias=True
+    )
+
+    export_uri: str
+    presigned_url: str
+    analysis_count: int
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+"""
+Aggregate analysis models, used by the analysis stats routes
+"""
+
+# Standard imports
+import math
+from datetime import date
+from typing import Dict, List, Optional
+
+# API imports
+from pydantic import BaseModel, ConfigDict
+
+# Local imports
+from ..utils import to_camel
+
+
+def get_percentile(sorted_values: List[float], percentile: float) -> float:
+    """
+    Nearest-rank percentile of a sorted (non-empty) list
+    """
+    return sorted_values[max(math.ceil(percentile / 100 * len(sorted_values)) - 1, 0)]
+
+
+class DurationStats(BaseModel):
+    """
+    The distribution (in seconds) of a single phase duration
+    """
+    count: int
+    p50: float
+    p95: float
+
+    @classmethod
+    def from_values(cls, values: List[float]) -> 'DurationStats':
+        sorted_values = sorted(values)
+        return cls(
+            count=len(sorted_values),
+            p50=get_percentile(sorted_values, 50),
+            p95=get_percentile(sorted_values, 95),
+        )
+
+
+class PipelineTimingsSummary(BaseModel):
+    """
+    The phase duration distributions of the analyses of a single pipeline
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        validate_by_name=True,
+        validate_by_alias=True
+    )
+
+    pipeline_id: str
+    analysis_count: int
+    durations: Dict[str, DurationStats]
+
+
+class AnalysisTimingsSummaryResponse(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        validate_by_name=True,
+        validate_by_alias=True
+    )
+
+    results: List[PipelineTimingsSummary]
+
+
+class AnalysisStatsResponse(BaseModel):
+    """
+    The number of analyses in each status, optionally for a single pipeline and / or submission date
+    """
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        validate_by_name=True,
+        validate_by_alias=True
+    )
+
+    pipeline_id: Optional[str] = None
+    submission_date: Optional[date] = None
+    total: int
+    status_counts: Dict[str, int]
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+
+"""
+Launch scheduler (admission control) for ICAv2 analyses
+
+When the scheduler is enabled, new analyses are placed in the PENDING state rather than launched straight away.
+Analyses are then released (moved to SUBMITTED and the launch step function started) when
+
+* The project of the analysis has fewer than the maximum number of active analyses
+* The pipeline of the analysis has fewer than the maximum number of active analyses
+* A token is available in the ICAv2 launch token bucket
+
+Pending analyses are released in order of their priority class (from the 'priority' tag) and then submission time.
+
+All scheduler state lives in the scheduler table
+
+* PROJECT#<project_id> / PIPELINE#<pipeline_id> - the number of active (released, non-terminal) analyses
+* LEASE#<analysis_id> - the slot held by an active analysis, deleted when the analysis reaches a terminal state
+* TOKEN_BUCKET#ICAV2_LAUNCH - the token bucket used to rate limit launches against the ICAv2 API
+
+The analysis status transition, the slot counters, the lease and the stats counters are written in a single transaction,
+so concurrent scheduler invocations (API lambda and the periodic scheduler lambda) cannot over-commit a slot.
+"""
+
+# Standard imports
+import json
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal
+from os import environ
+from time import sleep, time
+from typing import Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from dyntastic import A
+
+# Layer imports
+from icav2_wes_manager_tools.tracing import record_elapsed_since, span
+
+# Local imports
+from ..globals import (
+    SCHEDULER_ENABLED_ENV_VAR,
+    DYNAMODB_ICAV2_WES_ANALYSIS_TABLE_NAME_ENV_VAR,
+    DYNAMODB_ICAV2_WES_SCHEDULER_TABLE_NAME_ENV_VAR,
+    SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT_ENV_VAR,
+    SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE_ENV_VAR,
+    SCHEDULER_LAUNCH_RATE_PER_SECOND_ENV_VAR,
+    SCHEDULER_LAUNCH_BURST_ENV_VAR,
+    DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT,
+    DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE,
+    DEFAULT_SCHEDULER_LAUNCH_RATE_PER_SECOND,
+    DEFAULT_SCHEDULER_LAUNCH_BURST,
+    ICAV2_WES_LAUNCH_STATE_MACHINE_ARN_ENV_VAR,
+    PRIORITY_TAG_KEY,
+    PRIORITY_CLASSES,
+    DEFAULT_PRIORITY_CLASS,
+)
+from ..models.analysis import Icav2WesAnalysisData
+from ..utils import get_dynamodb_client, launch_sfn
+from ..events.events import put_icav2_wes_analysis_update_event
+from ..stats.stats import get_status_transition_transact_items
+
+# Set logging
+logger = logging.getLogger(__name__)
+
+# Globals
+TOKEN_BUCKET_ID = "TOKEN_BUCKET#ICAV2_LAUNCH"
+MAX_TOKEN_BUCKET_ATTEMPTS = 3
+# The API only releases a single analysis per request (the slot it has just given back, or the analysis it has just created)
+# the periodic scheduler lambda releases the rest
+REQUEST_PATH_MAX_RELEASES = 1
+# The periodic scheduler lambda keeps waiting on the launch token bucket until this long before its timeout
+SCHEDULER_RUN_TIME_MARGIN_SECONDS = 10
+
+
+def is_scheduler_enabled() -> bool:
+    return environ.get(SCHEDULER_ENABLED_ENV_VAR, "false").lower() == "true"
+
+
+def get_scheduler_table_name() -> str:
+    return environ[DYNAMODB_ICAV2_WES_SCHEDULER_TABLE_NAME_ENV_VAR]
+
+
+def get_max_active_analyses_per_project() -> int:
+    return int(environ.get(
+        SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT_ENV_VAR,
+        DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT
+    ))
+
+
+def get_max_active_analyses_per_pipeline() -> int:
+    return int(environ.get(
+        SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE_ENV_VAR,
+        DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE
+    ))
+
+
+def get_launch_rate_per_second() -> float:
+    return float(environ.get(
+        SCHEDULER_LAUNCH_RATE_PER_SECOND_ENV_VAR,
+        DEFAULT_SCHEDULER_LAUNCH_RATE_PER_SECOND
+    ))
+
+
+def get_launch_burst() -> int:
+    return int(environ.get(
+        SCHEDULER_LAUNCH_BURST_ENV_VAR,
+        DEFAULT_SCHEDULER_LAUNCH_BURST
+    ))
+
+
+def get_priority(analysis_obj: Icav2WesAnalysisData) -> int:
+    """
+    Get the priority of an analysis from the 'priority' tag, unknown classes are treated as 'normal'
+    """
+    tags = json.loads(analysis_obj.tags) if analysis_obj.tags else {}
+    return PRIORITY_CLASSES.get(
+        str(tags.get(PRIORITY_TAG_KEY, DEFAULT_PRIORITY_CLASS)).lower(),
+        PRIORITY_CLASSES[DEFAULT_PRIORITY_CLASS]
+    )
+
+
+def get_project_and_pipeline_id(analysis_obj: Icav2WesAnalysisData) -> Tuple[str, str]:
+    engine_parameters = json.loads(analysis_obj.engine_parameters)
+    return engine_parameters['projectId'], engine_parameters['pipelineId']
+
+
+def acquire_launch_token(wait_until: Optional[float] = None) -> bool:
+    """
+    Take a token from the ICAv2 launch token bucket.
+
+    The bucket is refilled lazily from the time elapsed since the last update,
+    the write is conditional on the last update time so concurrent callers cannot take the same token.
+
+    If the bucket is empty we wait for the next token, as long as it is refilled before wait_until (epoch seconds),
+    otherwise (or if wait_until is not set) we return False.
+    """
+    dynamodb_client = get_dynamodb_client()
+    rate = get_launch_rate_per_second()
+    burst = get_launch_burst()
+
+    attempts = 0
+    while attempts < MAX_TOKEN_BUCKET_ATTEMPTS:
+        item = dynamodb_client.get_item(
+            TableName=get_scheduler_table_name(),
+            Key={"id": {"S": TOKEN_BUCKET_ID}},
+            ConsistentRead=True
+        ).get("Item")
+
+        now = time()
+        if item is None:
+            previous_updated_at = None
+            tokens = float(burst)
+        else:
+            previous_updated_at = item["updated_at"]["N"]
+            tokens = min(
+                float(burst),
+                float(item["tokens"]["N"]) + ((now - float(previous_updated_at)) * rate)
+            )
+
+        if tokens < 1:
+            wait_seconds = (1 - tokens) / rate
+            if wait_until is None or now + wait_seconds > wait_until:
+                return False
+            sleep(wait_seconds)
+            continue
+
+        try:
+            dynamodb_client.put_item(
+                TableName=get_scheduler_table_name(),
+                Item={
+                    "id": {"S": TOKEN_BUCKET_ID},
+                    "tokens": {"N": str(Decimal(tokens - 1).quantize(Decimal("0.0001")))},
+                    "updated_at": {"N": str(Decimal(now).quantize(Decimal("0.0001")))},
+                },
+                **(
+                    {
+                        "ConditionExpression": "attribute_not_exists(id)",
+                    }
+                    if previous_updated_at is None else
+                    {
+                        "ConditionExpression": "updated_at = :previous_updated_at",
+                        "ExpressionAttributeValues": {
+                            ":previous_updated_at": {"N": previous_updated_at},
+                        },
+                    }
+                )
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            # Someone else took a token in the meantime, re-read and try again
+            attempts += 1
+
+    return False
+
+
+def get_active_analyses_count(slot_id: str) -> int:
+    item = get_dynamodb_client().get_item(
+        TableName=get_scheduler_table_name(),
+        Key={"id": {"S": slot_id}},
+        ConsistentRead=True
+    ).get("Item")
+
+    if item is None or "active_analyses" not in item:
+        return 0
+
+    return int(item["active_analyses"]["N"])
+
+
+def is_slot_available(
+        analysis_obj: Icav2WesAnalysisData,
+        active_analyses_counts: Optional[Dict[str, int]] = None
+) -> bool:
+    """
+    Cheap check before we take a launch token, the slot itself is only taken in acquire_analysis_slot.
+    Pass in a dict to reuse the slot counts across the analyses of a single release run
+    """
+    project_id, pipeline_id = get_project_and_pipeline_id(analysis_obj)
+
+    if active_analyses_counts is None:
+        active_analyses_counts = {}
+
+    def _get_count(slot_id: str) -> int:
+        if slot_id not in active_analyses_counts:
+            active_analyses_counts[slot_id] = get_active_analyses_count(slot_id)
+        return active_analyses_counts[slot_id]
+
+    return (
+        _get_count(f"PROJECT#{project_id}") < get_max_active_analyses_per_project() and
+        _get_count(f"PIPELINE#{pipeline_id}") < get_max_active_analyses_per_pipeline()
+    )
+
+
+def acquire_analysis_slot(analysis_obj: Icav2WesAnalysisData) -> bool:
+    """
+    Move an analysis from PENDING to SUBMITTED while taking a project and pipeline slot, and registering the lease.
+    Returns False if the analysis has already been released or if either of the slots are full.
+    """
+    project_id, pipeline_id = get_project_and_pipeline_id(analysis_obj)
+
+    def _increment_slot(slot_id: str, max_active_analyses: int):
+        return {
+            "Update": {
+                "TableName": get_scheduler_table_name(),
+                "Key": {"id": {"S": slot_id}},
+                "UpdateExpression": "ADD active_analyses :one",
+                "ConditionExpression": "attribute_not_exists(active_analyses) OR active_analyses < :max",
+                "ExpressionAttributeValues": {
+                    ":one": {"N": "1"},
+                    ":max": {"N": str(max_active_analyses)},
+                },
+            }
+        }
+
+    try:
+        get_dynamodb_client().transact_write_items(
+            TransactItems=[
+                # Release the analysis
+                {
+                    "Update": {
+                        "TableName": environ[DYNAMODB_ICAV2_WES_ANALYSIS_TABLE_NAME_ENV_VAR],
+                        "Key": {"id": {"S": analysis_obj.id}},
+                        "UpdateExpression": "SET #status = :submitted",
+                        "ConditionExpression": "#status = :pending",
+                        "ExpressionAttributeNames": {"#status": "status"},
+                        "ExpressionAttributeValues": {
+                            ":submitted": {"S": "SUBMITTED"},
+                            ":pending": {"S": "PENDING"},
+                        },
+                    }
+                },
+                # Take the slots
+                _increment_slot(f"PROJECT#{project_id}", get_max_active_analyses_per_project()),
+                _increment_slot(f"PIPELINE#{pipeline_id}", get_max_active_analyses_per_pipeline()),
+                # Register the lease so we know which slots to give back
+                {
+                    "Put": {
+                        "TableName": get_scheduler_table_name(),
+                        "Item": {
+                            "id": {"S": f"LEASE#{analysis_obj.id}"},
+                            "project_id": {"S": project_id},
+                            "pipeline_id": {"S": pipeline_id},
+                            "acquired_at": {"S": datetime.now(timezone.utc).isoformat()},
+                        },
+                        "ConditionExpression": "attribute_not_exists(id)",
+                    }
+                },
+                # Move the analysis between the stats counters
+                *get_status_transition_transact_items(analysis_obj, 'SUBMITTED', 'PENDING'),
+            ]
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        return False
+
+    return True
+
+
+def get_lease(analysis_id: str) -> Optional[Dict]:
+    return get_dynamodb_client().get_item(
+        TableName=get_scheduler_table_name(),
+        Key={"id": {"S": f"LEASE#{analysis_id}"}},
+        ConsistentRead=True
+    ).get("Item")
+
+
+def get_release_slot_transact_items(analysis_id: str, lease: Dict) -> List[Dict]:
+    """
+    Delete the lease and give back the project and pipeline slots it holds
+    """
+    def _decrement_slot(slot_id: str):
+        return {
+            "Update": {
+                "TableName": get_scheduler_table_name(),
+                "Key": {"id": {"S": slot_id}},
+                "UpdateExpression": "ADD active_analyses :minus_one",
+                "ConditionExpression": "active_analyses > :zero",
+                "ExpressionAttributeValues": {
+                    ":minus_one": {"N": "-1"},
+                    ":zero": {"N": "0"},
+                },
+            }
+        }
+
+    return [
+        {
+            "Delete": {
+                "TableName": get_scheduler_table_name(),
+                "Key": {"id": {"S": f"LEASE#{analysis_id}"}},
+                "ConditionExpression": "attribute_exists(id)",
+            }
+        },
+        _decrement_slot(f"PROJECT#{lease['project_id']['S']}"),
+        _decrement_slot(f"PIPELINE#{lease['pipeline_id']['S']}"),
+    ]
+
+
+def release_analysis_slot(analysis_id: str) -> bool:
+    """
+    Give back the project and pipeline slots held by an analysis.
+    Returns False if the analysis does not hold a lease (never scheduled, or already released).
+    """
+    lease = get_lease(analysis_id)
+
+    if lease is None:
+        return False
+
+    try:
+        get_dynamodb_client().transact_write_items(
+            TransactItems=get_release_slot_transact_items(analysis_id, lease)
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        # Lease has already been released
+        return False
+
+    return True
+
+
+def revert_released_analysis(analysis_obj: Icav2WesAnalysisData) -> bool:
+    """
+    Undo acquire_analysis_slot for an analysis whose launch step function could not be started,
+    move the analysis back from SUBMITTED to PENDING so it is picked up by a later release, and give back its slots.
+    The slots are given back in the same transaction, so they are kept if the analysis has since moved on
+    from SUBMITTED (i.e. it did launch), in which case we return False.
+    """
+    lease = get_lease(analysis_obj.id)
+
+    try:
+        get_dynamodb_client().transact_write_items(
+            TransactItems=[
+                {
+                    "Update": {
+                        "TableName": environ[DYNAMODB_ICAV2_WES_ANALYSIS_TABLE_NAME_ENV_VAR],
+                        "Key": {"id": {"S": analysis_obj.id}},
+                        "UpdateExpression": "SET #status = :pending",
+                        "ConditionExpression": "#status = :submitted AND attribute_not_exists(steps_launch_execution_arn)",
+                        "ExpressionAttributeNames": {"#status": "status"},
+                        "ExpressionAttributeValues": {
+                            ":submitted": {"S": "SUBMITTED"},
+                            ":pending": {"S": "PENDING"},
+                        },
+                    }
+                },
+                *get_status_transition_transact_items(analysis_obj, 'PENDING', 'SUBMITTED'),
+                *(get_release_slot_transact_items(analysis_obj.id, lease) if lease is not None else []),
+            ]
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        return False
+
+    return True
+
+
+def launch_released_analysis(analysis_id: str) -> Icav2WesAnalysisData:
+    """
+    Launch the step function for an analysis that has just been moved to SUBMITTED.
+    If the step function cannot be started, the analysis is reverted to PENDING (and its slots given back)
+    before the error is raised.
+    """
+    analysis_obj = Icav2WesAnalysisData.get(analysis_id, consistent_read=True)
+
+    # Time spent waiting on the scheduler
+    record_elapsed_since("scheduler.pending", analysis_id, analysis_obj.submission_time)
+
+    # Only set the launch attributes, the launch step function may already be updating the status
+    start_time = datetime.now(timezone.utc)
+    try:
+        with span("sfn.start_execution", analysis_id, stateMachine="launchIcav2Analysis"):
+            steps_launch_execution_arn = launch_sfn(
+                sfn_name=environ[ICAV2_WES_LAUNCH_STATE_MACHINE_ARN_ENV_VAR],
+                sfn_input=dict(analysis_obj.to_dict())
+            )
+    except Exception:
+        logger.exception(f"Could not launch analysis {analysis_id}, moving it back to PENDING")
+        revert_released_analysis(analysis_obj)
+        raise
+    analysis_obj.update(
+        A.start_time.set(start_time),
+        A.steps_launch_execution_arn.set(steps_launch_execution_arn)
+    )
+
+    with span("events.put_events", analysis_id):
+        put_icav2_wes_analysis_update_event(analysis_obj.to_dict())
+
+    return analysis_obj
+
+
+def get_pending_analyses() -> List[Icav2WesAnalysisData]:
+    """
+    Get the pending analyses, in the order that they should be released
+    """
+    return sorted(
+        Icav2WesAnalysisData.query(
+            A.status == 'PENDING',
+            index="status-index",
+            load_full_item=True
+        ),
+        key=lambda analysis_iter_: (
+            get_priority(analysis_iter_),
+            analysis_iter_.submission_time,
+        )
+    )
+
+
+def release_pending_analyses(max_releases: Optional[int] = None, wait_until: Optional[float] = None) -> List[str]:
+    """
+    Release as many pending analyses as the slots and the launch token bucket allow.
+    Analyses whose project or pipeline is full are skipped so that they do not block analyses behind them.
+    Set wait_until (epoch seconds) to keep releasing at the launch rate until then, rather than stopping
+    once the burst of the token bucket is used up.
+    """
+    released_analysis_ids = []
+    # Slot counts read during this run, so the analyses of a full project / pipeline only cost a single read
+    active_analyses_counts: Dict[str, int] = {}
+
+    for analysis_obj in get_pending_analyses():
+        if max_releases is not None and len(released_analysis_ids) >= max_releases:
+            break
+
+        # Skip analyses whose project or pipeline is full
+        if not is_slot_available(analysis_obj, active_analyses_counts):
+            continue
+
+        # Rate limit launches against the ICAv2 API
+        if not acquire_launch_token(wait_until):
+            logger.info("No ICAv2 launch tokens available, waiting for the next scheduler run")
+            break
+
+        if not acquire_analysis_slot(analysis_obj):
+            # Lost the race for the slot (or the analysis was released elsewhere)
+            # We don't give back the token, rather under-launch than over-launch
+            continue
+
+        # The slot counts of this analysis have changed
+        project_id, pipeline_id = get_project_and_pipeline_id(analysis_obj)
+        active_analyses_counts.pop(f"PROJECT#{project_id}", None)
+        active_analyses_counts.pop(f"PIPELINE#{pipeline_id}", None)
+
+        try:
+            launch_released_analysis(analysis_obj.id)
+        except Exception:
+            # The analysis is back to PENDING, leave the rest for the next scheduler run
+            break
+        released_analysis_ids.append(analysis_obj.id)
+
+    return released_analysis_ids
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+"""
+Analysis counters, backing the /analysis:stats endpoint
+
+Rather than counting the analyses in each status with a scan (or an index query per status),
+we keep a counter item per dimension in the stats table, each with a number attribute per status
+
+* ALL - every analysis
+* PIPELINE#<pipeline_id> - the analyses of a pipeline
+* DAY#<yyyy-mm-dd> - the analyses submitted on a day (UTC)
+* PIPELINE#<pipeline_id>#DAY#<yyyy-mm-dd> - the analyses of a pipeline submitted on a day
+
+A status transition is an ADD of one to the new status and minus one to the previous status,
+on the four counter items of the analysis, in a single transaction.
+So the counts for any combination of pipeline and submission day are a single GetItem.
+
+The counters are not written in the same transaction as the analysis itself (except when the scheduler
+releases an analysis), so may drift if the API lambda fails between the two writes.
+The stats reconciler rebuilds all counter items from a parallel scan of the analysis table.
+"""
+
+# Standard imports
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import chain
+from os import environ
+from typing import Dict, List, Optional, Union
+
+from botocore.exceptions import ClientError
+
+# Local imports
+from ..globals import (
+    DYNAMODB_ICAV2_WES_ANALYSIS_TABLE_NAME_ENV_VAR,
+    DYNAMODB_ICAV2_WES_STATS_TABLE_NAME_ENV_VAR,
+    STATS_RECONCILIATION_SCAN_SEGMENTS_ENV_VAR,
+    DEFAULT_STATS_RECONCILIATION_SCAN_SEGMENTS,
+)
+from ..models import AnalysisStatusType
+from ..models.analysis import Icav2WesAnalysisData
+from ..utils import get_dynamodb_client, parallel_scan
+
+# Set logging
+logger = logging.getLogger(__name__)
+
+# Globals
+ALL_ANALYSES_COUNTER_ID = "ALL"
+STATS_STATUS_LIST: List[AnalysisStatusType] = list(AnalysisStatusType.__args__)
+MAX_BATCH_WRITE_ITEMS = 25
+
+
+def get_stats_table_name() -> str:
+    return environ[DYNAMODB_ICAV2_WES_STATS_TABLE_NAME_ENV_VAR]
+
+
+def get_reconciliation_scan_segments() -> int:
+    return int(environ.get(
+        STATS_RECONCILIATION_SCAN_SEGMENTS_ENV_VAR,
+        DEFAULT_STATS_RECONCILIATION_SCAN_SEGMENTS
+    ))
+
+
+def get_submission_date(submission_time: Union[str, datetime]) -> str:
+    """
+    The submission time is stored without a timezone (UTC on lambda), so we only take the date
+    """
+    if isinstance(submission_time, datetime):
+        return submission_time.date().isoformat()
+    return submission_time[:10]
+
+
+def get_counter_id(pipeline_id: Optional[str] = None, submission_date: Optional[str] = None) -> str:
+    if pipeline_id is None and submission_date is None:
+        return ALL_ANALYSES_COUNTER_ID
+    return "#".join(chain(
+        ["PIPELINE", pipeline_id] if pipeline_id is not None else [],
+        ["DAY", submission_date] if submission_date is not None else [],
+    ))
+
+
+def get_counter_ids(pipeline_id: str, submission_date: str) -> List[str]:
+    """
+    All of the counter items an analysis is counted in
+    """
+    return [
+        get_counter_id(),
+        get_counter_id(pipeline_id=pipeline_id),
+        get_counter_id(submission_date=submission_date),
+        get_counter_id(pipeline_id=pipeline_id, submission_date=submission_date),
+    ]
+
+
+def get_status_transition_transact_items(
+        analysis_obj: Icav2WesAnalysisData,
+        new_status: AnalysisStatusType,
+        previous_status: Optional[AnalysisStatusType] = None
+) -> List[Dict]:
+    """
+    The transaction items to move an analysis from the previous status (None for a new analysis) to the new status.
+    Returned separately so the scheduler can add them to its release transaction.
+    """
+    if previous_status == new_status:
+        return []
+
+    update_expression = "ADD #new_status :one"
+    expression_attribute_names = {"#new_status": new_status}
+    expression_attribute_values = {":one": {"N": "1"}}
+    if previous_status is not None:
+        update_expression += ", #previous_status :minus_one"
+        expression_attribute_names["#previous_status"] = previous_status
+        expression_attribute_values[":minus_one"] = {"N": "-1"}
+
+    return [
+        {
+            "Update": {
+                "TableName": get_stats_table_name(),
+                "Key": {"id": {"S": counter_id_iter_}},
+                "UpdateExpression": update_expression,
+                "ExpressionAttributeNames": expression_attribute_names,
+                "ExpressionAttributeValues": expression_attribute_values,
+            }
+        }
+        for counter_id_iter_ in get_counter_ids(
+            analysis_obj.get_pipeline_id(),
+            get_submission_date(analysis_obj.submission_time)
+        )
+    ]
+
+
+def record_status_transition(
+        analysis_obj: Icav2WesAnalysisData,
+        new_status: AnalysisStatusType,
+        previous_status: Optional[AnalysisStatusType] = None
+):
+    """
+    Move the analysis between the status counters, we never fail the API call on a counter update,
+    the reconciler will fix up any counters we miss
+    """
+    transact_items = get_status_transition_transact_items(analysis_obj, new_status, previous_status)
+    if len(transact_items) == 0:
+        return
+
+    try:
+        get_dynamodb_client().transact_write_items(TransactItems=transact_items)
+    except ClientError as e:
+        logger.warning(
+            f"Could not update the stats counters for {analysis_obj.id} "
+            f"({previous_status} -> {new_status}): {e}"
+        )
+
+
+def get_status_counts(pipeline_id: Optional[str] = None, submission_date: Optional[str] = None) -> Dict[str, int]:
+    """
+    Get the number of analyses in each status, a single read
+    """
+    item = get_dynamodb_client().get_item(
+        TableName=get_stats_table_name(),
+        Key={"id": {"S": get_counter_id(pipeline_id, submission_date)}},
+    ).get("Item", {})
+
+    return {
+        status_iter_: int(item[status_iter_]["N"]) if status_iter_ in item else 0
+        for status_iter_ in STATS_STATUS_LIST
+    }
+
+
+def reconcile_status_counters() -> int:
+    """
+    Rebuild every counter item from a parallel scan of the analysis table.
+
+    Transitions that land between the scan and the write are lost until the next reconciliation.
+    Returns the number of counter items written.
+    """
+    counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for item_iter_ in parallel_scan(
+            environ[DYNAMODB_ICAV2_WES_ANALYSIS_TABLE_NAME_ENV_VAR],
+            get_reconciliation_scan_segments(),
+            ProjectionExpression="#status, submission_time, engine_parameters",
+            ExpressionAttributeNames={"#status": "status"},
+    ):
+        pipeline_id = json.loads(item_iter_["engine_parameters"]["S"]).get("pipelineId")
+        for counter_id_iter_ in get_counter_ids(
+                pipeline_id,
+                get_submission_date(item_iter_["submission_time"]["S"])
+        ):
+            counters[counter_id_iter_][item_iter_["status"]["S"]] += 1
+
+    # Counter items that no longer have any analyses (i.e the analyses were deleted) are zeroed
+    dynamodb_client = get_dynamodb_client()
+    for page_iter_ in dynamodb_client.get_paginator("scan").paginate(
+            TableName=get_stats_table_name(),
+            ProjectionExpression="id",
+    ):
+        for item_iter_ in page_iter_.get("Items", []):
+            if item_iter_["id"]["S"] not in counters:
+                counters[item_iter_["id"]["S"]] = {}
+
+    reconciled_at = datetime.now(timezone.utc).isoformat()
+    put_requests = [
+        {
+            "PutRequest": {
+                "Item": {
+                    "id": {"S": counter_id_iter_},
+                    **{
+                        status_iter_: {"N": str(status_counts_iter_.get(status_iter_, 0))}
+                        for status_iter_ in STATS_STATUS_LIST
+                    },
+                    "reconciled_at": {"S": reconciled_at},
+                }
+            }
+        }
+        for counter_id_iter_, status_counts_iter_ in counters.items()
+    ]
+
+    for batch_start_iter_ in range(0, len(put_requests), MAX_BATCH_WRITE_ITEMS):
+        unprocessed_items = {
+            get_stats_table_name(): put_requests[batch_start_iter_:batch_start_iter_ + MAX_BATCH_WRITE_ITEMS]
+        }
+        while len(unprocessed_items) > 0:
+            unprocessed_items = dynamodb_client.batch_write_item(
+                RequestItems=unprocessed_items
+            ).get("UnprocessedItems", {})
+
+    return len(put_requests)
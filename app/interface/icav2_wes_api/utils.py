@@ -4,9 +4,14 @@
 import json
 import re
 from os import environ
+from queue import Queue, Empty, Full
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
 import ulid
 import boto3
+from boto3.dynamodb.types import TypeDeserializer
 import typing
+from typing import Any, Dict, Iterator, List, Union
 from datetime import datetime
 from pydantic.alias_generators import (
     to_snake as pydantic_to_snake,
@@ -15,7 +20,8 @@ from pydantic.alias_generators import (
 
 from .globals import (
     ORCABUS_ULID_REGEX_MATCH,
-    ICAV2_WES_ANALYSIS_PREFIX
+    ICAV2_WES_ANALYSIS_PREFIX,
+    DYNAMODB_HOST_ENV_VAR
 )
 from .models import AnalysisStatusType
 
@@ -26,6 +32,13 @@ if typing.TYPE_CHECKING:
     from mypy_boto3_stepfunctions import SFNClient
     from mypy_boto3_ssm import SSMClient
     from mypy_boto3_sqs import SQSClient
+    from mypy_boto3_dynamodb import DynamoDBClient
+    from mypy_boto3_s3 import S3Client
+
+# Parallel scan
+# How many pages may be waiting on the consumer, per segment
+PARALLEL_SCAN_QUEUE_PAGES_PER_SEGMENT = 2
+PARALLEL_SCAN_QUEUE_TIMEOUT_SECONDS = 1
 
 
 def get_ulid() -> str:
@@ -115,6 +128,90 @@ def get_sqs_client() -> 'SQSClient':
     return boto3.client('sqs')
 
 
+def get_dynamodb_client() -> 'DynamoDBClient':
+    return boto3.client('dynamodb', endpoint_url=environ.get(DYNAMODB_HOST_ENV_VAR))
+
+
+def get_s3_client() -> 'S3Client':
+    return boto3.client('s3')
+
+
+def deserialize_dynamodb_item(item: Dict[str, Dict]) -> Dict[str, Any]:
+    """
+    Convert a low-level client item ({'id': {'S': 'iwa...'}}) to a plain dictionary
+    """
+    deserializer = TypeDeserializer()
+    return {
+        key_iter_: deserializer.deserialize(value_iter_)
+        for key_iter_, value_iter_ in item.items()
+    }
+
+
+def parallel_scan(table_name: str, total_segments: int, **scan_kwargs) -> Iterator[Dict[str, Dict]]:
+    """
+    Scan a table with a worker thread per segment (DynamoDB Segment / TotalSegments).
+
+    Items are yielded page by page as each segment returns them (so in no particular order),
+    the queue between the workers and the consumer is bounded, so at most a few pages per segment are held in memory.
+    If the consumer stops early (or a segment fails), the remaining workers are stopped.
+    """
+    # Clients aren't safe to create across threads, but are safe to share
+    dynamodb_client = get_dynamodb_client()
+    page_queue: Queue[Union[List[Dict], BaseException, None]] = Queue(
+        maxsize=total_segments * PARALLEL_SCAN_QUEUE_PAGES_PER_SEGMENT
+    )
+    stop_event = Event()
+
+    def _put(queue_item: Union[List[Dict], BaseException, None]):
+        # Don't block forever on a consumer that has gone away
+        while not stop_event.is_set():
+            try:
+                page_queue.put(queue_item, timeout=PARALLEL_SCAN_QUEUE_TIMEOUT_SECONDS)
+                return
+            except Full:
+                continue
+
+    def _scan_segment(segment: int):
+        try:
+            for page_iter_ in dynamodb_client.get_paginator("scan").paginate(
+                    TableName=table_name,
+                    Segment=segment,
+                    TotalSegments=total_segments,
+                    **scan_kwargs
+            ):
+                if stop_event.is_set():
+                    return
+                _put(page_iter_.get("Items", []))
+        except BaseException as e:
+            _put(e)
+        finally:
+            # Segment complete
+            _put(None)
+
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        for segment_iter_ in range(total_segments):
+            executor.submit(_scan_segment, segment_iter_)
+
+        try:
+            completed_segments = 0
+            while completed_segments < total_segments:
+                queue_item = page_queue.get()
+                if queue_item is None:
+                    completed_segments += 1
+                    continue
+                if isinstance(queue_item, BaseException):
+                    raise queue_item
+                yield from queue_item
+        finally:
+            stop_event.set()
+            # Unblock any workers waiting on a full queue
+            while True:
+                try:
+                    page_queue.get_nowait()
+                except Empty:
+                    break
+
+
 def get_icav2_wes_analysis_endpoint_url() -> str:
     return environ.get("ICAV2_WES_BASE_URL") + "/api/v1/analysis/"
 
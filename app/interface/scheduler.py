@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+"""
+Scheduler handler
+
+Runs on a schedule to release any pending analyses that could not be released
+when they were created or when another analysis reached a terminal state
+(i.e. waiting on the ICAv2 launch token bucket).
+"""
+
+# Standard imports
+import logging
+from time import time
+
+# Local imports
+from icav2_wes_api.scheduler.scheduler import (
+    is_scheduler_enabled,
+    release_pending_analyses,
+    SCHEDULER_RUN_TIME_MARGIN_SECONDS
+)
+
+# Set logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def handler(event, context):
+    if not is_scheduler_enabled():
+        logger.info("Scheduler is not enabled, nothing to release")
+        return {
+            "releasedAnalysisIdList": []
+        }
+
+    # Release at the launch rate for the rest of this run, rather than just the burst of the token bucket,
+    # so a backlog drains at the configured rate
+    released_analysis_ids = release_pending_analyses(
+        wait_until=time() + (context.get_remaining_time_in_millis() / 1000) - SCHEDULER_RUN_TIME_MARGIN_SECONDS
+    )
+
+    logger.info(f"Released {len(released_analysis_ids)} pending analyses")
+
+    return {
+        "releasedAnalysisIdList": released_analysis_ids
+    }
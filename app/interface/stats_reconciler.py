@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+"""
+Stats reconciler handler
+
+Runs on a schedule to rebuild the analysis status counters (behind the /analysis:stats endpoint)
+from a parallel scan of the analysis table, fixing any drift from counter updates that were missed.
+"""
+
+# Standard imports
+import logging
+
+# Local imports
+from icav2_wes_api.stats.stats import reconcile_status_counters
+
+# Set logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def handler(event, context):
+    counter_item_count = reconcile_status_counters()
+
+    logger.info(f"Reconciled {counter_item_count} stats counter items")
+
+    return {
+        "counterItemCount": counter_item_count
+    }
@@ -2,18 +2,179 @@
 
 """
 Add portal run id attributes from the filemanager
+
+By default we crawl the whole output prefix and then patch the portal run id attribute onto 'prefix/*'.
+
+In partitioned mode, we instead split the output prefix into sub-prefixes (one per top-level folder or file
+in the ICAv2 output folder listing), and crawl and patch each sub-prefix concurrently (MAX_CONCURRENT_PARTITIONS).
+
+Each completed sub-prefix is checkpointed in the cache table under the checkpoint id
+(the step function passes one per attempt), so if a chunk fails we raise a PartitionedAttributesError
+once the other chunks are done, and the retry only redoes the failed chunks.
 """
 
 # Standard imports
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+from os import environ
+from typing import List, Optional, Tuple
 from urllib.parse import urlparse
 from pathlib import Path
+import logging
+
+import boto3
+
+# Wrapica imports
+from wrapica.project_data import (
+    convert_uri_to_project_data_obj,
+    list_project_data_non_recursively
+)
 
 # Layer imports
+from icav2_tools import set_icav2_env_vars
 from orcabus_api_tools.filemanager import (
     file_manager_patch_request,
     crawl_filemanager_sync
 )
 from orcabus_api_tools.filemanager.globals import S3_LIST_ENDPOINT
+from icav2_wes_manager_tools.tracing import span
+
+if typing.TYPE_CHECKING:
+    from mypy_boto3_dynamodb import DynamoDBClient
+
+# Set logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Globals
+CACHE_DATABASE_NAME_ENV_VAR = "CACHE_DATABASE_NAME"
+MAX_CONCURRENT_PARTITIONS_ENV_VAR = "MAX_CONCURRENT_PARTITIONS"
+DEFAULT_MAX_CONCURRENT_PARTITIONS = 8
+SECONDS_PER_DAY = (60 * 60 * 24)  # 60 seconds per min * 60 minutes per hour * 24 hours per day
+
+# (crawl prefix, patch key)
+PartitionType = Tuple[str, str]
+
+
+class PartitionedAttributesError(Exception):
+    """
+    One or more sub-prefixes could not be crawled or patched
+    """
+    pass
+
+
+def get_dynamodb_client() -> 'DynamoDBClient':
+    return boto3.client('dynamodb')
+
+
+def get_max_concurrent_partitions() -> int:
+    return int(environ.get(MAX_CONCURRENT_PARTITIONS_ENV_VAR, DEFAULT_MAX_CONCURRENT_PARTITIONS))
+
+
+def add_portal_run_id_attributes(
+        bucket: str,
+        crawl_prefix: str,
+        patch_key: str,
+        portal_run_id: str,
+        trace_id: Optional[str] = None
+):
+    # Sync filemanager at prefix
+    with span("filemanager.crawl_sync", trace_id, prefix=crawl_prefix):
+        crawl_filemanager_sync(
+            bucket=bucket,
+            prefix=crawl_prefix
+        )
+
+    # Add the portal run id attribute
+    with span("filemanager.patch_attributes", trace_id, prefix=crawl_prefix):
+        file_manager_patch_request(
+            endpoint=S3_LIST_ENDPOINT,
+            params={
+                "bucket": bucket,
+                "key": patch_key,
+            },
+            json_data=[
+                {
+                    'op': 'add',
+                    'path': '/portalRunId',
+                    'value': portal_run_id
+                }
+            ]
+        )
+
+
+def get_partitions(output_uri: str, output_prefix: str) -> List[PartitionType]:
+    """
+    Split the output prefix by the top-level folders and files in the icav2 output folder
+    """
+    output_folder_obj = convert_uri_to_project_data_obj(output_uri.rstrip('/') + '/')
+
+    partitions = []
+    for project_data_iter_ in list_project_data_non_recursively(
+            project_id=output_folder_obj.project_id,
+            parent_folder_id=output_folder_obj.data.id,
+    ):
+        sub_prefix = f"{output_prefix.rstrip('/')}/{project_data_iter_.data.details.name}"
+        if project_data_iter_.data.details.data_type == 'FOLDER':
+            partitions.append((sub_prefix + '/', sub_prefix + '/*'))
+        else:
+            partitions.append((sub_prefix, sub_prefix))
+
+    return partitions
+
+
+def get_checkpoint_item_key(checkpoint_id: str, crawl_prefix: str) -> typing.Dict:
+    return {
+        "id": {"S": f"PORTAL_RUN_ID_ATTRIBUTES#{checkpoint_id}#{crawl_prefix}"}
+    }
+
+
+def is_checkpointed(dynamodb_client: 'DynamoDBClient', checkpoint_id: Optional[str], crawl_prefix: str) -> bool:
+    if checkpoint_id is None:
+        return False
+    return "Item" in dynamodb_client.get_item(
+        TableName=environ[CACHE_DATABASE_NAME_ENV_VAR],
+        Key=get_checkpoint_item_key(checkpoint_id, crawl_prefix),
+    )
+
+
+def put_checkpoint(dynamodb_client: 'DynamoDBClient', checkpoint_id: Optional[str], crawl_prefix: str):
+    if checkpoint_id is None:
+        return
+    dynamodb_client.put_item(
+        TableName=environ[CACHE_DATABASE_NAME_ENV_VAR],
+        Item={
+            **get_checkpoint_item_key(checkpoint_id, crawl_prefix),
+            "ttl": {"N": str(int(datetime.now(UTC).timestamp()) + SECONDS_PER_DAY)},
+        }
+    )
+
+
+def add_partition_attributes(
+        dynamodb_client: 'DynamoDBClient',
+        bucket: str,
+        partition: PartitionType,
+        portal_run_id: str,
+        checkpoint_id: Optional[str],
+        trace_id: Optional[str] = None
+) -> bool:
+    """
+    Crawl and patch a single sub-prefix, returns False if the sub-prefix failed
+
+    The dynamodb client is created once by the handler and shared by the workers
+    (boto3 clients are thread safe, creating them from the default session is not)
+    """
+    crawl_prefix, patch_key = partition
+    try:
+        if is_checkpointed(dynamodb_client, checkpoint_id, crawl_prefix):
+            return True
+        add_portal_run_id_attributes(bucket, crawl_prefix, patch_key, portal_run_id, trace_id)
+        put_checkpoint(dynamodb_client, checkpoint_id, crawl_prefix)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not add the portal run id attributes for s3://{bucket}/{crawl_prefix}: {e}")
+        return False
 
 
 def handler(event, context):
@@ -26,6 +187,9 @@ def handler(event, context):
 
     output_uri = event.get("outputUri")
     portal_run_id = event.get("portalRunId")
+    partitioned = event.get("partitioned", False)
+    checkpoint_id = event.get("checkpointId")
+    trace_id = event.get("traceId")
 
     # Get the output uri and key
     output_uri_parsed = urlparse(output_uri)
@@ -36,24 +200,43 @@ def handler(event, context):
     if not Path(output_prefix).name == portal_run_id:
         raise ValueError(f"The output uri {output_uri} does not end with the portal run id {portal_run_id}")
 
-    # Sync filemanager at prefix
-    crawl_filemanager_sync(
-        bucket=output_bucket,
-        prefix=output_prefix
-    )
+    if not partitioned:
+        add_portal_run_id_attributes(
+            bucket=output_bucket,
+            crawl_prefix=output_prefix,
+            patch_key=f"{output_prefix.rstrip('/')}/*",
+            portal_run_id=portal_run_id,
+            trace_id=trace_id
+        )
+        return
 
-    # Add the portal run id attribute to the output uri
-    file_manager_patch_request(
-        endpoint=S3_LIST_ENDPOINT,
-        params={
-            "bucket": output_bucket,
-            "key": f"{output_prefix.rstrip('/')}/*",
-        },
-        json_data=[
-            {
-                'op': 'add',
-                'path': '/portalRunId',
-                'value': portal_run_id
-            }
-        ]
-    )
+    # Set icav2 env vars
+    set_icav2_env_vars()
+
+    with span("icav2.list_output_partitions", trace_id):
+        partitions = get_partitions(output_uri, output_prefix)
+    if len(partitions) == 0:
+        return
+
+    dynamodb_client = get_dynamodb_client()
+
+    with ThreadPoolExecutor(
+            max_workers=min(len(partitions), get_max_concurrent_partitions())
+    ) as executor:
+        is_partition_complete_list = list(executor.map(
+            lambda partition_iter_: add_partition_attributes(
+                dynamodb_client, output_bucket, partition_iter_, portal_run_id, checkpoint_id, trace_id
+            ),
+            partitions
+        ))
+
+    failed_partitions = [
+        partition_iter_[0]
+        for partition_iter_, is_partition_complete_iter_ in zip(partitions, is_partition_complete_list)
+        if not is_partition_complete_iter_
+    ]
+    if len(failed_partitions) > 0:
+        raise PartitionedAttributesError(
+            f"Could not add the portal run id attributes for {len(failed_partitions)} of {len(partitions)} "
+            f"sub-prefixes, for example {failed_partitions[:5]}"
+        )
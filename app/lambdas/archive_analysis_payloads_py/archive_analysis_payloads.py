@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+"""
+Archive analysis launch payloads
+
+Takes a batch of compressed analysis launch payloads off the payload archive queue,
+uploads each payload to the artefacts bucket and records the payload uri in the payloads table.
+
+This runs off the critical path of the launch step function, the launch step function
+writes the rest of the payloads table item, so we only ever set the payload uri attribute here.
+
+Failed records are reported back to SQS so only those records are retried.
+"""
+
+# Standard imports
+import base64
+import json
+import logging
+import typing
+from os import environ
+from time import time
+from typing import Dict, List
+from urllib.parse import urlunparse
+
+import boto3
+
+if typing.TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_dynamodb import DynamoDBClient
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Globals
+S3_ANALYSIS_ARTEFACTS_BUCKET_NAME_ENV_VAR = 'S3_ANALYSIS_ARTEFACTS_BUCKET_NAME'
+PAYLOADS_TABLE_NAME_ENV_VAR = 'PAYLOADS_TABLE_NAME'
+PAYLOADS_TTL_SECONDS = 180 * 24 * 60 * 60  # 180 days, same as the launch step function
+
+
+def get_s3_client() -> 'S3Client':
+    return boto3.client('s3')
+
+
+def get_dynamodb_client() -> 'DynamoDBClient':
+    return boto3.client('dynamodb')
+
+
+def archive_payload(record_body: Dict[str, str]) -> str:
+    """
+    Upload the payload and record the payload uri against the icav2 wes orcabus id
+    """
+    upload_path = record_body['uploadPath']
+
+    get_s3_client().put_object(
+        Body=base64.b64decode(record_body['payloadGzipBase64']),
+        Bucket=environ[S3_ANALYSIS_ARTEFACTS_BUCKET_NAME_ENV_VAR],
+        Key=upload_path
+    )
+
+    s3_payload_uri = str(urlunparse((
+        's3',
+        environ[S3_ANALYSIS_ARTEFACTS_BUCKET_NAME_ENV_VAR],
+        upload_path,
+        None, None, None
+    )))
+
+    # We may get here before the launch step function has added the item
+    # So we also set the ttl if it does not yet exist
+    get_dynamodb_client().update_item(
+        TableName=environ[PAYLOADS_TABLE_NAME_ENV_VAR],
+        Key={"id": {"S": record_body['icav2WesOrcabusId']}},
+        UpdateExpression="SET analysis_launch_uri = :analysis_launch_uri, #ttl = if_not_exists(#ttl, :ttl)",
+        ExpressionAttributeNames={"#ttl": "ttl"},
+        ExpressionAttributeValues={
+            ":analysis_launch_uri": {"S": s3_payload_uri},
+            ":ttl": {"N": str(int(time()) + PAYLOADS_TTL_SECONDS)},
+        }
+    )
+
+    return s3_payload_uri
+
+
+def handler(event, context) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Archive each payload in the batch, report the failures back to SQS
+    """
+    batch_item_failures = []
+
+    for record in event['Records']:
+        try:
+            record_body = json.loads(record['body'])
+            s3_payload_uri = archive_payload(record_body)
+            logger.info(f"Archived the launch payload for {record_body['icav2WesOrcabusId']} to {s3_payload_uri}")
+        except Exception as e:
+            logger.error(f"Could not archive the launch payload in message {record['messageId']}: {e}")
+            batch_item_failures.append({"itemIdentifier": record['messageId']})
+
+    return {
+        "batchItemFailures": batch_item_failures
+    }
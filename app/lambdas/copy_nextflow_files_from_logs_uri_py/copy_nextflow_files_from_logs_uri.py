@@ -7,13 +7,29 @@ Given a logs uri, find the following files to copy over to the output directory:
 * execution-report.html
 * dag-report.dot
 
+Any other set of log files can be copied by setting fileNameList in the event,
+as file names or as paths relative to the logs folder.
 
+Each file is first resolved directly by its path under the logs folder (a single lookup per file).
+Files that are not directly under the logs folder are then searched for by name, listing the subfolders
+non-recursively (up to maxSearchDepth levels, and at most maxFolderListings listings),
+so a file that does not exist (i.e. a run without a dag-report.dot) does not cost a walk of the whole logs tree.
+Folder listings are cached for the rest of the invocation (the cache is cleared at the start of each invocation,
+so a retry in a warm container sees the log files written since).
+Set lookupMode to 'recursive' to search the whole logs folder instead.
+
+The files are copied concurrently and in-process, each download is streamed straight into the upload
+through the http session of the copy (requests sessions are not thread safe, so they are not shared),
+so we never hold a full file in memory or spawn a subprocess.
 """
 # Standard imports
-from subprocess import run
-from tempfile import NamedTemporaryFile
-from textwrap import dedent
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from tempfile import TemporaryFile
+from typing import BinaryIO, Dict, Iterator, List, Literal, Optional, Tuple, Union
+import logging
+
+import requests
 
 from libica.openapi.v3 import ProjectData
 
@@ -38,75 +54,208 @@ FILE_NAMES_LIST = [
     'dag-report.dot'
 ]
 
-# Globals
-POST_DELETION_WAIT_TIME = 5  # seconds
+# Lookup
+LookupModeType = Literal['targeted', 'recursive']
+DEFAULT_LOOKUP_MODE: LookupModeType = 'targeted'
+DEFAULT_MAX_SEARCH_DEPTH = 2  # The logs folder and two levels of subfolders
+DEFAULT_MAX_FOLDER_LISTINGS = 16  # Upper bound on the folder listings of the search for the remaining files
+FOLDER_LISTING_CACHE_MAX_SIZE = 128
+
+# Copies
+MAX_CONCURRENT_COPIES = 8
+COPY_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+REQUEST_TIMEOUT = (10, 300)  # Connect, read
+
+
+# Set logging
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=FOLDER_LISTING_CACHE_MAX_SIZE)
+def get_folder_listing(project_id: str, folder_id: str) -> Tuple[ProjectData, ...]:
+    return tuple(list_project_data_non_recursively(
+        project_id=project_id,
+        parent_folder_id=folder_id,
+    ))
+
+
+def get_file_by_relative_path(logs_uri: str, relative_path: str) -> Optional[ProjectData]:
+    """
+    Resolve a file directly from its path relative to the logs folder, None if there is no such file
+    """
+    try:
+        project_data_obj = convert_uri_to_project_data_obj(logs_uri.rstrip("/") + "/" + relative_path.lstrip("/"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if project_data_obj.data.details.data_type != 'FILE':
+        return None
+
+    return project_data_obj
+
+
+def search_files_by_name(
+        folder: ProjectData,
+        file_names_list: List[str],
+        max_search_depth: int = DEFAULT_MAX_SEARCH_DEPTH,
+        max_folder_listings: int = DEFAULT_MAX_FOLDER_LISTINGS,
+) -> Dict[str, ProjectData]:
+    """
+    Breadth first search for the files under the folder, one non-recursive listing per folder,
+    we stop as soon as every file has been found, or once we have used up the folder listings
+    """
+    files_by_name: Dict[str, ProjectData] = {}
+    folder_ids = [folder.data.id]
+    folder_listings_count = 0
+
+    for _ in range(max_search_depth + 1):
+        subfolder_ids = []
+        for folder_id in folder_ids:
+            if folder_listings_count >= max_folder_listings:
+                return files_by_name
+            folder_listings_count += 1
+            for project_data_iter_ in get_folder_listing(folder.project_id, folder_id):
+                if project_data_iter_.data.details.data_type == 'FOLDER':
+                    subfolder_ids.append(project_data_iter_.data.id)
+                elif (
+                        project_data_iter_.data.details.name in file_names_list and
+                        project_data_iter_.data.details.name not in files_by_name
+                ):
+                    files_by_name[project_data_iter_.data.details.name] = project_data_iter_
+
+        if len(files_by_name) == len(set(file_names_list)) or len(subfolder_ids) == 0:
+            break
+
+        folder_ids = subfolder_ids
+
+    return files_by_name
+
+
+def find_files_by_name(
+        folder: ProjectData,
+        logs_uri: str,
+        file_names_list: List[str],
+        max_search_depth: int = DEFAULT_MAX_SEARCH_DEPTH,
+        max_folder_listings: int = DEFAULT_MAX_FOLDER_LISTINGS,
+) -> List[ProjectData]:
+    """
+    Resolve each file directly by its path under the logs folder,
+    then search the subfolders (within the bounds) for the file names that were not found
+    """
+    files_by_name: Dict[str, ProjectData] = {}
+    for file_name in set(file_names_list):
+        project_data_obj = get_file_by_relative_path(logs_uri, file_name)
+        if project_data_obj is not None:
+            files_by_name[file_name] = project_data_obj
+
+    # Only bare file names are searched for, paths are exact
+    remaining_file_names_list = list(filter(
+        lambda file_name_iter_: file_name_iter_ not in files_by_name and "/" not in file_name_iter_,
+        set(file_names_list)
+    ))
+    if len(remaining_file_names_list) > 0:
+        files_by_name.update(search_files_by_name(
+            folder=folder,
+            file_names_list=remaining_file_names_list,
+            max_search_depth=max_search_depth,
+            max_folder_listings=max_folder_listings,
+        ))
+
+    for file_name in set(file_names_list) - set(files_by_name.keys()):
+        logger.warning(f"Could not find {file_name} under the logs folder")
+
+    return list(files_by_name.values())
+
+
+class SizedStream:
+    """
+    Body for a streamed upload of known length.
+
+    requests only sets the Content-Length header of a streamed body if it can get its length,
+    otherwise it falls back to chunked transfer encoding (which presigned s3 upload urls do not accept).
+    """
+    def __init__(self, download_response: requests.Response, length: int):
+        self._raw = download_response.raw
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
 
+    def read(self, size: int = -1) -> bytes:
+        # Copy the bytes as they are stored, we don't want to decode any content-encoding
+        return self._raw.read(None if size < 0 else size, decode_content=False)
 
-def get_shell_script_template() -> str:
-    return dedent(
-        """
-        #!/usr/bin/env bash
+    def __iter__(self) -> Iterator[bytes]:
+        while chunk := self.read(COPY_CHUNK_SIZE):
+            yield chunk
 
-        set -euo pipefail
 
-        curl --location \
-         "__DOWNLOAD_PRESIGNED_URL__" | \
-        curl --location \
-          --request PUT \
-          --header 'Content-Type: application/octet-stream' \
-          --data-binary "@-" \
-          "__UPLOAD_PRESIGNED_URL__"
-        """
+def put_upload(
+        session: requests.Session,
+        destination_file_upload_url: str,
+        data: Union[SizedStream, BinaryIO],
+) -> requests.Response:
+    return session.put(
+        destination_file_upload_url,
+        data=data,
+        headers={
+            "Content-Type": "application/octet-stream",
+        },
+        timeout=REQUEST_TIMEOUT
     )
 
 
-def generate_shell_script(
+def stream_copy(
+        session: requests.Session,
         source_file_download_url: str,
         destination_file_upload_url: str,
 ):
-    # Create a temp file
-    temp_file_path = NamedTemporaryFile(
-        delete=False,
-        suffix=".sh"
-    ).name
-
-    # Write the shell script to the temp file
-    with open(temp_file_path, "w") as temp_file_h:
-        temp_file_h.write(
-            get_shell_script_template().replace(
-                "__DOWNLOAD_PRESIGNED_URL__", source_file_download_url
-            ).replace(
-                "__UPLOAD_PRESIGNED_URL__", destination_file_upload_url
-            ) + "\n"
-        )
+    """
+    Stream the download into the upload.
 
-    return temp_file_path
+    The upload urls are presigned s3 urls, which do not accept chunked transfer encoding,
+    so the download is streamed into the upload with the content length of the download.
+    If the download has no content length, it is spooled to a temporary file first.
+    """
+    with session.get(source_file_download_url, stream=True, timeout=REQUEST_TIMEOUT) as download_response:
+        download_response.raise_for_status()
 
+        content_length = download_response.headers.get("Content-Length")
+        if content_length is not None:
+            upload_response = put_upload(
+                session, destination_file_upload_url, SizedStream(download_response, int(content_length))
+            )
+        else:
+            # Without a content length, we spool the download to a temporary file to get its length,
+            # so we still never hold the whole file in memory
+            with TemporaryFile() as spool_file:
+                while chunk := download_response.raw.read(COPY_CHUNK_SIZE, decode_content=False):
+                    spool_file.write(chunk)
+                spool_file.seek(0)
+                upload_response = put_upload(session, destination_file_upload_url, spool_file)
+        upload_response.raise_for_status()
 
-def run_shell_script(
-        shell_script_path: str,
-):
-    """
-    Run the shell script with the following environment variables set
-    :param shell_script_path:
-    :return:
-    """
-    proc = run(
-        [
-            "bash", shell_script_path
-        ],
-        capture_output=True
-    )
 
-    if not proc.returncode == 0:
-        raise RuntimeError(
-            f"Failed to run shell script {shell_script_path} with return code {proc.returncode}. "
-            f"Stdout was {proc.stdout.decode()}"
-            f"Stderr was {proc.stderr.decode()}"
+def copy_project_data_to_folder(
+        log_data: ProjectData,
+        output_folder: ProjectData,
+):
+    # The download and the upload of a copy share a session, each copy has its own
+    with requests.Session() as session:
+        stream_copy(
+            session=session,
+            source_file_download_url=create_download_url(
+                project_id=log_data.project_id,
+                file_id=log_data.data.id,
+            ),
+            destination_file_upload_url=create_file_with_upload_url(
+                project_id=output_folder.project_id,
+                folder_id=output_folder.data.id,
+                file_name=log_data.data.details.name
+            )
         )
 
-    return
-
 
 def handler(event, context):
     """
@@ -119,9 +268,16 @@ def handler(event, context):
     # Set the icav2 env vars
     set_icav2_env_vars()
 
+    # Don't reuse the folder listings of a previous invocation (i.e. the previous attempt of a retry)
+    get_folder_listing.cache_clear()
+
     # Get the logs uri and the output uri
     logs_uri = event.get("logsUri")
     output_uri = event.get("outputUri")
+    file_names_list = event.get("fileNameList", FILE_NAMES_LIST)
+    lookup_mode: LookupModeType = event.get("lookupMode", DEFAULT_LOOKUP_MODE)
+    max_search_depth = event.get("maxSearchDepth", DEFAULT_MAX_SEARCH_DEPTH)
+    max_folder_listings = event.get("maxFolderListings", DEFAULT_MAX_FOLDER_LISTINGS)
 
     logs_folder = convert_uri_to_project_data_obj(
         logs_uri
@@ -132,20 +288,31 @@ def handler(event, context):
     )
 
     # Find the timeline-report.html, execution-report.html, and dag-report.dot files
-    logs_project_data: List[ProjectData] = list(filter(
-        lambda project_data_iter_: project_data_iter_.data.details.name in FILE_NAMES_LIST,
-        find_project_data_bulk(
-            project_id=logs_folder.project_id,
-            parent_folder_id=logs_folder.data.id,
-            data_type='FILE'
+    logs_project_data: List[ProjectData]
+    if lookup_mode == 'targeted':
+        logs_project_data = find_files_by_name(
+            folder=logs_folder,
+            logs_uri=logs_uri,
+            file_names_list=file_names_list,
+            max_search_depth=max_search_depth,
+            max_folder_listings=max_folder_listings
         )
-    ))
+    else:
+        logs_project_data = list(filter(
+            lambda project_data_iter_: project_data_iter_.data.details.name in file_names_list,
+            find_project_data_bulk(
+                project_id=logs_folder.project_id,
+                parent_folder_id=logs_folder.data.id,
+                data_type='FILE'
+            )
+        ))
 
     # For each file, copy it to the output folder
     project_data_output_list = list_project_data_non_recursively(
         project_id=output_folder.project_id,
         parent_folder_id=output_folder.data.id,
     )
+    logs_project_data_to_copy: List[ProjectData] = []
     for log_data in logs_project_data:
         try:
             get_file_by_file_name_from_project_data_list(
@@ -153,28 +320,20 @@ def handler(event, context):
                 project_data_list=project_data_output_list
             )
         except ValueError:
-            pass
-        else:
-            # File already exists
-            continue
+            logs_project_data_to_copy.append(log_data)
+        # Otherwise the file already exists
 
-        # Create the destination file object
-        # Get the shell script
-        shell_script_path = generate_shell_script(
-            source_file_download_url=create_download_url(
-                project_id=log_data.project_id,
-                file_id=log_data.data.id,
-            ),
-            destination_file_upload_url=create_file_with_upload_url(
-                project_id=output_folder.project_id,
-                folder_id=output_folder.data.id,
-                file_name=log_data.data.details.name
-            )
-        )
+    if len(logs_project_data_to_copy) == 0:
+        return {}
 
-        # Run the shell script
-        run_shell_script(
-            shell_script_path=shell_script_path,
-        )
+    # Copy the files concurrently
+    with ThreadPoolExecutor(
+            max_workers=min(len(logs_project_data_to_copy), MAX_CONCURRENT_COPIES)
+    ) as executor:
+        # Consume the results so that any failed copy is raised
+        list(executor.map(
+            lambda log_data_iter_: copy_project_data_to_folder(log_data_iter_, output_folder),
+            logs_project_data_to_copy
+        ))
 
     return {}
@@ -3,31 +3,152 @@
 """
 Filemanager sync script
 
-Check if the filemanager has the same number of files as the aws s3 api command returns
+Check if the filemanager has the same files as ICAv2 for the output uri.
+
+We build a key set (s3 key + size) from each side and report the keys missing from the filemanager
+(in ICAv2 but not in the filemanager) and the extra keys (in the filemanager but not in ICAv2).
+
+The outputs of a completed analysis don't change, so on later polls (when the step function passes back
+the missingKeys / extraKeys of the previous poll) we only re-list the ICAv2 folders that held a discrepancy,
+and only compare the keys under those folders.
+If there are too many discrepancies to pass back (MAX_DISCREPANCY_KEYS) the next poll is a full reconciliation.
+
+If the step function passes a taskToken (lambda:invoke.waitForTaskToken), rather than returning the result to a polling loop,
+we register the missing keys against the portal run id in the callback table and list the filemanager once more,
+ticking off any keys ingested while we were registering.
+The handle filemanager event lambda ticks off the remaining keys as the filemanager reports them ingested,
+resuming the step function once the last key is in.
+If the filemanager is already synced, or the discrepancies cannot be resolved by ingesting new objects
+(extra keys, or too many missing keys to register), we resume the step function straight away with the result.
+The step function falls back to polling if the events don't arrive in time.
 """
 
 # Standard imports
+import json
+from pathlib import PurePosixPath
+from typing import Dict, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 import logging
 
 # Wrapica imports
-from wrapica.project_data import find_project_data_bulk, convert_uri_to_project_data_obj
+from wrapica.project_data import (
+    find_project_data_bulk,
+    convert_uri_to_project_data_obj,
+    list_project_data_non_recursively
+)
 
 # Layer imports
 from icav2_tools import set_icav2_env_vars
 from orcabus_api_tools.filemanager import list_files_from_portal_run_id
+from icav2_wes_manager_tools.tracing import span
+from icav2_wes_manager_tools.filemanager_sync_registration import (
+    get_sfn_client,
+    register_missing_keys,
+    tick_off_keys,
+    resume_filemanager_sync
+)
 
 # Setup logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Globals
+MAX_DISCREPANCY_KEYS = 1000  # Keep the step function payload small
+IAP_TEST_FILE_SUFFIX = '.iap_xaccount_test.tmp'
+
+# (s3 key, size)
+FileKeyType = Tuple[str, int]
+
+
+def get_relative_parent_folder(key: str, s3_key_prefix: str) -> str:
+    """
+    The parent folder of the key, relative to the output prefix ('' for the output folder itself)
+    """
+    parent_folder = str(PurePosixPath(key.removeprefix(s3_key_prefix)).parent)
+    return '' if parent_folder == '.' else parent_folder
+
+
+def get_filemanager_key_set(portal_run_id: str, s3_bucket: str, s3_key_prefix: str) -> Set[FileKeyType]:
+    # Filemanager files (via attributes)
+    return set(map(
+        lambda file_obj_iter_: (file_obj_iter_['key'], file_obj_iter_['size']),
+        filter(
+            lambda file_obj_iter_: (
+                # Not the iap temp copy test file
+                ( not file_obj_iter_['key'].endswith(IAP_TEST_FILE_SUFFIX) ) and
+                # Match the bucket and key prefix
+                file_obj_iter_['bucket'] == s3_bucket and
+                file_obj_iter_['key'].startswith(s3_key_prefix)
+            ),
+            # Get the files from the filemanager
+            list_files_from_portal_run_id(portal_run_id)
+        )
+    ))
+
+
+def get_icav2_key_set(
+        output_uri: str,
+        s3_key_prefix: str,
+        folder_relative_paths: Optional[Set[str]] = None
+) -> Set[FileKeyType]:
+    """
+    List the files via icav2, either recursively under the output uri,
+    or non-recursively in each of the folders (relative to the output uri)
+    """
+    if folder_relative_paths is None:
+        icav2_project_data_obj = convert_uri_to_project_data_obj(output_uri)
+        return set(map(
+            lambda project_data_iter_: (
+                s3_key_prefix + project_data_iter_.data.details.path.removeprefix(
+                    icav2_project_data_obj.data.details.path
+                ),
+                project_data_iter_.data.details.file_size_in_bytes
+            ),
+            find_project_data_bulk(
+                project_id=icav2_project_data_obj.project_id,
+                parent_folder_id=icav2_project_data_obj.data.id,
+                data_type='FILE'
+            )
+        ))
+
+    icav2_key_set = set()
+    for folder_relative_path in folder_relative_paths:
+        try:
+            folder_obj = convert_uri_to_project_data_obj(
+                output_uri.rstrip('/') + '/' + (folder_relative_path + '/' if folder_relative_path else '')
+            )
+        except (FileNotFoundError, ValueError):
+            # The folder no longer exists in icav2
+            continue
+        folder_key_prefix = s3_key_prefix + folder_relative_path + ('/' if folder_relative_path else '')
+        for project_data_iter_ in list_project_data_non_recursively(
+                project_id=folder_obj.project_id,
+                parent_folder_id=folder_obj.data.id,
+        ):
+            if project_data_iter_.data.details.data_type != 'FILE':
+                continue
+            icav2_key_set.add((
+                folder_key_prefix + project_data_iter_.data.details.name,
+                project_data_iter_.data.details.file_size_in_bytes
+            ))
+    return icav2_key_set
+
+
+def to_key_dicts(key_set: Set[FileKeyType]) -> List[Dict]:
+    return [
+        {"key": key, "size": size}
+        for key, size in sorted(key_set)
+    ]
+
 
 def handler(event, context):
     """
-    List the files in the filemanager recursively
-    :param event:
-    :param context:
-    :return:
+    Reconcile the files in the filemanager with the files in icav2
+
+    Input: outputUri, portalRunId, (optionally, from the previous poll) missingKeys, extraKeys,
+    (optionally) traceId, (optionally) taskToken
+    Output: isSynced, missingCount, extraCount, missingKeys, extraKeys
+    (missingKeys / extraKeys are null if there are more than MAX_DISCREPANCY_KEYS of them)
     """
     # Set icav2 env vars
     set_icav2_env_vars()
@@ -35,45 +156,85 @@ def handler(event, context):
     # Get the bucket, key from the event
     output_uri = event['outputUri']
     portal_run_id = event['portalRunId']
-    icav2_project_data_obj = convert_uri_to_project_data_obj(output_uri)
+    previous_missing_keys = event.get('missingKeys')
+    previous_extra_keys = event.get('extraKeys')
+    trace_id = event.get('traceId')
+    task_token = event.get('taskToken')
 
     # Parse the s3 uri
     s3_bucket = urlparse(output_uri).netloc
-    s3_key_prefix = urlparse(output_uri).path.lstrip('/')
+    s3_key_prefix = urlparse(output_uri).path.strip('/') + '/'
 
-    # Filemanager files (via attributes)
-    filemanager_files = list(filter(
-        # Remove iap temporary test files
-        lambda file_obj_iter_: (
-            # Not the iap temp copy test file
-            ( not file_obj_iter_['key'].endswith('.iap_xaccount_test.tmp') ) and
-            # Match the bucket and key prefix
-            file_obj_iter_['bucket'] == s3_bucket and
-            file_obj_iter_['key'].startswith(s3_key_prefix)
-        ),
-        # Get the files from the filemanager
-        list_files_from_portal_run_id(portal_run_id)
-    ))
+    with span("filemanager.list_files", trace_id):
+        filemanager_key_set = get_filemanager_key_set(portal_run_id, s3_bucket, s3_key_prefix)
 
-    # List files via icav2
-    icav2_project_data_list = find_project_data_bulk(
-        project_id=icav2_project_data_obj.project_id,
-        parent_folder_id=icav2_project_data_obj.data.id,
-        data_type='FILE'
-    )
+    # Full reconciliation
+    if previous_missing_keys is None or previous_extra_keys is None:
+        with span("icav2.list_output_files", trace_id, incremental=False):
+            icav2_key_set = get_icav2_key_set(output_uri, s3_key_prefix)
+
+    # Only re-list the folders with discrepancies
+    else:
+        folder_relative_paths = set(map(
+            lambda key_iter_: get_relative_parent_folder(key_iter_['key'], s3_key_prefix),
+            previous_missing_keys + previous_extra_keys
+        ))
+        with span("icav2.list_output_files", trace_id, incremental=True):
+            icav2_key_set = get_icav2_key_set(output_uri, s3_key_prefix, folder_relative_paths)
+        filemanager_key_set = set(filter(
+            lambda file_key_iter_: (
+                get_relative_parent_folder(file_key_iter_[0], s3_key_prefix) in folder_relative_paths
+            ),
+            filemanager_key_set
+        ))
+
+    missing_key_set = icav2_key_set - filemanager_key_set
+    extra_key_set = filemanager_key_set - icav2_key_set
 
     # We try again in a few minutes
-    if len(filemanager_files) != len(icav2_project_data_list):
+    if len(missing_key_set) > 0 or len(extra_key_set) > 0:
         logger.warning(
-            f"Filemanager has {len(filemanager_files)} files, "
-            f"ICAv2 has {len(icav2_project_data_list)} files"
+            f"Filemanager is missing {len(missing_key_set)} files and has {len(extra_key_set)} extra files, "
+            f"for example {to_key_dicts(missing_key_set)[:5]} and {to_key_dicts(extra_key_set)[:5]}"
         )
-        return {
-            "isSynced": False,
-        }
 
-    # If the number of files is the same, we pass the check
-    else:
-        return {
-            "isSynced": True,
-        }
+    is_incremental = len(missing_key_set) + len(extra_key_set) <= MAX_DISCREPANCY_KEYS
+
+    result = {
+        "isSynced": len(missing_key_set) == 0 and len(extra_key_set) == 0,
+        "missingCount": len(missing_key_set),
+        "extraCount": len(extra_key_set),
+        "missingKeys": to_key_dicts(missing_key_set) if is_incremental else None,
+        "extraKeys": to_key_dicts(extra_key_set) if is_incremental else None,
+    }
+
+    if task_token is None:
+        return result
+
+    # Nothing that ingesting new objects would resolve, resume the step function with the result
+    if len(missing_key_set) == 0 or len(extra_key_set) > 0 or not is_incremental:
+        get_sfn_client().send_task_success(
+            taskToken=task_token,
+            output=json.dumps(result)
+        )
+        return result
+
+    # Wait on the filemanager events for the missing keys
+    register_missing_keys(
+        portal_run_id, s3_bucket,
+        map(lambda file_key_iter_: file_key_iter_[0], missing_key_set),
+        task_token
+    )
+
+    # Tick off the keys that were ingested before the registration (their events may have already been handled)
+    with span("filemanager.list_files", trace_id, after_registration=True):
+        ingested_key_set = missing_key_set & get_filemanager_key_set(portal_run_id, s3_bucket, s3_key_prefix)
+    if (
+            len(ingested_key_set) > 0 and
+            tick_off_keys(portal_run_id, s3_bucket, map(lambda file_key_iter_: file_key_iter_[0], ingested_key_set))
+    ):
+        resume_filemanager_sync(portal_run_id)
+        return result
+
+    logger.info(f"Waiting on filemanager events for {len(missing_key_set) - len(ingested_key_set)} keys")
+    return result
@@ -12,9 +12,10 @@ from aws_durable_execution_sdk_python.types import WaitForCallbackContext
 from requests import HTTPError
 from datetime import datetime, UTC
 from os import environ
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 import typing
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 
 # Durable context imports
 from aws_durable_execution_sdk_python import (
@@ -22,7 +23,7 @@ from aws_durable_execution_sdk_python import (
     durable_execution, StepContext, durable_step
 )
 from aws_durable_execution_sdk_python.config import (
-    Duration, WaitForCallbackConfig
+    Duration, WaitForCallbackConfig, MapConfig
 )
 
 # Layer imports
@@ -37,15 +38,84 @@ if typing.TYPE_CHECKING:
 
 # Globals
 CALLBACK_DATABASE_NAME_ENV_VAR = "CALLBACK_DATABASE_NAME"
+CONCURRENT_SUBMISSION_ENABLED_ENV_VAR = "CONCURRENT_SUBMISSION_ENABLED"
+MAX_CONCURRENT_SUBMISSIONS_ENV_VAR = "MAX_CONCURRENT_SUBMISSIONS"
 SECONDS_PER_DAY = (60 * 60 * 24)  # 60 seconds per min * 60 minutes per hour * 24 hours per day
+DEFAULT_MAX_CONCURRENT_SUBMISSIONS = 10
+REQUIRED_RECORD_KEYS = ['name', 'inputs', 'engineParameters', 'tags']
 
 
 def get_dynamodb_client() -> 'DynamoDBClient':
     return boto3.client('dynamodb')
 
 
+def is_concurrent_submission_enabled() -> bool:
+    return environ.get(CONCURRENT_SUBMISSION_ENABLED_ENV_VAR, "false").lower() == "true"
+
+
+def get_max_concurrent_submissions() -> int:
+    return int(environ.get(MAX_CONCURRENT_SUBMISSIONS_ENV_VAR, DEFAULT_MAX_CONCURRENT_SUBMISSIONS))
+
+
+def get_record_body(record: Dict[str, Any]) -> Dict[str, Any]:
+    record_body = json.loads(record.get("body", {}))
+    # Check if the event contains the required keys
+    for key in REQUIRED_RECORD_KEYS:
+        if key not in record_body:
+            raise ValueError(f"Missing required key: {key}")
+    return record_body
+
+
+def get_batch_item_failures_response(failed_message_ids: List[str]) -> Dict[str, List[Dict[str, str]]]:
+    return {
+        "batchItemFailures": list(map(
+            lambda message_id_iter_: {"itemIdentifier": message_id_iter_},
+            failed_message_ids
+        ))
+    }
+
+
+def icav2_wes_analysis_exists(analysis_name: str) -> bool:
+    try:
+        get_icav2_wes_analysis_by_name(analysis_name)
+    except ValueError:
+        return False
+    return True
+
+
 @durable_step
-def create_icav2_wes_analysis_durable_step(ctx: StepContext, record_body: Dict[str, Any]) -> Optional[WESResponse]:
+def get_existing_icav2_wes_analysis_names_durable_step(ctx: StepContext, analysis_names: List[str]) -> List[str]:
+    """
+    Check which analysis names already exist on the WES API.
+
+    The lookups for the whole batch are run side by side and checkpointed as a single step,
+    rather than one round trip (and one checkpoint) per record
+    """
+    if len(analysis_names) == 0:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(len(analysis_names), get_max_concurrent_submissions())) as executor:
+        existing_analysis_names = [
+            analysis_name_iter_
+            for analysis_name_iter_, exists_iter_ in zip(
+                analysis_names,
+                executor.map(icav2_wes_analysis_exists, analysis_names)
+            )
+            if exists_iter_
+        ]
+
+    for analysis_name_iter_ in existing_analysis_names:
+        ctx.logger.info(f"WES analysis with name '{analysis_name_iter_}' already exists. Skipping creation.")
+
+    return existing_analysis_names
+
+
+@durable_step
+def create_icav2_wes_analysis_durable_step(
+        ctx: StepContext,
+        record_body: Dict[str, Any],
+        check_exists: bool = True
+) -> Optional[WESResponse]:
     # Create the WES POST request
     wes_post_request: WESPostRequest = {
         "name": record_body['name'],
@@ -55,11 +125,8 @@ def create_icav2_wes_analysis_durable_step(ctx: StepContext, record_body: Dict[s
     }
 
     # Check if we haven't already tried to create this analysis
-    try:
-        get_icav2_wes_analysis_by_name(record_body['name'])
-    except ValueError:
-        pass
-    else:
+    # (skipped when the batch has already been checked in one go)
+    if check_exists and icav2_wes_analysis_exists(record_body['name']):
         ctx.logger.info(f"WES analysis with name '{record_body['name']}' already exists. Skipping creation.")
         return None
 
@@ -114,28 +181,114 @@ def map_and_wait(icav2_wes_analysis_id: str, context: DurableContext):
     )
 
 
+def submit_and_wait(
+        context: DurableContext,
+        record_body: Dict[str, Any],
+        index: int,
+        record_bodies: List[Dict[str, Any]]
+):
+    """
+    Map function for the concurrent mode, submit a single (new) analysis and wait for its launch callback
+    """
+    icav2_wes_analysis_response = context.step(
+        create_icav2_wes_analysis_durable_step(record_body, check_exists=False)
+    )
+
+    map_and_wait(icav2_wes_analysis_response['id'], context)
+
+
+def handle_records_concurrently(
+        record_bodies_by_message_id: Dict[str, Dict[str, Any]],
+        context: DurableContext
+) -> List[str]:
+    """
+    Submit every record in the batch in parallel.
+
+    Name existence is checked once for the whole batch,
+    then each new analysis is submitted and waits for its own callback in a durable map,
+    so the batch completes in the time of its slowest launch rather than the sum of all launches.
+
+    Returns the message ids of the records that could not be submitted
+    """
+    # Drop duplicate names in the batch, the API would reject the second one anyway
+    # We keep track of every message id per name, so a failed submission fails all of its messages
+    message_ids_by_name: Dict[str, List[str]] = {}
+    for message_id_iter_, record_body_iter_ in record_bodies_by_message_id.items():
+        message_ids_by_name.setdefault(record_body_iter_['name'], []).append(message_id_iter_)
+    record_bodies = list({
+        record_body_iter_['name']: record_body_iter_
+        for record_body_iter_ in record_bodies_by_message_id.values()
+    }.values())
+
+    # 1. Check which analyses already exist (single step for the batch)
+    existing_analysis_names = context.step(
+        get_existing_icav2_wes_analysis_names_durable_step(
+            list(map(lambda record_body_iter_: record_body_iter_['name'], record_bodies))
+        )
+    )
+
+    new_record_bodies = list(filter(
+        lambda record_body_iter_: record_body_iter_['name'] not in existing_analysis_names,
+        record_bodies
+    ))
+
+    if len(new_record_bodies) == 0:
+        return []
+
+    # 2. Submit the external requests and wait for the callbacks in parallel
+    # A failed submission only fails the messages of that analysis, not the whole batch
+    submission_results = context.map(
+        new_record_bodies,
+        submit_and_wait,
+        name="submit_wes_requests",
+        config=MapConfig(
+            max_concurrency=get_max_concurrent_submissions()
+        )
+    )
+
+    failed_message_ids = []
+    for failed_item_iter_ in submission_results.failed():
+        failed_record_body = new_record_bodies[failed_item_iter_.index]
+        context.logger.error(
+            f"Could not submit WES analysis '{failed_record_body['name']}': {failed_item_iter_.error}"
+        )
+        failed_message_ids.extend(message_ids_by_name[failed_record_body['name']])
+
+    return failed_message_ids
+
+
 @durable_execution
-def handler(event, context: DurableContext):
+def handler(event, context: DurableContext) -> Dict[str, List[Dict[str, str]]]:
     """
     Expect the following inputs from the event object:
       * inputs
       * engineParameters
       * tags
 
+    Invalid records and failed submissions are reported back to SQS as batch item failures,
+    so only those messages are retried, not the whole batch
+
     :param event:
     :param context:
     :return:
     """
+    failed_message_ids = []
 
-    # Not sure what this will look like from the sqs event source
+    # Validate each record on its own
+    record_bodies_by_message_id: Dict[str, Dict[str, Any]] = {}
     for record in event.get("Records", []):
-        record_body = json.loads(record.get("body", {}))
-        # Check if the event contains the required keys
-        required_keys = ['name', 'inputs', 'engineParameters', 'tags']
-        for key in required_keys:
-            if key not in record_body:
-                raise ValueError(f"Missing required key: {key}")
+        try:
+            record_bodies_by_message_id[record['messageId']] = get_record_body(record)
+        except (ValueError, TypeError) as e:
+            context.logger.error(f"Invalid WES request in message {record['messageId']}: {e}")
+            failed_message_ids.append(record['messageId'])
+
+    # Concurrent mode, submit the whole batch in parallel
+    if is_concurrent_submission_enabled():
+        failed_message_ids.extend(handle_records_concurrently(record_bodies_by_message_id, context))
+        return get_batch_item_failures_response(failed_message_ids)
 
+    for record_body in record_bodies_by_message_id.values():
         # 1. Submit the external request
         icav2_wes_analysis_response = context.step(create_icav2_wes_analysis_durable_step(record_body))
 
@@ -144,3 +297,5 @@ def handler(event, context: DurableContext):
 
         # 2. Register in db and wait for callback
         map_and_wait(icav2_wes_analysis_response['id'], context)
+
+    return get_batch_item_failures_response(failed_message_ids)
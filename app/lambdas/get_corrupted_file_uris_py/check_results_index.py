@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+"""
+Corruption check results index
+
+We store the verdict of every file we check in the cache table, so that re-runs of the
+handle corrupted files step function (i.e after a partial failure) only check the files that
+have not yet been checked, or have changed, or whose checks have changed since.
+
+Items in the cache table are keyed by 'CORRUPTION_CHECK#<ingest_id>'
+
+A stored result is only used if the eTag, size and checker version (of the file's classification) all match.
+Files without an eTag are always checked.
+
+New verdicts are buffered (CheckResultsBuffer) and written in batches of up to 25 items with a single client,
+rather than one client and one round trip per file.
+"""
+
+# Standard imports
+import typing
+from os import environ
+from time import monotonic, sleep, time
+from typing import Dict, Iterator, List, Optional
+import logging
+
+import boto3
+
+# Local imports
+from corruption_checks import CHECKER_VERSIONS
+
+if typing.TYPE_CHECKING:
+    from mypy_boto3_dynamodb import DynamoDBClient
+
+# Set up logging
+logger = logging.getLogger()
+
+# Globals
+CACHE_DATABASE_NAME_ENV_VAR = 'CACHE_DATABASE_NAME'
+CORRUPTION_CHECK_RESULTS_TTL_SECONDS_ENV_VAR = 'CORRUPTION_CHECK_RESULTS_TTL_SECONDS'
+DEFAULT_CORRUPTION_CHECK_RESULTS_TTL_SECONDS = 90 * 24 * 60 * 60  # 90 days
+BATCH_GET_ITEM_MAX_KEYS = 100
+BATCH_WRITE_ITEM_MAX_ITEMS = 25
+UNPROCESSED_ITEMS_RETRY_INTERVAL_SECONDS = 0.1
+CHECK_RESULTS_FLUSH_INTERVAL_SECONDS = 5  # Write out a partial batch once it is this old
+
+
+def get_dynamodb_client() -> 'DynamoDBClient':
+    return boto3.client('dynamodb')
+
+
+def get_check_result_item_id(ingest_id: str) -> str:
+    return f"CORRUPTION_CHECK#{ingest_id}"
+
+
+def get_checker_version(matching_file: Dict) -> Optional[str]:
+    return CHECKER_VERSIONS.get(matching_file["classification"])
+
+
+def is_indexable(matching_file: Dict) -> bool:
+    return (
+        environ.get(CACHE_DATABASE_NAME_ENV_VAR) is not None and
+        matching_file.get("eTag") is not None and
+        get_checker_version(matching_file) is not None
+    )
+
+
+def iter_chunks(items: List, chunk_size: int) -> Iterator[List]:
+    for index in range(0, len(items), chunk_size):
+        yield items[index:index + chunk_size]
+
+
+def get_stored_check_results(
+        matching_files: List[Dict],
+        dynamodb_client: Optional['DynamoDBClient'] = None
+) -> Dict[str, bool]:
+    """
+    Get the stored verdicts (is the file corrupted) of the files that are unchanged since they were checked,
+    keyed by ingest id
+    """
+    if dynamodb_client is None:
+        dynamodb_client = get_dynamodb_client()
+
+    matching_files_by_item_id = {
+        get_check_result_item_id(matching_file_iter_["ingestId"]): matching_file_iter_
+        for matching_file_iter_ in matching_files
+        if is_indexable(matching_file_iter_)
+    }
+
+    stored_check_results = {}
+    try:
+        for item_ids_chunk in iter_chunks(list(matching_files_by_item_id.keys()), BATCH_GET_ITEM_MAX_KEYS):
+            request_items = {
+                environ[CACHE_DATABASE_NAME_ENV_VAR]: {
+                    "Keys": [{"id": {"S": item_id}} for item_id in item_ids_chunk]
+                }
+            }
+            while request_items:
+                response = dynamodb_client.batch_get_item(RequestItems=request_items)
+                for item in response["Responses"].get(environ[CACHE_DATABASE_NAME_ENV_VAR], []):
+                    matching_file = matching_files_by_item_id[item["id"]["S"]]
+                    if (
+                            item["e_tag"]["S"] == matching_file["eTag"] and
+                            int(item["size"]["N"]) == matching_file["size"] and
+                            item["checker_version"]["S"] == get_checker_version(matching_file) and
+                            # DynamoDB TTL deletion is lazy, so we also check the expiry ourselves
+                            int(item["ttl"]["N"]) >= time()
+                    ):
+                        stored_check_results[matching_file["ingestId"]] = item["is_corrupted"]["BOOL"]
+                request_items = response.get("UnprocessedKeys")
+                if request_items:
+                    sleep(UNPROCESSED_ITEMS_RETRY_INTERVAL_SECONDS)
+    except Exception as e:
+        # The index is an optimisation, fall back to checking every file
+        logger.warning(f"Could not read corruption check results from the cache table: {e}")
+        return {}
+
+    return stored_check_results
+
+
+def put_check_results(check_results: List[Dict], dynamodb_client: Optional['DynamoDBClient'] = None):
+    """
+    Store the verdicts of the files we have just checked,
+    each check result is a matching file with an isCorrupted verdict
+    """
+    if dynamodb_client is None:
+        dynamodb_client = get_dynamodb_client()
+
+    ttl_seconds = int(environ.get(
+        CORRUPTION_CHECK_RESULTS_TTL_SECONDS_ENV_VAR,
+        DEFAULT_CORRUPTION_CHECK_RESULTS_TTL_SECONDS
+    ))
+
+    put_requests = [
+        {
+            "PutRequest": {
+                "Item": {
+                    "id": {"S": get_check_result_item_id(check_result_iter_["ingestId"])},
+                    "s3_uri": {"S": check_result_iter_["s3Uri"]},
+                    "e_tag": {"S": check_result_iter_["eTag"]},
+                    "size": {"N": str(check_result_iter_["size"])},
+                    "classification": {"S": check_result_iter_["classification"]},
+                    "checker_version": {"S": get_checker_version(check_result_iter_)},
+                    "is_corrupted": {"BOOL": check_result_iter_["isCorrupted"]},
+                    "ttl": {"N": str(int(time()) + ttl_seconds)},
+                }
+            }
+        }
+        for check_result_iter_ in check_results
+        if is_indexable(check_result_iter_)
+    ]
+
+    try:
+        for put_requests_chunk in iter_chunks(put_requests, BATCH_WRITE_ITEM_MAX_ITEMS):
+            request_items = {
+                environ[CACHE_DATABASE_NAME_ENV_VAR]: put_requests_chunk
+            }
+            while request_items:
+                request_items = dynamodb_client.batch_write_item(
+                    RequestItems=request_items
+                ).get("UnprocessedItems")
+                if request_items:
+                    sleep(UNPROCESSED_ITEMS_RETRY_INTERVAL_SECONDS)
+    except Exception as e:
+        logger.warning(f"Could not write corruption check results to the cache table: {e}")
+
+
+class CheckResultsBuffer:
+    """
+    Buffer the verdicts as the checks finish, and write them out in batches of BATCH_WRITE_ITEM_MAX_ITEMS,
+    or once the buffered verdicts are CHECK_RESULTS_FLUSH_INTERVAL_SECONDS old.
+    Call flush once the checks are done (or before raising), so no verdict is lost.
+    """
+    def __init__(self, dynamodb_client: Optional['DynamoDBClient'] = None):
+        self._dynamodb_client = dynamodb_client if dynamodb_client is not None else get_dynamodb_client()
+        self._check_results: List[Dict] = []
+        self._last_flush_time = monotonic()
+
+    def add(self, check_result: Dict):
+        if not is_indexable(check_result):
+            return
+        self._check_results.append(check_result)
+        if (
+                len(self._check_results) >= BATCH_WRITE_ITEM_MAX_ITEMS or
+                monotonic() - self._last_flush_time >= CHECK_RESULTS_FLUSH_INTERVAL_SECONDS
+        ):
+            self.flush()
+
+    def flush(self):
+        if len(self._check_results) > 0:
+            put_check_results(self._check_results, self._dynamodb_client)
+        self._check_results = []
+        self._last_flush_time = monotonic()
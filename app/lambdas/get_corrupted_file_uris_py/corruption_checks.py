@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+
+"""
+Streaming corruption checks
+
+The file is streamed from the presigned url and never held in memory or written to disk,
+peak memory is bounded by the chunk sizes below regardless of the size of the file.
+
+* Gzip files are decompressed incrementally, a truncated or invalid stream is corrupted
+  (concatenated gzip members, i.e. bgzf, are supported)
+* Json files are parsed incrementally, a json file that does not parse is corrupted
+* Html files must end in '</html>' (ignoring trailing whitespace)
+* Everything else must end in a newline character
+
+Uncompressed non-json files only need the tail of the file for these checks,
+so we only request the last few bytes with a range request rather than streaming the whole file.
+
+Most of our gzip outputs are bgzf (bgzip, htslib), a series of gzip members (blocks) of at most 64 KiB,
+each with its size in the header, followed by a fixed 28 byte EOF block.
+For bgzf files we use two range requests, one for the header of the first block
+and one for the tail of the file (the last data block and the EOF block), so the check is O(1) in bytes.
+Optionally, we can also walk every block header with range requests, without decompressing any blocks.
+Only plain gzip files are decompressed in full.
+"""
+
+# Standard imports
+import io
+import re
+import struct
+import zlib
+from typing import Iterable, Iterator, Optional, Tuple
+
+import requests
+import ijson
+
+# Globals
+HTTP_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+MAX_DECOMPRESSED_CHUNK_SIZE = 4 * 1024 * 1024  # 4 MiB, guards against highly compressible chunks
+TAIL_BUFFER_SIZE = 1024  # Enough for the trailing newline and '</html>' checks
+GZIP_WBITS = 16 + zlib.MAX_WBITS  # Only accept a gzip header and trailer
+REQUEST_TIMEOUT = (10, 60)  # Connect, read
+
+JSON_SUFFIXES = (".json.gz", ".json")
+HTML_SUFFIXES = (".html",)
+GZIP_SUFFIXES = (".gz",)
+
+# Bgzf
+# https://samtools.github.io/hts-specs/SAMv1.pdf (section 4.1)
+BGZF_HEADER_SIZE = 18
+BGZF_MAX_BLOCK_SIZE = 65536
+BGZF_EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+# gzip magic, deflate, FEXTRA, (mtime, xfl, os), XLEN=6, 'BC' subfield of length 2
+BGZF_HEADER_REGEX = re.compile(rb"\x1f\x8b\x08\x04.{6}\x06\x00\x42\x43\x02\x00", re.DOTALL)
+BGZF_TAIL_SIZE = BGZF_MAX_BLOCK_SIZE + len(BGZF_EOF_BLOCK)
+
+# Checker versions, by file classification (see get_matching_ingest_ids)
+# Bump the version of a classification whenever its checks change,
+# so that stored check results for that classification are no longer trusted
+CHECKER_VERSIONS = {
+    "text": "1",
+    "html": "1",
+    "json": "1",
+    "gzip": "1",
+}
+
+# HTTP status codes
+HTTP_PARTIAL_CONTENT = 206
+HTTP_RANGE_NOT_SATISFIABLE = 416
+
+
+# Custom errors
+class CorruptedFileError(Exception):
+    pass
+
+
+# Classes
+class TailBuffer:
+    """
+    Keep the last few bytes of a stream
+    """
+    def __init__(self, size: int = TAIL_BUFFER_SIZE):
+        self.size = size
+        self.value = b""
+
+    def track(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.value = (self.value + chunk)[-self.size:]
+            yield chunk
+
+
+class ChunkIteratorReader(io.RawIOBase):
+    """
+    File-like wrapper around an iterator of bytes, for the incremental json parser
+    """
+    def __init__(self, chunks: Iterable[bytes]):
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+# Functions
+def iter_http_chunks(presigned_url: str) -> Iterator[bytes]:
+    """
+    Stream the object as it is stored (we don't want requests to decode any content-encoding)
+    """
+    with requests.get(presigned_url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        yield from response.raw.stream(HTTP_CHUNK_SIZE, decode_content=False)
+
+
+def get_http_range(presigned_url: str, byte_range: str, size: int) -> Tuple[bytes, Optional[int]]:
+    """
+    Get a byte range of the object, i.e 'bytes=-1024' or 'bytes=0-17'.
+    Returns the bytes and the total size of the object (if the server told us).
+    At most size bytes are kept if the server ignores the range header.
+    """
+    with requests.get(
+            presigned_url,
+            headers={"Range": byte_range},
+            stream=True,
+            timeout=REQUEST_TIMEOUT
+    ) as response:
+        # Empty objects cannot satisfy a range
+        if response.status_code == HTTP_RANGE_NOT_SATISFIABLE:
+            return b"", 0
+
+        response.raise_for_status()
+
+        # Content-Range: bytes <start>-<end>/<total>
+        if response.status_code == HTTP_PARTIAL_CONTENT:
+            content_range = response.headers.get("Content-Range", "")
+            total_size = content_range.rsplit("/", 1)[-1]
+            return (
+                response.raw.read(decode_content=False),
+                int(total_size) if total_size.isdigit() else None
+            )
+
+        # The range header was ignored, this is the full object
+        # Only supported for suffix ranges, where we keep the tail of the full response
+        if not byte_range.startswith("bytes=-"):
+            raise ValueError(f"Server does not support range requests, cannot get range '{byte_range}'")
+        tail_buffer = TailBuffer(size)
+        total_size = 0
+        for chunk in tail_buffer.track(response.raw.stream(HTTP_CHUNK_SIZE, decode_content=False)):
+            total_size += len(chunk)
+        return tail_buffer.value, total_size
+
+
+def get_http_tail(presigned_url: str, size: int = TAIL_BUFFER_SIZE) -> bytes:
+    """
+    Get the last bytes of the object with a suffix range request
+    """
+    return get_http_range(presigned_url, f"bytes=-{size}", size)[0][-size:]
+
+
+def is_bgzf_header(header: bytes) -> bool:
+    return BGZF_HEADER_REGEX.match(header) is not None
+
+
+def get_bgzf_block_size(header: bytes) -> int:
+    # BSIZE is the total block size minus one
+    return struct.unpack_from("<H", header, 16)[0] + 1
+
+
+def get_last_bgzf_data_block(tail: bytes) -> Optional[bytes]:
+    """
+    Find the last data block in the tail of a bgzf file, the block that ends right before the EOF block
+    """
+    data_end = len(tail) - len(BGZF_EOF_BLOCK)
+    for match in reversed(list(BGZF_HEADER_REGEX.finditer(tail, 0, data_end))):
+        if match.start() + get_bgzf_block_size(tail[match.start():]) == data_end:
+            return tail[match.start():data_end]
+    return None
+
+
+def is_bgzf_blocks_corrupted(presigned_url: str, file_size: int) -> bool:
+    """
+    Walk the block headers, every block must start with a bgzf header and
+    the block sizes must add up to the size of the file.
+    One range request per block, we never decompress the blocks.
+    """
+    offset = 0
+    while offset < file_size:
+        header, _ = get_http_range(
+            presigned_url,
+            f"bytes={offset}-{offset + BGZF_HEADER_SIZE - 1}",
+            BGZF_HEADER_SIZE
+        )
+        if not is_bgzf_header(header):
+            return True
+        offset += get_bgzf_block_size(header)
+
+    return offset != file_size
+
+
+def is_bgzf_corrupted(presigned_url: str, key: str, walk_blocks: bool = False) -> bool:
+    """
+    A bgzf file is corrupted if it does not end in the EOF block or the last data block does not decompress.
+    The decompressed contents of the last data block go through the same tail checks as any other text file.
+    """
+    tail, file_size = get_http_range(presigned_url, f"bytes=-{BGZF_TAIL_SIZE}", BGZF_TAIL_SIZE)
+
+    if not tail.endswith(BGZF_EOF_BLOCK):
+        return True
+
+    if walk_blocks and (file_size is None or is_bgzf_blocks_corrupted(presigned_url, file_size)):
+        return True
+
+    last_data_block = get_last_bgzf_data_block(tail)
+    if last_data_block is None:
+        # Only the EOF block, so an empty file
+        return is_tail_corrupted(b"", key)
+
+    tail_buffer = TailBuffer()
+    try:
+        for _ in tail_buffer.track(iter_gunzipped_chunks([last_data_block])):
+            pass
+    except CorruptedFileError:
+        return True
+
+    return is_tail_corrupted(tail_buffer.value, key)
+
+
+def iter_gunzipped_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Incrementally decompress a gzip stream, raises CorruptedFileError if the stream is invalid or truncated
+    """
+    decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+    is_member_started = False
+
+    for chunk in chunks:
+        pending = chunk
+        while pending:
+            is_member_started = True
+            try:
+                output = decompressor.decompress(pending, MAX_DECOMPRESSED_CHUNK_SIZE)
+            except zlib.error as e:
+                raise CorruptedFileError(f"Invalid gzip stream: {e}") from e
+
+            if output:
+                yield output
+
+            if decompressor.eof:
+                # Start of the next gzip member (if any)
+                pending = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+                is_member_started = False
+            else:
+                pending = decompressor.unconsumed_tail
+
+    if is_member_started:
+        try:
+            output = decompressor.flush()
+        except zlib.error as e:
+            raise CorruptedFileError(f"Invalid gzip stream: {e}") from e
+        if output:
+            yield output
+        if not decompressor.eof:
+            raise CorruptedFileError("Gzip stream is truncated")
+
+
+def is_tail_corrupted(tail: bytes, key: str) -> bool:
+    # Html files may not have a line ending, confirm that they end in '</html>'
+    if key.endswith(HTML_SUFFIXES):
+        return not tail.rstrip().endswith(b"</html>")
+
+    # Check the last character is a new line
+    return not tail.endswith(b"\n")
+
+
+def is_stream_corrupted(chunks: Iterable[bytes], key: str) -> bool:
+    """
+    Run the checks for the file type of the key over the stream of the file contents
+    """
+    if key.endswith(GZIP_SUFFIXES):
+        chunks = iter_gunzipped_chunks(chunks)
+
+    tail_buffer = TailBuffer()
+    chunks = tail_buffer.track(chunks)
+
+    try:
+        # Json files don't necessarily have a new line ending, so we just check that it parses
+        if key.endswith(JSON_SUFFIXES):
+            for _ in ijson.parse(ChunkIteratorReader(chunks)):
+                pass
+            return False
+
+        # Otherwise we just need to get to the end of the stream
+        for _ in chunks:
+            pass
+    except (CorruptedFileError, ijson.JSONError, UnicodeDecodeError):
+        return True
+
+    return is_tail_corrupted(tail_buffer.value, key)
+
+
+def is_file_corrupted(presigned_url: str, key: str, walk_bgzf_blocks: bool = False) -> bool:
+    # Plain text fast path, we only need the tail of the file
+    if not key.endswith(GZIP_SUFFIXES + JSON_SUFFIXES):
+        return is_tail_corrupted(get_http_tail(presigned_url), key)
+
+    # Bgzf fast path, we only need the header and the tail of the file
+    if (
+            key.endswith(GZIP_SUFFIXES) and
+            not key.endswith(JSON_SUFFIXES) and
+            is_bgzf_header(get_http_range(presigned_url, f"bytes=0-{BGZF_HEADER_SIZE - 1}", BGZF_HEADER_SIZE)[0])
+    ):
+        return is_bgzf_corrupted(presigned_url, key, walk_blocks=walk_bgzf_blocks)
+
+    return is_stream_corrupted(iter_http_chunks(presigned_url), key)
+
+
+def get_s3_uri(bucket: str, key: str) -> str:
+    return f"s3://{bucket}/{key}"
+
+
+def get_corrupted_s3_uri(
+        presigned_url: str,
+        bucket: str,
+        key: str,
+        walk_bgzf_blocks: bool = False
+) -> Optional[str]:
+    if is_file_corrupted(presigned_url, key, walk_bgzf_blocks=walk_bgzf_blocks):
+        return get_s3_uri(bucket, key)
+    return None
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""
+Given a batch of classified files, return the s3 uris of the corrupted files
+
+The files (ingestId, s3Uri, size, eTag, classification) are classified by the get_matching_ingest_ids lambda,
+bam, bgzf-vcf and vcf files are routed to the ecs validation tasks by the step function,
+so every file here is checked with the streaming checks in corruption_checks.py.
+
+The checks run in a thread pool, capped at MAX_CONCURRENT_CORRUPTION_CHECKS
+
+Files that have already been checked (and are unchanged since) are not checked again,
+see check_results_index.py. The verdicts are stored in batches as the checks finish (the rest before we return or raise),
+so if a check raises, the other verdicts are kept and a retry only checks the remaining files.
+
+Only the uris of the corrupted files are returned under corruptedS3UriList
+"""
+
+# Standard imports
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os import environ
+from typing import Dict, List, Optional, TypedDict
+import logging
+
+# Layer imports
+from orcabus_api_tools.filemanager import get_presigned_url_from_ingest_id
+
+# Local imports
+from corruption_checks import is_file_corrupted
+from check_results_index import get_dynamodb_client, get_stored_check_results, CheckResultsBuffer
+
+# Globals
+MAX_CONCURRENT_CORRUPTION_CHECKS_ENV_VAR = "MAX_CONCURRENT_CORRUPTION_CHECKS"
+DEFAULT_MAX_CONCURRENT_CORRUPTION_CHECKS = 16
+
+# Set logging
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+
+
+class CorruptionCheckError(Exception):
+    pass
+
+
+class MatchingFile(TypedDict):
+    ingestId: str
+    s3Uri: str
+    size: int
+    eTag: Optional[str]
+    classification: str
+
+
+def get_max_concurrent_corruption_checks() -> int:
+    return int(environ.get(MAX_CONCURRENT_CORRUPTION_CHECKS_ENV_VAR, DEFAULT_MAX_CONCURRENT_CORRUPTION_CHECKS))
+
+
+def is_matching_file_corrupted(matching_file: MatchingFile) -> bool:
+    # Keys may contain '?' or '#', so we don't use urlparse here
+    _, key = matching_file["s3Uri"].removeprefix("s3://").split("/", 1)
+
+    # The filemanager toolkit has no bulk presigned url endpoint,
+    # so we presign each file in the worker thread that checks it
+    return is_file_corrupted(
+        presigned_url=get_presigned_url_from_ingest_id(matching_file["ingestId"]),
+        key=key
+    )
+
+
+def handler(event, context) -> Dict:
+    """
+    Input: fileList
+    Output: corruptedS3UriList
+    """
+    # Get inputs
+    file_list = event.get("fileList", [])
+
+    # A single client for the reads and writes of the check results
+    dynamodb_client = get_dynamodb_client()
+
+    # Skip the files we have already checked
+    stored_check_results = get_stored_check_results(file_list, dynamodb_client)
+    files_to_check = list(filter(
+        lambda file_iter_: file_iter_["ingestId"] not in stored_check_results,
+        file_list
+    ))
+    logger.info(f"Using stored check results for {len(stored_check_results)} of {len(file_list)} files")
+
+    corrupted_s3_uri_list = [
+        file_iter_["s3Uri"]
+        for file_iter_ in file_list
+        if stored_check_results.get(file_iter_["ingestId"], False)
+    ]
+
+    if len(files_to_check) == 0:
+        return {
+            "corruptedS3UriList": corrupted_s3_uri_list
+        }
+
+    # Run the streaming checks concurrently
+    failed_s3_uri_list: List[str] = []
+    check_results_buffer = CheckResultsBuffer(dynamodb_client)
+    with ThreadPoolExecutor(
+            max_workers=min(len(files_to_check), get_max_concurrent_corruption_checks())
+    ) as executor:
+        future_to_file = {
+            executor.submit(is_matching_file_corrupted, file_iter_): file_iter_
+            for file_iter_ in files_to_check
+        }
+        for future_iter_ in as_completed(future_to_file):
+            file_iter_ = future_to_file[future_iter_]
+            try:
+                is_corrupted = future_iter_.result()
+            except Exception as e:
+                logger.error(f"Could not check {file_iter_['s3Uri']}: {e}")
+                failed_s3_uri_list.append(file_iter_["s3Uri"])
+                continue
+
+            # Store the verdicts as we go (in batches), so a re-run only checks the delta
+            check_results_buffer.add({**file_iter_, "isCorrupted": is_corrupted})
+
+            if is_corrupted:
+                logger.info(f"Found corrupted file {file_iter_['s3Uri']}")
+                corrupted_s3_uri_list.append(file_iter_["s3Uri"])
+
+    # Store the rest of the verdicts
+    check_results_buffer.flush()
+
+    # The verdicts of the other files are stored, so the retry picks up from here
+    if len(failed_s3_uri_list) > 0:
+        raise CorruptionCheckError(
+            f"Could not check {len(failed_s3_uri_list)} of {len(files_to_check)} files, "
+            f"for example {failed_s3_uri_list[:5]}"
+        )
+
+    return {
+        "corruptedS3UriList": corrupted_s3_uri_list,
+    }
@@ -24,55 +24,51 @@ vcf
 xml
 
 We also accept bam files to check as well since we can use samtools validation for these
+
+The suffix, size and exclusion rules live in matching_rules.py
+
+4. Classify each matching file by its key, so the step function can route each file
+   to the right check without any further lambda or filemanager calls
+
+* bam: validated with samtools (ecs task)
+* bgzf-vcf: validated with bcftools (ecs task)
+* vcf: plain vcf, validated with bcftools (ecs task)
+* json: json / json.gz, must parse
+* html: must end in '</html>'
+* gzip: any other gzip file (plain gzip or bgzf), must decompress
+* text: everything else, must end in a newline
 """
 
 # Standard Imports
-import re
-from typing import List, Dict, Union, cast
-import math
+from typing import Dict, Iterator, List
 import logging
 
 # Layer imports
 from orcabus_api_tools.filemanager import get_s3_objs_from_ingest_ids_map
-from orcabus_api_tools.filemanager.models import FileObject
+
+# Local imports
+from matching_rules import iter_matching_files
 
 # Globals
-SUFFIX_LIST = [
-    "bed",
-    "cnv",
-    "csv",
-    "err",
-    "html",
-    "json",
-    "log",
-    "maf",
-    "pcf",
-    "seg",
-    "sf",
-    "tsv",
-    "txt",
-    "xml",
-    # Add bam/vcf files
-    # Since these are important
-    # And we can use tools to check their integrity
-    "vcf",
-    "bam"
-]
-
-# noinspection RegExpUnnecessaryNonCapturingGroup
-SUFFIX_REGEX_OBJ = re.compile(
-    rf".*(?:{"|".join(SUFFIX_LIST)})(?:.gz)?$"
-)
-
-# We want files that are a multiple of the block size of 1024
-# Since these are the ones most likely to be corrupted
-FILESIZE_DENOMINATOR = math.pow(2, 10)  # 1024
+# Number of ingest ids we query filemanager for at a time
+FILEMANAGER_PAGE_SIZE = 500
 
 # Set logging
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 
 
+def iter_file_object_dicts(ingest_id_list: List[str]) -> Iterator[Dict]:
+    """
+    Stream the ingest id / file object maps from filemanager, one page at a time,
+    so we never hold the full listing in memory
+    """
+    for page_start in range(0, len(ingest_id_list), FILEMANAGER_PAGE_SIZE):
+        yield from get_s3_objs_from_ingest_ids_map(
+            ingest_ids=ingest_id_list[page_start:page_start + FILEMANAGER_PAGE_SIZE]
+        )
+
+
 def handler(event, context):
     """
     Given a list of ingest ids,
@@ -84,59 +80,13 @@ def handler(event, context):
     ingest_id_list = event.get("ingestIdList")
 
     # Set outputs
-    matched_ingest_id_list = []
-
-    # Set files as objects
-    file_objects_dict_list: List[Dict[str, Union[FileObject | str]]] = get_s3_objs_from_ingest_ids_map(
-        ingest_ids=ingest_id_list
-    )
-
-    # Filter by filesizes
-    for file_object_iter_ in file_objects_dict_list:
-        # Get file object size
-        file_object_size = file_object_iter_.get("fileObject", {}).get("size")
-        file_object_key = file_object_iter_.get("fileObject", {}).get("key", "")
-
-        # Check if file object size to None
-        if file_object_size is None:
-            logger.warning("Didn't expect to get none for file object size")
-            continue
-
-        # Check if file object size is divisible by 65536
-        if (
-                # Not divisible by 1024, file not of interest (unless a vcf / bam file)
-                (
-                        not divmod(file_object_size, FILESIZE_DENOMINATOR)[-1] == 0 and
-                        not (
-                                file_object_key.endswith(".vcf.gz") or
-                                file_object_key.endswith(".bam")
-                        )
-                ) or
-                # File empty, also not of interest
-                file_object_size == 0 or
-                # Known bug for lilac fragments, we ignore these
-                file_object_key.endswith(".lilac.hlay.fragments.tsv") or
-                # And we ignore '/logs' for now too
-                "/logs/" in file_object_key
-        ):
-            continue
-
-        # Check if file key endswith text or text.gz
-        if file_object_key is None:
-            logger.warning("Didn't expect to get none for file object key")
-            continue
-
-        # Check file object key
-        if not SUFFIX_REGEX_OBJ.match(cast(str, file_object_key)):
-            # Not a file of interest
-            continue
-
-        # If we get to here, this is an ingest id of interest
-        matched_ingest_id_list.append(
-            file_object_iter_['ingestId']
-        )
+    matched_file_list = list(iter_matching_files(iter_file_object_dicts(ingest_id_list)))
 
     # Return response
     return {
-        "matchingIngestIds": matched_ingest_id_list
+        "matchingIngestIds": [
+            matched_file_iter_["ingestId"]
+            for matched_file_iter_ in matched_file_list
+        ],
+        "matchingFiles": matched_file_list,
     }
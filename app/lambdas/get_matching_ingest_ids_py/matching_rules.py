@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+"""
+Rule table for the get_matching_ingest_ids lambda
+
+A file object matches if
+* its key ends in one of the checked suffixes (optionally followed by .gz)
+* its size is a non-zero multiple of the 1024 byte block size (unless it is always checked, i.e vcf.gz / bam)
+* it is not excluded by its key suffix or by one of its path components
+
+All suffix rules are precompiled into tuples, so each rule is a single str.endswith call
+(a C loop over the tuple) rather than a regex match or a python loop.
+
+This module has no layer imports, so it can be imported by the benchmarks
+"""
+
+# Standard imports
+from typing import Dict, Iterable, Iterator, List, Literal, Optional, Tuple
+import logging
+
+# Set logging
+logger = logging.getLogger(__name__)
+
+# Globals
+SUFFIX_LIST = [
+    "bed",
+    "cnv",
+    "csv",
+    "err",
+    "html",
+    "json",
+    "log",
+    "maf",
+    "pcf",
+    "seg",
+    "sf",
+    "tsv",
+    "txt",
+    "xml",
+    # Add bam/vcf files
+    # Since these are important
+    # And we can use tools to check their integrity
+    "vcf",
+    "bam"
+]
+
+MATCHING_SUFFIXES: Tuple[str, ...] = tuple(SUFFIX_LIST) + tuple(f"{suffix}.gz" for suffix in SUFFIX_LIST)
+
+# We want files that are a multiple of the block size of 1024
+# Since these are the ones most likely to be corrupted
+FILESIZE_BLOCK_SIZE = 1 << 10  # 1024
+FILESIZE_BLOCK_MASK = FILESIZE_BLOCK_SIZE - 1
+
+# Files we always check, regardless of their size
+ALWAYS_CHECKED_SUFFIXES = (
+    ".vcf.gz",
+    ".bam",
+)
+
+# Known bug for lilac fragments, we ignore these
+EXCLUDED_SUFFIXES = (
+    ".lilac.hlay.fragments.tsv",
+)
+
+# And we ignore '/logs' for now too
+EXCLUDED_PATH_COMPONENTS = (
+    "/logs/",
+)
+
+# File classifications, the first matching suffix wins
+FileClassificationType = Literal[
+    'bam',
+    'bgzf-vcf',
+    'vcf',
+    'json',
+    'html',
+    'gzip',
+    'text',
+]
+
+CLASSIFICATION_SUFFIX_LIST: List[Tuple[str, FileClassificationType]] = [
+    (".bam", "bam"),
+    (".vcf.gz", "bgzf-vcf"),
+    (".vcf", "vcf"),
+    (".json", "json"),
+    (".json.gz", "json"),
+    (".html", "html"),
+    (".gz", "gzip"),
+]
+
+
+def get_file_classification(key: str) -> FileClassificationType:
+    for suffix_iter_, classification_iter_ in CLASSIFICATION_SUFFIX_LIST:
+        if key.endswith(suffix_iter_):
+            return classification_iter_
+    return "text"
+
+
+def is_matching_file(key: str, size: int) -> bool:
+    # File empty, not of interest
+    if size == 0:
+        return False
+
+    # Not a multiple of the block size, not of interest (unless always checked)
+    if size & FILESIZE_BLOCK_MASK and not key.endswith(ALWAYS_CHECKED_SUFFIXES):
+        return False
+
+    if not key.endswith(MATCHING_SUFFIXES) or key.endswith(EXCLUDED_SUFFIXES):
+        return False
+
+    return not any(
+        path_component_iter_ in key
+        for path_component_iter_ in EXCLUDED_PATH_COMPONENTS
+    )
+
+
+def get_matching_file(file_object_dict: Dict) -> Optional[Dict]:
+    """
+    Get the matching file (ingestId, s3Uri, size, eTag, classification) from an ingest id / file object map,
+    or None if the file is not of interest
+    """
+    file_object = file_object_dict.get("fileObject", {})
+    file_object_key = file_object.get("key")
+    file_object_size = file_object.get("size")
+
+    if file_object_key is None or file_object_size is None:
+        logger.warning(f"Didn't expect to get none for the file object key or size of {file_object_dict.get('ingestId')}")
+        return None
+
+    if not is_matching_file(file_object_key, file_object_size):
+        return None
+
+    return {
+        "ingestId": file_object_dict["ingestId"],
+        "s3Uri": f"s3://{file_object['bucket']}/{file_object_key}",
+        "size": file_object_size,
+        "eTag": file_object.get("eTag"),
+        "classification": get_file_classification(file_object_key),
+    }
+
+
+def iter_matching_files(file_object_dicts: Iterable[Dict]) -> Iterator[Dict]:
+    for file_object_dict_iter_ in file_object_dicts:
+        matching_file = get_matching_file(file_object_dict_iter_)
+        if matching_file is not None:
+            yield matching_file
@@ -5,24 +5,85 @@ Given a portal run id, this function performs the following steps:
 
 * Finds any files using the portal run id as a tag
 * Returns all ingest ids
+
+If writeManifest is set, the ingest ids are instead written to a JSONL manifest
+in the artefacts bucket (one {"ingestId": ...} object per line), and we only return the manifest location.
+Large runs would otherwise exceed the 256 KB step function payload limit.
+The distributed map reads the manifest with an ItemReader.
 """
 
 # Standard imports
+import json
+import typing
+from os import environ
+from tempfile import TemporaryFile
+from typing import Iterable, Iterator
+from uuid import uuid4
+
+import boto3
 
 # Orcabus imports
 from orcabus_api_tools.filemanager import list_files_from_portal_run_id
 
+if typing.TYPE_CHECKING:
+    from mypy_boto3_s3 import S3Client
+
+# Globals
+S3_ANALYSIS_ARTEFACTS_BUCKET_NAME_ENV_VAR = "S3_ANALYSIS_ARTEFACTS_BUCKET_NAME"
+S3_INGEST_ID_MANIFESTS_KEY_PREFIX_ENV_VAR = "S3_INGEST_ID_MANIFESTS_KEY_PREFIX"
+
+
+def get_s3_client() -> 'S3Client':
+    return boto3.client('s3')
+
+
+def iter_ingest_ids(portal_run_id: str) -> Iterator[str]:
+    for file_object_iter_ in list_files_from_portal_run_id(portal_run_id):
+        yield file_object_iter_.get("ingestId")
+
+
+def write_ingest_id_manifest(portal_run_id: str, ingest_ids: Iterable[str]) -> typing.Dict:
+    """
+    Write the ingest ids to a JSONL manifest line by line, and upload the manifest to the artefacts bucket
+    """
+    manifest_bucket = environ[S3_ANALYSIS_ARTEFACTS_BUCKET_NAME_ENV_VAR]
+    manifest_key = f"{environ[S3_INGEST_ID_MANIFESTS_KEY_PREFIX_ENV_VAR]}{portal_run_id}/{uuid4()}.jsonl"
+
+    ingest_id_count = 0
+    with TemporaryFile() as manifest_h:
+        for ingest_id in ingest_ids:
+            manifest_h.write((json.dumps({"ingestId": ingest_id}) + "\n").encode())
+            ingest_id_count += 1
+        manifest_h.seek(0)
+
+        get_s3_client().upload_fileobj(
+            manifest_h,
+            Bucket=manifest_bucket,
+            Key=manifest_key,
+            ExtraArgs={
+                "ContentType": "application/jsonl"
+            }
+        )
+
+    return {
+        "manifestBucket": manifest_bucket,
+        "manifestKey": manifest_key,
+        "ingestIdCount": ingest_id_count,
+    }
+
+
 def handler(event, context):
     """
-    Given a portal run id, return all ingest ids
+    Given a portal run id, return all ingest ids (or the location of the ingest id manifest)
     """
 
     # Set inputs
     portal_run_id = event.get("portalRunId")
+    write_manifest = event.get("writeManifest", False)
+
+    if write_manifest:
+        return write_ingest_id_manifest(portal_run_id, iter_ingest_ids(portal_run_id))
 
     return {
-        "ingestIdList": list(map(
-            lambda file_object_iter_: file_object_iter_.get("ingestId"),
-            list_files_from_portal_run_id(portal_run_id)
-        ))
+        "ingestIdList": list(iter_ingest_ids(portal_run_id))
     }
@@ -1,27 +1,25 @@
 #!/usr/bin/env python3
 
 """
-Get the icav2 analysis object from the workflow name
+Get the pipeline language (CWL or NEXTFLOW) of an icav2 wes analysis from the workflow name
+
+The language is stored on the analysis record at launch time,
+older records fall back to the pipeline metadata cache.
 """
 
 # Standard Library Imports
 from typing import Dict, Any
 
-# Wrapica imports
-from wrapica.project_analysis import get_analysis_obj_from_analysis_id
-
 # Layer imports
 from icav2_tools import set_icav2_env_vars
 from orcabus_api_tools.icav2_wes import get_icav2_wes_analysis_by_name
+from icav2_wes_manager_tools.pipeline_metadata_cache import get_pipeline_metadata
 
 
 def handler(event, context) -> Dict[str, Any]:
     """
     Get the ICAv2 WES Object
     """
-    # Set the environment variables for icav2
-    set_icav2_env_vars()
-
     # Get the analysis name from the event
     name = event.get("name")
     if not name:
@@ -32,16 +30,22 @@ def handler(event, context) -> Dict[str, Any]:
         analysis_name=name
     )
 
-    # Get the pipeline id
-    project_id = icav2_wes_object.get("engineParameters", {}).get("projectId")
-    analysis_id = icav2_wes_object.get("icav2AnalysisId")
+    # Stored on the analysis record at launch time
+    if icav2_wes_object.get("pipelineLanguage") is not None:
+        return {
+            "language": icav2_wes_object.get("pipelineLanguage")
+        }
 
-    # Get analysis object
-    analysis_obj = get_analysis_obj_from_analysis_id(
-        project_id=project_id,
-        analysis_id=analysis_id
-    )
+    # Set the environment variables for icav2
+    set_icav2_env_vars()
+
+    # Get the project and pipeline id
+    project_id = icav2_wes_object.get("engineParameters", {}).get("projectId")
+    pipeline_id = icav2_wes_object.get("engineParameters", {}).get("pipelineId")
 
     return {
-        "language": analysis_obj.pipeline.language
+        "language": get_pipeline_metadata(
+            project_id=project_id,
+            pipeline_id=pipeline_id
+        )['language']
     }
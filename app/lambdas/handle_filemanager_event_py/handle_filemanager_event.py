@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+"""
+Handle a filemanager event
+
+Triggered by the filemanager's object created events on the OrcaBus event bus,
+for keys under the icav2 output prefix (the event detail is the lambda input).
+
+When the filemanager sync lambda finds files missing from the filemanager, it registers the missing keys
+against the portal run id in the callback table (along with the task token of the waiting step function),
+see filemanager_sync.py.
+
+For each event, we tick the key off the registered key set of its portal run id,
+the output prefix always contains the portal run id, so we look up the portal run id candidates in the key.
+
+Once the last key is ticked off, we resume the waiting step function,
+which then updates the portal run id attributes and confirms the filemanager is in sync with one more reconciliation.
+"""
+
+# Standard imports
+import re
+from typing import List
+import logging
+
+# Layer imports
+from icav2_wes_manager_tools.filemanager_sync_registration import (
+    tick_off_keys,
+    resume_filemanager_sync
+)
+
+# Set logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Globals
+# Portal run ids are a date stamp followed by 8 hex characters, i.e 20250101abcd1234
+PORTAL_RUN_ID_REGEX = re.compile(r"^\d{8}[0-9a-f]{8}$")
+
+
+def get_portal_run_id_candidates(key: str) -> List[str]:
+    return list(filter(
+        lambda path_component_iter_: PORTAL_RUN_ID_REGEX.match(path_component_iter_) is not None,
+        key.split("/")[:-1]
+    ))
+
+
+def handler(event, context):
+    """
+    Input: the detail of a filemanager object created event (bucket, key)
+    """
+    bucket = event['bucket']
+    key = event['key']
+
+    for portal_run_id in get_portal_run_id_candidates(key):
+        if tick_off_keys(portal_run_id, bucket, [key]):
+            logger.info(f"All missing keys have been ingested for {portal_run_id}, resuming the filemanager sync")
+            resume_filemanager_sync(portal_run_id)
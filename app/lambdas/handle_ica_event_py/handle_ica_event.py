@@ -23,6 +23,9 @@ from aws_durable_execution_sdk_python.config import (
 from aws_durable_execution_sdk_python.retries import create_retry_strategy
 from aws_durable_execution_sdk_python.types import WaitForCallbackContext
 
+# Layer imports
+from icav2_wes_manager_tools.tracing import record_elapsed_since, span
+
 # Type hints
 if typing.TYPE_CHECKING:
     from mypy_boto3_stepfunctions.client import SFNClient
@@ -88,44 +91,46 @@ def handle_ica_execution(
         Write callback to dynamodb and then start the execution
         """
         callback_context.logger.info("Writing callback id to dynamodb")
-        get_dynamodb_client().put_item(
-            Item={
-                "id": {
-                    "S": icav2_wes_orcabus_id,
-                },
-                "id_type": {
-                    "S": status
+        with span("dynamodb.put_callback", icav2_wes_orcabus_id, status=status):
+            get_dynamodb_client().put_item(
+                Item={
+                    "id": {
+                        "S": icav2_wes_orcabus_id,
+                    },
+                    "id_type": {
+                        "S": status
+                    },
+                    "callback_id": {
+                        "S": callback_id
+                    },
+                    "ttl": {
+                        # Add 24 hours to current epoch timestamp
+                        "N": str(
+                            int(datetime.now(UTC).timestamp()) +
+                            SECONDS_PER_DAY
+                        )
+                    }
                 },
-                "callback_id": {
-                    "S": callback_id
-                },
-                "ttl": {
-                    # Add 24 hours to current epoch timestamp
-                    "N": str(
-                        int(datetime.now(UTC).timestamp()) +
-                        SECONDS_PER_DAY
-                    )
-                }
-            },
-            TableName=environ[CALLBACK_DATABASE_NAME_ENV_VAR]
-        )
+                TableName=environ[CALLBACK_DATABASE_NAME_ENV_VAR]
+            )
 
         # Step 3: Launch the step function (asynchronously)
         callback_context.logger.info("Start sfn execution")
-        execution = get_sfn_client().start_execution(
-            stateMachineArn=environ[HANDLE_ICA_ANALYSIS_STATE_CHANGE_SFN_ARN_ENV_VAR],
-            input=json.dumps(
-                {
-                    "icav2AnalysisId": icav2_analysis_id,
-                    "status": status,
-                    "name": name,
-                    "errorMessage": error_message,
-                    "icav2WesOrcabusId": icav2_wes_orcabus_id,
-                    "messageReceiptHandleToken": message_receipt_handle_token
-                },
-                separators=(",", ":")
+        with span("sfn.start_execution", icav2_wes_orcabus_id, status=status):
+            execution = get_sfn_client().start_execution(
+                stateMachineArn=environ[HANDLE_ICA_ANALYSIS_STATE_CHANGE_SFN_ARN_ENV_VAR],
+                input=json.dumps(
+                    {
+                        "icav2AnalysisId": icav2_analysis_id,
+                        "status": status,
+                        "name": name,
+                        "errorMessage": error_message,
+                        "icav2WesOrcabusId": icav2_wes_orcabus_id,
+                        "messageReceiptHandleToken": message_receipt_handle_token
+                    },
+                    separators=(",", ":")
+                )
             )
-        )
         callback_context.logger.info(f"Running sfn execution {execution['executionArn']}")
 
     # Wait here for the callback to be invoked by the step function
@@ -184,6 +189,11 @@ def handler(event, context: DurableContext):
         except StopIteration:
             raise ValueError("Missing icav2 wes orcabus id in technical tags")
 
+        # Time from the ICAv2 state change to its delivery off the queue
+        record_elapsed_since(
+            "ica.event_delivery", icav2_wes_orcabus_id, record_body.get("timestamp"), status=payload.get("status")
+        )
+
         # Start handle ica execution with a callback step
         handle_ica_execution(
             icav2_wes_orcabus_id=icav2_wes_orcabus_id,
@@ -8,32 +8,41 @@ Given the name, inputs, engine parameters, launch the analysis on ICAv2!
 
 # Standard imports
 import typing
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
 from pathlib import Path
 from tempfile import NamedTemporaryFile
-from typing import Dict, Optional, cast, Literal, Any
+from typing import Dict, Optional, cast, Literal, Any, List, Set
 from fastapi.encoders import jsonable_encoder
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import BotoCoreError, ClientError
 from datetime import datetime, timezone
-from urllib.parse import urlunparse
-import gzip
-from time import sleep
+from urllib.parse import urlunparse, urlparse
+import io
+import json
+import zlib
+import base64
+from time import sleep, monotonic
 import logging
 from os import environ
 
 # Wrapica imports
 from wrapica.literals import AnalysisStorageSizeType
-from wrapica.project_pipelines import (
-    ICAv2PipelineAnalysisTags,
-    get_project_pipeline_obj
-)
+from wrapica.project_pipelines import ICAv2PipelineAnalysisTags
+from wrapica.project_data import get_project_data_obj_by_id
 
 # Layer imports
 from icav2_tools import set_icav2_env_vars
+from orcabus_api_tools.icav2_wes import update_icav2_wes_analysis_status
+from icav2_wes_manager_tools.pipeline_metadata_cache import get_pipeline_metadata
+from icav2_wes_manager_tools.tracing import record_elapsed_since, span
 
 # Type hints
 if typing.TYPE_CHECKING:
     from mypy_boto3_s3 import S3Client
+    from mypy_boto3_sqs import SQSClient
+    from wrapica.project_data import ProjectData
 
 # Set up logging
 logger = logging.getLogger()
@@ -46,6 +55,64 @@ WesAnalysisStorageSizeType = Literal[
     'XLARGE', '2XLARGE', '3XLARGE',
 ]
 
+# Readiness polling of uploaded input data (i.e. nf-core samplesheets)
+DATA_READY_STATUS = 'AVAILABLE'
+DATA_READY_INITIAL_BACKOFF_SECONDS = 0.25
+DATA_READY_MAX_BACKOFF_SECONDS = 4
+DATA_READY_DEADLINE_SECONDS = 60
+MAX_CONCURRENT_DATA_READY_LOOKUPS = 8
+
+# Streaming upload of the analysis launch payload
+GZIP_WBITS = 16 + zlib.MAX_WBITS  # Write a gzip header and trailer
+GZIP_READ_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+# Payloads smaller than the threshold are sent in a single put, larger payloads in a multipart upload
+PAYLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+)
+
+# Asynchronous archival of the analysis launch payload
+ASYNC_PAYLOAD_ARCHIVE_ENABLED_ENV_VAR = 'ASYNC_PAYLOAD_ARCHIVE_ENABLED'
+PAYLOAD_ARCHIVE_QUEUE_URL_ENV_VAR = 'PAYLOAD_ARCHIVE_QUEUE_URL'
+SQS_MAX_MESSAGE_SIZE_BYTES = 256 * 1024  # The default (and maximum) message size of the archive queue
+# The compressed payload is base64 encoded into the message body (4 bytes for every 3),
+# so leave some headroom under the SQS message limit for the encoding and the rest of the message body
+MAX_ASYNC_PAYLOAD_ARCHIVE_SIZE_BYTES = 190 * 1024
+
+
+# Classes
+class GzipCompressingReader(io.RawIOBase):
+    """
+    Read-only file object that gzip compresses the source file object as it is read,
+    so we can hand it straight to upload_fileobj without writing the compressed data anywhere
+    """
+    def __init__(self, source: typing.BinaryIO, chunk_size: int = GZIP_READ_CHUNK_SIZE):
+        super().__init__()
+        self._source = source
+        self._chunk_size = chunk_size
+        self._compressor = zlib.compressobj(wbits=GZIP_WBITS)
+        self._buffer = bytearray()
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill_buffer(self, size: int):
+        while not self._eof and len(self._buffer) < size:
+            chunk = self._source.read(self._chunk_size)
+            if not chunk:
+                self._buffer.extend(self._compressor.flush())
+                self._eof = True
+            else:
+                self._buffer.extend(self._compressor.compress(chunk))
+
+    def readinto(self, b) -> int:
+        self._fill_buffer(len(b))
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        del self._buffer[:size]
+        return size
+
 
 # Custom errors
 class CreateAnalysisInputFailure(Exception):
@@ -99,6 +166,166 @@ def map_wes_analysis_storage_size_to_icav2(storage_size: WesAnalysisStorageSizeT
     return mapping[storage_size]
 
 
+def is_uri_input(value: Any) -> bool:
+    """
+    True if the input json value references existing data (a uri, or a list of uris)
+    """
+    if isinstance(value, str):
+        return "://" in value
+    if isinstance(value, list):
+        return len(value) > 0 and all(map(is_uri_input, value))
+    return False
+
+
+def get_uploaded_data_ids(analysis_input, inputs: Dict[str, Any]) -> Set[str]:
+    """
+    Get the data ids of the inputs that were uploaded while creating the analysis input (i.e. nf-core samplesheets),
+    inputs given as uris in the input json already exist in ICAv2, so their (possibly hundreds of) data ids are skipped
+    """
+    data_ids = set()
+    for data_input_iter in (getattr(analysis_input, 'inputs', None) or []):
+        if is_uri_input(inputs.get(getattr(data_input_iter, 'parameter_code', None))):
+            continue
+        data_ids.update(getattr(data_input_iter, 'data_ids', None) or [])
+    return data_ids
+
+
+def get_pending_uploaded_data_ids(
+        project_id: str,
+        data_ids: Set[str],
+        cache_uri: Optional[str] = None
+) -> Set[str]:
+    """
+    Get each data object by its id (a few at a time), and return the ids of those that are not yet AVAILABLE.
+    When the cache uri is given, data objects outside of the cache folder are dropped.
+    """
+    cache_path = urlparse(cache_uri).path if cache_uri is not None else None
+
+    def _is_pending(data_id: str) -> bool:
+        project_data_obj = get_project_data_obj_by_id(
+            project_id=project_id,
+            data_id=data_id
+        )
+        if cache_path is not None and not project_data_obj.data.details.path.startswith(cache_path):
+            return False
+        return project_data_obj.data.details.status != DATA_READY_STATUS
+
+    if len(data_ids) == 0:
+        return set()
+
+    data_ids_list = list(data_ids)
+    with ThreadPoolExecutor(max_workers=min(len(data_ids_list), MAX_CONCURRENT_DATA_READY_LOOKUPS)) as executor:
+        return set(
+            data_id_iter_
+            for data_id_iter_, is_pending_iter_ in zip(data_ids_list, executor.map(_is_pending, data_ids_list))
+            if is_pending_iter_
+        )
+
+
+def wait_for_uploaded_data_to_be_available(
+        analysis_input,
+        inputs: Dict[str, Any],
+        project_id: str,
+        cache_uri: str
+):
+    """
+    Poll the data objects uploaded while creating the analysis input until they are all AVAILABLE.
+    Only the data ids still pending are polled, so the cost of a poll does not depend on the size of the cache folder.
+    Uses exponential backoff, if the deadline is reached we launch anyway and let ICAv2 decide.
+    """
+    deadline = monotonic() + DATA_READY_DEADLINE_SECONDS
+    backoff_seconds = DATA_READY_INITIAL_BACKOFF_SECONDS
+
+    # The first poll also drops the data ids outside of the cache folder
+    pending_data_ids = get_pending_uploaded_data_ids(
+        project_id,
+        get_uploaded_data_ids(analysis_input, inputs),
+        cache_uri
+    )
+
+    while len(pending_data_ids) > 0:
+        if monotonic() + backoff_seconds > deadline:
+            logger.warning(
+                f"{len(pending_data_ids)} uploaded input files are still not available after "
+                f"{DATA_READY_DEADLINE_SECONDS} seconds, launching anyway"
+            )
+            return
+
+        logger.info(f"Waiting on {len(pending_data_ids)} uploaded input files to be available")
+        sleep(backoff_seconds)
+        backoff_seconds = min(backoff_seconds * 2, DATA_READY_MAX_BACKOFF_SECONDS)
+
+        pending_data_ids = get_pending_uploaded_data_ids(project_id, pending_data_ids)
+
+
+def is_async_payload_archive_enabled() -> bool:
+    return (
+        environ.get(ASYNC_PAYLOAD_ARCHIVE_ENABLED_ENV_VAR, 'false').lower() == 'true' and
+        environ.get(PAYLOAD_ARCHIVE_QUEUE_URL_ENV_VAR) is not None
+    )
+
+
+def get_s3_payload_uri(upload_path: str) -> str:
+    return str(urlunparse((
+        's3',
+        environ['S3_ANALYSIS_ARTEFACTS_BUCKET_NAME'],
+        str(upload_path),
+        None, None, None
+    )))
+
+
+def upload_analysis_payload(analysis_json_fileobj: typing.BinaryIO, upload_path: str) -> str:
+    """
+    Compress the analysis json as it is uploaded to S3, returns the s3 uri of the payload
+    """
+    s3_client: 'S3Client' = boto3.client('s3')
+    s3_client.upload_fileobj(
+        Fileobj=GzipCompressingReader(analysis_json_fileobj),
+        Bucket=environ['S3_ANALYSIS_ARTEFACTS_BUCKET_NAME'],
+        Key=upload_path,
+        Config=PAYLOAD_TRANSFER_CONFIG
+    )
+
+    return get_s3_payload_uri(upload_path)
+
+
+def queue_analysis_payload_archive(
+        analysis_json_fileobj: typing.BinaryIO,
+        upload_path: str,
+        icav2_wes_orcabus_id: str,
+) -> bool:
+    """
+    Send the compressed analysis payload to the archive queue, the archiver lambda uploads it to S3
+    and records the uri in the payloads table.
+    Returns False if the message would be too large for SQS (only up to one byte over the limit
+    is ever compressed into memory) or if it could not be sent, the caller then streams the upload instead.
+    The analysis has already been launched by now, so we never fail the launch on the archival.
+    """
+    payload_gz = GzipCompressingReader(analysis_json_fileobj).read(MAX_ASYNC_PAYLOAD_ARCHIVE_SIZE_BYTES + 1)
+    if len(payload_gz) > MAX_ASYNC_PAYLOAD_ARCHIVE_SIZE_BYTES:
+        return False
+
+    message_body = json.dumps({
+        "icav2WesOrcabusId": icav2_wes_orcabus_id,
+        "uploadPath": upload_path,
+        "payloadGzipBase64": base64.b64encode(payload_gz).decode('ascii'),
+    })
+    if len(message_body.encode('utf-8')) > SQS_MAX_MESSAGE_SIZE_BYTES:
+        return False
+
+    sqs_client: 'SQSClient' = boto3.client('sqs')
+    try:
+        sqs_client.send_message(
+            QueueUrl=environ[PAYLOAD_ARCHIVE_QUEUE_URL_ENV_VAR],
+            MessageBody=message_body
+        )
+    except (BotoCoreError, ClientError) as e:
+        logger.warning(f"Could not queue the analysis launch object for archival, uploading it instead: {e}")
+        return False
+
+    return True
+
+
 def handler(event, context):
     """
     We expect the following event attributes
@@ -136,13 +363,17 @@ def handler(event, context):
     analysis_output_uri: str = engine_parameters['outputUri']
     ica_logs_uri: str = engine_parameters['logsUri']
 
-    # Get the pipeline object (to get the workflow language type)
-    logger.info("Getting the pipeline object")
+    # Time from the start of the launch step function execution to the launch lambda
+    record_elapsed_since("launch.sfn_to_lambda", id_, event.get('executionStartTime'))
+
+    # Get the pipeline metadata (to get the workflow language type)
+    logger.info("Getting the pipeline metadata")
     try:
-        pipeline_obj = get_project_pipeline_obj(
-            project_id=project_id,
-            pipeline_id=pipeline_id
-        ).pipeline
+        with span("icav2.get_pipeline_metadata", id_):
+            pipeline_metadata = get_pipeline_metadata(
+                project_id=project_id,
+                pipeline_id=pipeline_id
+            )
     except Exception as e:
         logger.error(f"Error getting the pipeline object: {e}")
         raise PipelineNotFoundFailure(f"Pipeline with id {pipeline_id} not found in project {project_id}") from e
@@ -158,10 +389,28 @@ def handler(event, context):
             wes_analysis_storage_size)
     else:
         # Get the default analysis storage size from the pipeline object
-        analysis_storage_size = cast(AnalysisStorageSizeType, pipeline_obj.analysis_storage.name)
+        analysis_storage_size = cast(AnalysisStorageSizeType, pipeline_metadata['analysisStorageSize'])
 
     # Get the workflow type, one of CWL or NEXTFLOW
-    workflow_type = pipeline_obj.language
+    workflow_type = pipeline_metadata['language']
+
+    # Mark the analysis as RUNNABLE, the pipeline language is stored with the same status update
+    logger.info("Updating the WES API with the RUNNABLE status")
+    with span("wes_api.update_status", id_, status="RUNNABLE"):
+        update_icav2_wes_analysis_status(
+            id_,
+            status='RUNNABLE',
+            **dict(filter(
+                lambda kv_iter_: kv_iter_[1] is not None,
+                {
+                    "stepsLaunchExecutionArn": event.get('stepsLaunchExecutionArn'),
+                    "pipelineLanguage": workflow_type,
+                }.items()
+            ))
+        )
+
+    # Only nextflow pipelines upload data (samplesheets) while creating the analysis input
+    cache_uri: Optional[str] = None
 
     # Imports based on workflow type
     logger.info("Generating the ICAv2 Analysis Input Object")
@@ -195,11 +444,13 @@ def handler(event, context):
     # Initialise an ICAv2CWLPipeline Analysis object
     logger.info("Generating the analysis object")
     try:
+        with span("icav2.create_analysis_input", id_, workflowType=workflow_type.lower()):
+            analysis_input = icav2_analysis_input_obj.create_analysis_input()
         analysis_obj = ICAv2PipelineAnalysis(
             user_reference=name,
             project_id=project_id,
             pipeline_id=pipeline_id,
-            analysis_input=icav2_analysis_input_obj.create_analysis_input(),
+            analysis_input=analysis_input,
             analysis_storage_size=analysis_storage_size,
             analysis_output_uri=analysis_output_uri,
             ica_logs_uri=ica_logs_uri,
@@ -213,22 +464,24 @@ def handler(event, context):
         logger.error(f"Error generating the analysis object: {e}")
         raise CreateAnalysisInputFailure(f"Failed to create analysis input object, error was {e}") from e
 
-    # Wait a few seconds for the samplesheet to be available in ICAv2
-    sleep(5)
+    # Wait for any uploaded samplesheets to be available in ICAv2
+    if cache_uri is not None:
+        with span("icav2.wait_for_uploaded_data", id_):
+            wait_for_uploaded_data_to_be_available(analysis_input, inputs, project_id, cache_uri)
 
     # Generate the inputs and analysis object
     # Call the object to launch it
     logger.info("Launching the analysis object")
     try:
-        analysis_launch_obj = analysis_obj(
-            idempotency_key=id_
-        )
+        with span("icav2.launch_analysis", id_):
+            analysis_launch_obj = analysis_obj(
+                idempotency_key=id_
+            )
     except Exception as e:
         logger.error(f"Error launching the analysis object: {e}")
         raise AnalysisLaunchFailure("Failed to launch analysis") from e
 
     # Get the current date and upload path
-    logger.info("Uploading the analysis launch object to S3")
     now = datetime.now(timezone.utc)
     upload_path = str(
         Path(environ['S3_ANALYSIS_PAYLOAD_KEY_PREFIX']) /
@@ -239,37 +492,28 @@ def handler(event, context):
     )
 
     # Save the analysis object to a temporary file
-    with (
-        NamedTemporaryFile(suffix='.json') as temp_file_json,
-        NamedTemporaryFile(suffix='.json.gz') as temp_file_gz
-    ):
-        # Save and flush to first json
+    # (wrapica only serialises the analysis to a path)
+    with NamedTemporaryFile(suffix='.json') as temp_file_json:
+        # Save and flush the json
         analysis_obj.save_analysis(Path(temp_file_json.name))
         temp_file_json.flush()
+        temp_file_json.seek(0)
 
-        # Gzip compress the analysis json
-        with gzip.GzipFile(fileobj=temp_file_gz, mode="wb") as gz_file:
-            # Now go back to the start of the json file and write to gz
+        # Hand the payload off to the archiver so we don't wait on the S3 upload,
+        # the archiver records the payload uri once it has been uploaded
+        s3_payload_uri: Optional[str] = None
+        with span("sqs.queue_payload_archive", id_):
+            is_payload_archive_queued = (
+                is_async_payload_archive_enabled() and
+                queue_analysis_payload_archive(temp_file_json, upload_path, id_)
+            )
+        if is_payload_archive_queued:
+            logger.info("Queued the analysis launch object for archival")
+        else:
+            logger.info("Uploading the analysis launch object to S3")
             temp_file_json.seek(0)
-            gz_file.write(temp_file_json.read())
-
-        # Write out the gzip file to the temp file
-        temp_file_gz.flush()
-
-        # Upload the analysis json to S3
-        s3_client: 'S3Client' = boto3.client('s3')
-        s3_client.upload_file(
-            Filename=temp_file_gz.name,
-            Bucket=environ['S3_ANALYSIS_ARTEFACTS_BUCKET_NAME'],
-            Key=upload_path
-        )
-
-    s3_payload_uri = str(urlunparse((
-        's3',
-        environ['S3_ANALYSIS_ARTEFACTS_BUCKET_NAME'],
-        str(upload_path),
-        None, None, None
-    )))
+            with span("s3.upload_payload", id_):
+                s3_payload_uri = upload_analysis_payload(temp_file_json, upload_path)
 
     logger.info("Finished launching the analysis")
 
@@ -4,7 +4,6 @@
 Given an analysis id, find the analysis id in the database and update the status on the ICAv2 wes api.
 """
 # Standard imports
-from tempfile import NamedTemporaryFile
 from typing import Dict
 from urllib.parse import urlunparse
 import typing
@@ -19,6 +18,7 @@ from orcabus_api_tools.icav2_wes import (
     get_icav2_wes_analysis_by_name,
     update_icav2_wes_analysis_status
 )
+from icav2_wes_manager_tools.tracing import record_elapsed_since, span
 
 if typing.TYPE_CHECKING:
     from mypy_boto3_s3 import S3Client
@@ -33,6 +33,7 @@ logger.setLevel(logging.INFO)
 # Globals
 S3_ANALYSIS_ERROR_LOGS_PREFIX_ENV_VAR = 'S3_ANALYSIS_ERROR_LOGS_PREFIX'
 S3_ANALYSIS_ARTEFACTS_BUCKET_NAME_ENV_VAR = 'S3_ANALYSIS_ARTEFACTS_BUCKET_NAME'
+TERMINAL_STATUSES = ['SUCCEEDED', 'FAILED', 'ABORTED']
 
 
 def handler(event, context) -> Dict:
@@ -46,6 +47,9 @@ def handler(event, context) -> Dict:
     # Get the name from the event
     name = event.get("name")
 
+    # The trace id (the icav2 wes orcabus id), if the caller has it
+    trace_id = event.get("icav2WesOrcabusId")
+
     # Get the status from the event
     status = event.get("status")
 
@@ -55,6 +59,13 @@ def handler(event, context) -> Dict:
     # Get the steps execution arn if present
     steps_execution_arn = event.get("stepsLaunchExecutionArn")
 
+    # Get the pipeline language if present (set at launch time)
+    pipeline_language = event.get("pipelineLanguage")
+
+    # Get the timing metadata if present (set by the analysis state change step function)
+    icav2_end_time = event.get("icav2EndTime")
+    post_processing_stage = event.get("postProcessingStage")
+
     # Get the errorMessage and errorType if they are present
     error_type = event.get("errorType")
     error_message = event.get("errorMessage")
@@ -66,7 +77,8 @@ def handler(event, context) -> Dict:
         # icav2 analysis id might be none if this is a CreateFailure
         # use the orcabus id instead
         if icav2_analysis_id is None:
-            icav2_analysis_id = get_icav2_wes_analysis_by_name(name)['id']
+            with span("wes_api.get_analysis_by_name", trace_id):
+                icav2_analysis_id = get_icav2_wes_analysis_by_name(name)['id']
         # Get the current date and upload path
         logger.info("Uploading the error logs to S3")
         now = datetime.now(timezone.utc)
@@ -77,20 +89,14 @@ def handler(event, context) -> Dict:
             f"day={now.day:02d}" /
             f"{icav2_analysis_id}.txt"
         )
-        # Save the analysis object to a temporary file
-        with (
-            NamedTemporaryFile(suffix='.txt') as temp_error_message,
-        ):
-            # Write the error message to the temp file
-            temp_error_message.write(error_message.encode('utf-8'))
-            temp_error_message.flush()
-
-            # Upload the analysis json to S3
-            s3_client: 'S3Client' = boto3.client('s3')
-            s3_client.upload_file(
-                Filename=temp_error_message.name,
+        # Upload the error message to S3 straight from memory
+        s3_client: 'S3Client' = boto3.client('s3')
+        with span("s3.put_error_log", trace_id):
+            s3_client.put_object(
+                Body=error_message.encode('utf-8'),
                 Bucket=environ[S3_ANALYSIS_ARTEFACTS_BUCKET_NAME_ENV_VAR],
-                Key=upload_path
+                Key=upload_path,
+                ContentType='text/plain; charset=utf-8'
             )
 
         s3_payload_uri = str(urlunparse((
@@ -101,27 +107,42 @@ def handler(event, context) -> Dict:
         )))
 
     # Get the analysis object
-    analysis_object = get_icav2_wes_analysis_by_name(
-        analysis_name=name
-    )
+    with span("wes_api.get_analysis_by_name", trace_id):
+        analysis_object = get_icav2_wes_analysis_by_name(
+            analysis_name=name
+        )
+    trace_id = analysis_object['id']
 
     # Update the status on the ICAv2 WES API
-    update_response = update_icav2_wes_analysis_status(
-        analysis_object['id'],
-        **dict(filter(
-            lambda kv_iter_: kv_iter_ is not None,
-            {
-                # Keyword (packed) args in camelCase
-                "status": status,
-                "icav2AnalysisId": icav2_analysis_id,
-                # Steps execution arn (not yet implemented)
-                "stepsLaunchExecutionArn": steps_execution_arn,
-                # Error messages
-                "errorType": error_type,
-                "errorMessageUri": s3_payload_uri,
-            }.items()
-        ))
-    )
+    # Status is None for metadata only updates (i.e. a post-processing stage)
+    with span("wes_api.update_status", trace_id, status=str(status)):
+        update_response = update_icav2_wes_analysis_status(
+            analysis_object['id'],
+            status=status,
+            **dict(filter(
+                lambda kv_iter_: kv_iter_[1] is not None,
+                {
+                    # Keyword (packed) args in camelCase
+                    "icav2AnalysisId": icav2_analysis_id,
+                    # Steps execution arn (not yet implemented)
+                    "stepsLaunchExecutionArn": steps_execution_arn,
+                    # Pipeline metadata
+                    "pipelineLanguage": pipeline_language,
+                    # Timing metadata
+                    "icav2EndTime": icav2_end_time,
+                    "postProcessingStage": post_processing_stage,
+                    # Error messages
+                    "errorType": error_type,
+                    "errorMessageUri": s3_payload_uri,
+                }.items()
+            ))
+        )
+
+    # End to end, from the POST to the final update
+    if status in TERMINAL_STATUSES:
+        record_elapsed_since(
+            "analysis.submission_to_terminal", trace_id, analysis_object.get('submissionTime'), status=status
+        )
 
     # Return the response payload (We don't actually need this, since updating the API generates the event)
     return dict(update_response)
@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+
+"""
+Modules shared between the icav2 wes manager lambdas
+
+Deployed as a lambda layer, so there is a single copy of each module
+"""
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+Filemanager sync registration
+
+When the filemanager sync lambda is called with a task token, it registers the keys the filemanager is missing
+against the portal run id in the callback table, along with the task token of the waiting step function.
+
+The keys are then ticked off as the filemanager reports them ingested,
+both by the filemanager sync lambda itself (a second listing just after the registration, so keys ingested while
+we were registering are not missed) and by the handle filemanager event lambda (filemanager events on the OrcaBus bus).
+
+Once the last key is ticked off, the registration is deleted and the waiting step function is resumed.
+
+Items in the callback table are keyed by the portal run id, with the id_type 'FILEMANAGER_SYNC'
+"""
+
+# Standard imports
+import json
+import typing
+from datetime import datetime, UTC
+from os import environ
+from typing import Iterable
+import logging
+
+import boto3
+from botocore.exceptions import ClientError
+
+if typing.TYPE_CHECKING:
+    from mypy_boto3_dynamodb import DynamoDBClient
+    from mypy_boto3_stepfunctions import SFNClient
+
+# Set up logging
+logger = logging.getLogger()
+
+# Globals
+CALLBACK_DATABASE_NAME_ENV_VAR = "CALLBACK_DATABASE_NAME"
+FILEMANAGER_SYNC_ID_TYPE = "FILEMANAGER_SYNC"
+# DynamoDB accepts at most 100 members in the set of a single DELETE expression value
+MAX_KEYS_PER_TICK = 100
+SECONDS_PER_DAY = (60 * 60 * 24)  # 60 seconds per min * 60 minutes per hour * 24 hours per day
+
+
+def get_dynamodb_client() -> 'DynamoDBClient':
+    return boto3.client('dynamodb')
+
+
+def get_sfn_client() -> 'SFNClient':
+    return boto3.client('stepfunctions')
+
+
+def register_missing_keys(portal_run_id: str, s3_bucket: str, missing_keys: Iterable[str], task_token: str):
+    """
+    Register the missing keys (and the task token of the waiting step function) against the portal run id,
+    overwriting the registration of any previous attempt
+    """
+    get_dynamodb_client().put_item(
+        TableName=environ[CALLBACK_DATABASE_NAME_ENV_VAR],
+        Item={
+            "id": {"S": portal_run_id},
+            "id_type": {"S": FILEMANAGER_SYNC_ID_TYPE},
+            "s3_bucket": {"S": s3_bucket},
+            "remaining_keys": {"SS": sorted(set(missing_keys))},
+            "task_token": {"S": task_token},
+            "ttl": {"N": str(int(datetime.now(UTC).timestamp()) + SECONDS_PER_DAY)},
+        }
+    )
+
+
+def tick_off_keys(portal_run_id: str, s3_bucket: str, keys: Iterable[str]) -> bool:
+    """
+    Remove the keys from the registered key set of the portal run id,
+    returns True if the key set is now empty
+    """
+    keys = sorted(set(keys))
+    dynamodb_client = get_dynamodb_client()
+
+    is_complete = False
+    for i in range(0, len(keys), MAX_KEYS_PER_TICK):
+        try:
+            response = dynamodb_client.update_item(
+                TableName=environ[CALLBACK_DATABASE_NAME_ENV_VAR],
+                Key={
+                    "id": {"S": portal_run_id},
+                    "id_type": {"S": FILEMANAGER_SYNC_ID_TYPE},
+                },
+                UpdateExpression="DELETE remaining_keys :keys",
+                # Don't create an item for portal run ids that are not waiting on a sync
+                ConditionExpression="attribute_exists(remaining_keys) AND s3_bucket = :bucket",
+                ExpressionAttributeValues={
+                    ":keys": {"SS": keys[i:i + MAX_KEYS_PER_TICK]},
+                    ":bucket": {"S": s3_bucket},
+                },
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+        # DynamoDB removes a string set once its last member is deleted
+        is_complete = "remaining_keys" not in response["Attributes"]
+
+    return is_complete
+
+
+def resume_filemanager_sync(portal_run_id: str):
+    """
+    Delete the registration and resume the waiting step function.
+    Only the caller that deletes the registration sends the task success,
+    so concurrent ticks of the last keys don't resume the step function twice
+    """
+    try:
+        response = get_dynamodb_client().delete_item(
+            TableName=environ[CALLBACK_DATABASE_NAME_ENV_VAR],
+            Key={
+                "id": {"S": portal_run_id},
+                "id_type": {"S": FILEMANAGER_SYNC_ID_TYPE},
+            },
+            ConditionExpression="attribute_exists(task_token) AND attribute_not_exists(remaining_keys)",
+            ReturnValues="ALL_OLD",
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return
+        raise
+
+    if "Attributes" not in response:
+        # Already resumed
+        return
+
+    sfn_client = get_sfn_client()
+    try:
+        sfn_client.send_task_success(
+            taskToken=response["Attributes"]["task_token"]["S"],
+            output=json.dumps({
+                "isSynced": False,
+                "missingKeysIngested": True,
+            })
+        )
+    except (sfn_client.exceptions.TaskTimedOut, sfn_client.exceptions.InvalidToken):
+        # The step function has fallen back to polling
+        logger.warning(f"Filemanager sync for {portal_run_id} is no longer waiting on events")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""
+Pipeline metadata cache
+
+Pipeline definitions are immutable for a given pipeline id, so we only need to
+ask ICAv2 for the language and default analysis storage of a pipeline once.
+
+Two tiers
+* An in-process LRU cache, reused across invocations of a warm lambda
+* A DynamoDB item in the cache table, shared across lambdas, expired with a TTL
+
+Items in the cache table are keyed by 'PIPELINE_METADATA#<project_id>#<pipeline_id>'
+"""
+
+# Standard imports
+import typing
+from functools import lru_cache
+from os import environ
+from time import time
+from typing import Dict, Optional
+import logging
+
+import boto3
+
+# Wrapica imports
+from wrapica.project_pipelines import get_project_pipeline_obj
+
+if typing.TYPE_CHECKING:
+    from mypy_boto3_dynamodb import DynamoDBClient
+
+# Set up logging
+logger = logging.getLogger()
+
+# Globals
+CACHE_DATABASE_NAME_ENV_VAR = 'CACHE_DATABASE_NAME'
+PIPELINE_METADATA_CACHE_TTL_SECONDS_ENV_VAR = 'PIPELINE_METADATA_CACHE_TTL_SECONDS'
+DEFAULT_PIPELINE_METADATA_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60  # 7 days
+PIPELINE_METADATA_CACHE_MAX_SIZE = 128
+
+
+def get_dynamodb_client() -> 'DynamoDBClient':
+    return boto3.client('dynamodb')
+
+
+def get_cache_item_id(project_id: str, pipeline_id: str) -> str:
+    return f"PIPELINE_METADATA#{project_id}#{pipeline_id}"
+
+
+def get_pipeline_metadata_from_cache_table(project_id: str, pipeline_id: str) -> Optional[Dict[str, str]]:
+    if environ.get(CACHE_DATABASE_NAME_ENV_VAR) is None:
+        return None
+
+    try:
+        item = get_dynamodb_client().get_item(
+            TableName=environ[CACHE_DATABASE_NAME_ENV_VAR],
+            Key={"id": {"S": get_cache_item_id(project_id, pipeline_id)}}
+        ).get("Item")
+    except Exception as e:
+        # The cache is an optimisation, fall back to ICAv2
+        logger.warning(f"Could not read pipeline metadata from the cache table: {e}")
+        return None
+
+    # DynamoDB TTL deletion is lazy, so we also check the expiry ourselves
+    if item is None or int(item["ttl"]["N"]) < time():
+        return None
+
+    return {
+        "language": item["language"]["S"],
+        "analysisStorageSize": item["analysis_storage_size"]["S"],
+    }
+
+
+def put_pipeline_metadata_in_cache_table(project_id: str, pipeline_id: str, pipeline_metadata: Dict[str, str]):
+    if environ.get(CACHE_DATABASE_NAME_ENV_VAR) is None:
+        return
+
+    ttl_seconds = int(environ.get(
+        PIPELINE_METADATA_CACHE_TTL_SECONDS_ENV_VAR,
+        DEFAULT_PIPELINE_METADATA_CACHE_TTL_SECONDS
+    ))
+
+    try:
+        get_dynamodb_client().put_item(
+            TableName=environ[CACHE_DATABASE_NAME_ENV_VAR],
+            Item={
+                "id": {"S": get_cache_item_id(project_id, pipeline_id)},
+                "language": {"S": pipeline_metadata["language"]},
+                "analysis_storage_size": {"S": pipeline_metadata["analysisStorageSize"]},
+                "ttl": {"N": str(int(time()) + ttl_seconds)},
+            }
+        )
+    except Exception as e:
+        logger.warning(f"Could not write pipeline metadata to the cache table: {e}")
+
+
+@lru_cache(maxsize=PIPELINE_METADATA_CACHE_MAX_SIZE)
+def get_pipeline_metadata(project_id: str, pipeline_id: str) -> Dict[str, str]:
+    """
+    Get the language (CWL or NEXTFLOW) and the default analysis storage size of a pipeline.
+    Raises if the pipeline cannot be found in the project.
+    """
+    pipeline_metadata = get_pipeline_metadata_from_cache_table(project_id, pipeline_id)
+    if pipeline_metadata is not None:
+        return pipeline_metadata
+
+    pipeline_obj = get_project_pipeline_obj(
+        project_id=project_id,
+        pipeline_id=pipeline_id
+    ).pipeline
+
+    pipeline_metadata = {
+        "language": pipeline_obj.language,
+        "analysisStorageSize": pipeline_obj.analysis_storage.name,
+    }
+
+    put_pipeline_metadata_in_cache_table(project_id, pipeline_id, pipeline_metadata)
+
+    return pipeline_metadata
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+"""
+Per-analysis latency tracing
+
+Each hop of the submission and state change pipeline (DynamoDB operations, ICAv2 API calls,
+filemanager calls, S3 uploads etc.) is timed as a span.
+
+The trace id of a span is the icav2 wes orcabus id (iwa.<ULID>) of the analysis,
+this is passed through the step function inputs (id / icav2WesOrcabusId), the ICAv2 technical tags
+(icav2_wes_orcabus_id) and the analysis state change events (id).
+
+By default, spans are printed as CloudWatch embedded metric format (EMF) log lines,
+so each span is a SpanDuration metric (with the Service and Span dimensions),
+and all the spans of a single analysis can be found with a logs insights query on the traceId property.
+The span attributes are nested under the attributes property, so they cannot overwrite the dimensions or the traceId.
+
+Set TRACE_SPAN_EXPORTER=local to instead append the spans as JSON lines to TRACE_SPAN_EXPORT_PATH,
+so the whole pipeline can be profiled locally and in tests.
+"""
+
+# Standard imports
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from os import environ
+from typing import Any, Dict, Iterator, Optional, Union
+
+# Globals
+TRACE_SPAN_EXPORTER_ENV_VAR = "TRACE_SPAN_EXPORTER"
+TRACE_SPAN_EXPORT_PATH_ENV_VAR = "TRACE_SPAN_EXPORT_PATH"
+DEFAULT_TRACE_SPAN_EXPORT_PATH = "/tmp/icav2-wes-trace-spans.jsonl"
+LOCAL_SPAN_EXPORTER = "local"
+SPAN_METRIC_NAMESPACE = "OrcaBus/Icav2WesManager"
+SPAN_METRIC_NAME = "SpanDuration"
+
+# Spans may be exported from worker threads
+_local_export_lock = threading.Lock()
+
+
+def get_service_name() -> str:
+    return environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+
+
+def to_epoch_seconds(timestamp: Union[str, datetime]) -> float:
+    """
+    Convert an iso timestamp (or datetime) to epoch seconds, naive timestamps are assumed to be in UTC
+    """
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def export_span(span_dict: Dict[str, Any]):
+    if environ.get(TRACE_SPAN_EXPORTER_ENV_VAR) == LOCAL_SPAN_EXPORTER:
+        with _local_export_lock:
+            with open(environ.get(TRACE_SPAN_EXPORT_PATH_ENV_VAR, DEFAULT_TRACE_SPAN_EXPORT_PATH), "a") as span_h:
+                span_h.write(json.dumps(span_dict) + "\n")
+        return
+
+    # Embedded metric format, the log line is also a metric
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(span_dict["startTime"] * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": SPAN_METRIC_NAMESPACE,
+                    "Dimensions": [["Service", "Span"]],
+                    "Metrics": [
+                        {
+                            "Name": SPAN_METRIC_NAME,
+                            "Unit": "Milliseconds"
+                        }
+                    ]
+                }
+            ]
+        },
+        "Service": span_dict["service"],
+        "Span": span_dict["name"],
+        SPAN_METRIC_NAME: span_dict["durationMs"],
+        "traceId": span_dict["traceId"],
+        "status": span_dict["status"],
+        "attributes": span_dict["attributes"],
+    }), flush=True)
+
+
+def record_span(
+        name: str,
+        trace_id: Optional[str],
+        start_time: float,
+        end_time: float,
+        status: str = "OK",
+        **attributes: Any
+):
+    """
+    Record a span from its start and end times (in epoch seconds)
+    """
+    export_span({
+        "name": name,
+        "traceId": trace_id,
+        "service": get_service_name(),
+        "startTime": start_time,
+        "endTime": end_time,
+        "durationMs": round((end_time - start_time) * 1000, 3),
+        "status": status,
+        "attributes": attributes,
+    })
+
+
+def record_elapsed_since(
+        name: str,
+        trace_id: Optional[str],
+        since: Optional[Union[str, datetime]],
+        **attributes: Any
+):
+    """
+    Record the time between an upstream timestamp (i.e the time an event was emitted) and now,
+    does nothing if the upstream timestamp is missing or cannot be parsed
+    """
+    if since is None:
+        return
+    try:
+        start_time = to_epoch_seconds(since)
+    except (TypeError, ValueError):
+        return
+    record_span(name, trace_id, start_time, time.time(), **attributes)
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attributes: Any) -> Iterator[None]:
+    """
+    Time the body of the with block as a span
+    """
+    start_time = time.time()
+    start_counter = time.perf_counter()
+    status = "OK"
+    try:
+        yield
+    except BaseException:
+        status = "ERROR"
+        raise
+    finally:
+        record_span(
+            name,
+            trace_id,
+            start_time,
+            start_time + (time.perf_counter() - start_counter),
+            status,
+            **attributes
+        )
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the get_matching_ingest_ids rule table against the previous regex / float divmod filter
+
+Generates a synthetic listing of 500k file objects (the output of a large WGS run)
+and times both filters over it, confirming they select the same files.
+
+Usage:
+    python3 benchmarks/get_matching_ingest_ids_benchmark.py [--num-objects 500000] [--seed 0]
+"""
+
+# Standard imports
+import argparse
+import math
+import random
+import re
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app" / "lambdas" / "get_matching_ingest_ids_py"))
+
+# Local imports
+from matching_rules import SUFFIX_LIST, is_matching_file, iter_matching_files  # noqa: E402
+
+# Globals
+DEFAULT_NUM_OBJECTS = 500_000
+
+EXTENSIONS = [
+    ".bam", ".bam.bai", ".cram", ".vcf.gz", ".vcf.gz.tbi", ".vcf", ".tsv", ".tsv.gz", ".csv", ".json",
+    ".json.gz", ".html", ".log", ".txt", ".bed.gz", ".fastq.gz", ".png", ".pdf", ".sf", ".xml",
+    ".lilac.hlay.fragments.tsv",
+]
+DIRECTORIES = ["", "logs/", "dragen/", "dragen/qc/", "purple/", "lilac/", "multiqc/multiqc_data/"]
+
+# The previous implementation
+LEGACY_SUFFIX_REGEX_OBJ = re.compile(
+    rf".*(?:{"|".join(SUFFIX_LIST)})(?:.gz)?$"
+)
+LEGACY_FILESIZE_DENOMINATOR = math.pow(2, 10)
+
+
+def legacy_get_matching_ingest_ids(file_object_dicts: List[Dict]) -> List[str]:
+    matched_ingest_id_list = []
+    for file_object_iter_ in file_object_dicts:
+        file_object_size = file_object_iter_.get("fileObject", {}).get("size")
+        file_object_key = file_object_iter_.get("fileObject", {}).get("key", "")
+        if file_object_size is None:
+            continue
+        if (
+                (
+                        not divmod(file_object_size, LEGACY_FILESIZE_DENOMINATOR)[-1] == 0 and
+                        not (
+                                file_object_key.endswith(".vcf.gz") or
+                                file_object_key.endswith(".bam")
+                        )
+                ) or
+                file_object_size == 0 or
+                file_object_key.endswith(".lilac.hlay.fragments.tsv") or
+                "/logs/" in file_object_key
+        ):
+            continue
+        if not LEGACY_SUFFIX_REGEX_OBJ.match(file_object_key):
+            continue
+        matched_ingest_id_list.append(file_object_iter_['ingestId'])
+    return matched_ingest_id_list
+
+
+def get_matching_ingest_ids(file_object_dicts: List[Dict]) -> List[str]:
+    return [
+        file_object_iter_["ingestId"]
+        for file_object_iter_ in file_object_dicts
+        if is_matching_file(file_object_iter_["fileObject"]["key"], file_object_iter_["fileObject"]["size"])
+    ]
+
+
+def get_synthetic_listing(num_objects: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "ingestId": f"{index:032x}",
+            "fileObject": {
+                "bucket": "pipeline-prod-cache-503977275616-ap-southeast-2",
+                "key": (
+                    f"byob-icav2/production/analysis/wgs/20250101abcdef{index % 1000:04d}/"
+                    f"{rng.choice(DIRECTORIES)}sample_{index}{rng.choice(EXTENSIONS)}"
+                ),
+                # One in four files sit on a block boundary
+                "size": rng.randrange(0, 1 << 30) if rng.random() < 0.75 else rng.randrange(0, 1 << 20) << 10,
+            }
+        }
+        for index in range(num_objects)
+    ]
+
+
+def time_it(func, *args) -> Tuple[float, Any]:
+    start = perf_counter()
+    result = func(*args)
+    return perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-objects", type=int, default=DEFAULT_NUM_OBJECTS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    listing = get_synthetic_listing(args.num_objects, args.seed)
+
+    legacy_seconds, legacy_ingest_ids = time_it(legacy_get_matching_ingest_ids, listing)
+    rule_table_seconds, matching_ingest_ids = time_it(get_matching_ingest_ids, listing)
+    handler_seconds, matching_files = time_it(lambda file_object_dicts: list(iter_matching_files(file_object_dicts)), listing)
+
+    if not (
+            legacy_ingest_ids ==
+            matching_ingest_ids ==
+            [matching_file_iter_["ingestId"] for matching_file_iter_ in matching_files]
+    ):
+        raise ValueError("The rule table and the legacy filter selected different files")
+
+    print(f"Objects:       {args.num_objects:>10,}")
+    print(f"Matching:      {len(matching_files):>10,}")
+    print(f"Legacy filter: {legacy_seconds:>10.3f}s")
+    print(f"Rule table:    {rule_table_seconds:>10.3f}s ({legacy_seconds / rule_table_seconds:.2f}x)")
+    print(f"+ classify:    {handler_seconds:>10.3f}s (the full handler output)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,26 @@
 import { PythonUvFunction } from '@orcabus/platform-cdk-constructs/lambda';
 import path from 'path';
-import { API_VERSION, ICAV2_WES_SUBDOMAIN_NAME, INTERFACE_DIR } from '../constants';
+import {
+  ANALYSIS_EXPORTS_KEY_PREFIX,
+  API_VERSION,
+  DEFAULT_SCHEDULER_INTERVAL,
+  DEFAULT_SCHEDULER_LAUNCH_BURST,
+  DEFAULT_SCHEDULER_LAUNCH_RATE_PER_SECOND,
+  DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE,
+  DEFAULT_PARALLEL_SCAN_SEGMENTS,
+  DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT,
+  DEFAULT_STATS_RECONCILIATION_INTERVAL,
+  DEFAULT_STATS_RECONCILIATION_SCAN_SEGMENTS,
+  ENABLE_ICAV2_LAUNCH_SCHEDULER,
+  ICAV2_WES_SUBDOMAIN_NAME,
+  INTERFACE_DIR,
+} from '../constants';
 import * as lambda from 'aws-cdk-lib/aws-lambda';
 import { Duration } from 'aws-cdk-lib';
 import * as cdk from 'aws-cdk-lib';
 import * as iam from 'aws-cdk-lib/aws-iam';
+import * as events from 'aws-cdk-lib/aws-events';
+import * as eventsTargets from 'aws-cdk-lib/aws-events-targets';
 import { NagSuppressions } from 'cdk-nag';
 import {
   OrcaBusApiGateway,
@@ -33,6 +49,69 @@ export function buildApiInterfaceLambda(scope: Construct, props: LambdaApiProps)
     timeout: Duration.seconds(60),
   });
 
+  addInterfaceEnvironment(lambdaFunction, props);
+
+  return lambdaFunction;
+}
+
+export function buildSchedulerLambda(scope: Construct, props: LambdaApiProps) {
+  // Shares the interface code (and so the environment) with the API lambda
+  const lambdaFunction = new PythonUvFunction(scope, props.lambdaName, {
+    entry: path.join(INTERFACE_DIR),
+    runtime: lambda.Runtime.PYTHON_3_14,
+    architecture: lambda.Architecture.ARM_64,
+    index: 'scheduler.py',
+    handler: 'handler',
+    memorySize: 1024,
+    includeFastApiLayer: true,
+    timeout: Duration.seconds(60),
+  });
+
+  addInterfaceEnvironment(lambdaFunction, props);
+
+  // Release any pending analyses that are waiting on the launch token bucket
+  new events.Rule(scope, `${props.lambdaName}ScheduleRule`, {
+    schedule: events.Schedule.rate(DEFAULT_SCHEDULER_INTERVAL),
+    targets: [new eventsTargets.LambdaFunction(lambdaFunction)],
+  });
+
+  return lambdaFunction;
+}
+
+export function buildStatsReconcilerLambda(scope: Construct, props: LambdaApiProps) {
+  // Shares the interface code (and so the environment) with the API lambda
+  const lambdaFunction = new PythonUvFunction(scope, props.lambdaName, {
+    entry: path.join(INTERFACE_DIR),
+    runtime: lambda.Runtime.PYTHON_3_14,
+    architecture: lambda.Architecture.ARM_64,
+    index: 'stats_reconciler.py',
+    handler: 'handler',
+    memorySize: 1024,
+    includeFastApiLayer: true,
+    timeout: Duration.minutes(15),
+  });
+
+  addInterfaceEnvironment(lambdaFunction, props);
+
+  // Number of workers in the parallel scan of the analysis table
+  lambdaFunction.addEnvironment(
+    'STATS_RECONCILIATION_SCAN_SEGMENTS',
+    DEFAULT_STATS_RECONCILIATION_SCAN_SEGMENTS.toString()
+  );
+
+  // Rebuild the status counters from the analysis table
+  new events.Rule(scope, `${props.lambdaName}ScheduleRule`, {
+    schedule: events.Schedule.rate(DEFAULT_STATS_RECONCILIATION_INTERVAL),
+    targets: [new eventsTargets.LambdaFunction(lambdaFunction)],
+  });
+
+  return lambdaFunction;
+}
+
+function addInterfaceEnvironment(lambdaFunction: PythonUvFunction, props: LambdaApiProps) {
+  // Add the shared modules layer
+  lambdaFunction.addLayers(props.icav2WesManagerToolsLayer);
+
   // Add SFN arns as environment variables
   // And allow the lambda to invoke the step functions
   for (const sfnObject of props.stepFunctions) {
@@ -93,7 +172,48 @@ export function buildApiInterfaceLambda(scope: Construct, props: LambdaApiProps)
     `https://${ICAV2_WES_SUBDOMAIN_NAME}.${props.hostedZoneSsmParameter.stringValue}`
   );
 
-  return lambdaFunction;
+  // Add the scheduler table and configuration
+  // Slots are acquired in a transaction across both tables
+  lambdaFunction.addEnvironment('SCHEDULER_ENABLED', ENABLE_ICAV2_LAUNCH_SCHEDULER.toString());
+  lambdaFunction.addEnvironment(
+    'DYNAMODB_ICAV2_WES_SCHEDULER_TABLE_NAME',
+    props.schedulerTable.tableName
+  );
+  lambdaFunction.addEnvironment(
+    'SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT',
+    DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT.toString()
+  );
+  lambdaFunction.addEnvironment(
+    'SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE',
+    DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE.toString()
+  );
+  lambdaFunction.addEnvironment(
+    'SCHEDULER_LAUNCH_RATE_PER_SECOND',
+    DEFAULT_SCHEDULER_LAUNCH_RATE_PER_SECOND.toString()
+  );
+  lambdaFunction.addEnvironment(
+    'SCHEDULER_LAUNCH_BURST',
+    DEFAULT_SCHEDULER_LAUNCH_BURST.toString()
+  );
+  props.schedulerTable.grantReadWriteData(lambdaFunction);
+
+  // Add the stats table, the status counters are updated on each status transition
+  lambdaFunction.addEnvironment('DYNAMODB_ICAV2_WES_STATS_TABLE_NAME', props.statsTable.tableName);
+  props.statsTable.grantReadWriteData(lambdaFunction);
+
+  // Unfiltered listings and exports scan the table in parallel
+  lambdaFunction.addEnvironment(
+    'PARALLEL_SCAN_SEGMENTS',
+    DEFAULT_PARALLEL_SCAN_SEGMENTS.toString()
+  );
+
+  // Exports are written to the artefacts bucket
+  lambdaFunction.addEnvironment(
+    'S3_ANALYSIS_ARTEFACTS_BUCKET_NAME',
+    props.artefactsBucket.bucketName
+  );
+  lambdaFunction.addEnvironment('S3_ANALYSIS_EXPORTS_PREFIX', ANALYSIS_EXPORTS_KEY_PREFIX);
+  props.artefactsBucket.grantReadWrite(lambdaFunction, `${ANALYSIS_EXPORTS_KEY_PREFIX}*`);
 }
 
 export function buildApiGateway(
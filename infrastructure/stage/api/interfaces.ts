@@ -5,6 +5,8 @@ import { OrcaBusApiGateway } from '@orcabus/platform-cdk-constructs/api-gateway'
 import { HttpLambdaIntegration } from 'aws-cdk-lib/aws-apigatewayv2-integrations';
 import { SfnObjectProps } from '../step-functions/interfaces';
 import { IStringParameter } from 'aws-cdk-lib/aws-ssm';
+import { IBucket } from 'aws-cdk-lib/aws-s3';
+import { ILayerVersion } from 'aws-cdk-lib/aws-lambda';
 
 export interface LambdaApiProps {
   /* The lambda name */
@@ -13,6 +15,14 @@ export interface LambdaApiProps {
   /* Table to use */
   table: ITableV2;
   tableIndexNames: string[];
+  schedulerTable: ITableV2;
+  statsTable: ITableV2;
+
+  /* Bucket for exports */
+  artefactsBucket: IBucket;
+
+  /* Layer with the shared modules */
+  icav2WesManagerToolsLayer: ILayerVersion;
 
   /* Step Functions */
   stepFunctions: SfnObjectProps[];
@@ -23,6 +23,14 @@ import {
   ERROR_LOGS_KEY_PREFIX,
   DEFAULT_WES_REQUEST_SQS_QUEUE_NAME,
   CALLBACK_TABLE_NAME,
+  SCHEDULER_TABLE_NAME,
+  CACHE_TABLE_NAME,
+  STATS_TABLE_NAME,
+  DEFAULT_PAYLOAD_ARCHIVE_SQS_QUEUE_NAME,
+  FILEMANAGER_EVENT_SOURCE,
+  FILEMANAGER_OBJECT_STATE_CHANGE_DETAIL_TYPE,
+  FILEMANAGER_OBJECT_CREATED_EVENT_TYPE,
+  ICAV2_BYOB_KEY_PREFIX,
 } from './constants';
 import { ICAV2_ACCESS_TOKEN_SECRET_ID } from '@orcabus/platform-cdk-constructs/shared-config/icav2';
 import { StageName } from '@orcabus/platform-cdk-constructs/shared-config/accounts';
@@ -41,6 +49,9 @@ export const getStatefulStackProps = (stage: StageName): StatefulApplicationStac
     // Extra table stuff
     payloadsTableName: PAYLOADS_TABLE_NAME,
     callbackTableName: CALLBACK_TABLE_NAME,
+    schedulerTableName: SCHEDULER_TABLE_NAME,
+    cacheTableName: CACHE_TABLE_NAME,
+    statsTableName: STATS_TABLE_NAME,
 
     // Extra buckets stuff
     payloadsBucketName: S3_ARTEFACTS_BUCKET_NAME[stage],
@@ -56,6 +67,7 @@ export const getStatefulStackProps = (stage: StageName): StatefulApplicationStac
     icav2WesRequestEventRuleName: 'icav2WesPostRequestRule',
     icav2WesRequestSqsQueueName: DEFAULT_WES_REQUEST_SQS_QUEUE_NAME,
     icaExternalSqsQueueName: DEFAULT_EXTERNAL_ICA_EVENT_SQS_NAME,
+    payloadArchiveSqsQueueName: DEFAULT_PAYLOAD_ARCHIVE_SQS_QUEUE_NAME,
     slackTopicName: SLACK_TOPIC_NAME,
   };
 };
@@ -77,6 +89,15 @@ export const getStatelessStackProps = (stage: StageName): StatelessApplicationSt
     // External event handling stuff
     icaExternalSqsQueueName: DEFAULT_EXTERNAL_ICA_EVENT_SQS_NAME,
 
+    // Filemanager event handling stuff
+    filemanagerEventSource: FILEMANAGER_EVENT_SOURCE,
+    filemanagerObjectStateChangeDetailType: FILEMANAGER_OBJECT_STATE_CHANGE_DETAIL_TYPE,
+    filemanagerObjectCreatedEventType: FILEMANAGER_OBJECT_CREATED_EVENT_TYPE,
+    icav2ByobKeyPrefix: ICAV2_BYOB_KEY_PREFIX,
+
+    // Payload archive stuff
+    payloadArchiveSqsQueueName: DEFAULT_PAYLOAD_ARCHIVE_SQS_QUEUE_NAME,
+
     // Internal event handling stuff
     internalEventBusName: EVENT_BUS_NAME_INTERNAL,
     icav2WesRequestSqsQueueName: DEFAULT_WES_REQUEST_SQS_QUEUE_NAME,
@@ -89,6 +110,9 @@ export const getStatelessStackProps = (stage: StageName): StatelessApplicationSt
     // Extra table stuff
     payloadsTableName: PAYLOADS_TABLE_NAME,
     callbackTableName: CALLBACK_TABLE_NAME,
+    schedulerTableName: SCHEDULER_TABLE_NAME,
+    cacheTableName: CACHE_TABLE_NAME,
+    statsTableName: STATS_TABLE_NAME,
 
     // Extra bucket stuff
     payloadsBucketName: S3_ARTEFACTS_BUCKET_NAME[stage],
@@ -15,6 +15,7 @@ export const STEP_FUNCTIONS_DIR = path.join(APP_ROOT, 'step-functions-templates'
 export const INTERFACE_DIR = path.join(APP_ROOT, 'interface');
 export const EVENT_SCHEMAS_DIR = path.join(APP_ROOT, 'event-schemas');
 export const ECS_DIR = path.join(APP_ROOT, 'ecs');
+export const LAYERS_DIR = path.join(APP_ROOT, 'layers');
 
 /* API constants */
 export const API_VERSION = 'v1';
@@ -27,6 +28,10 @@ export const EVENT_SOURCE = 'orcabus.icav2wesmanager';
 export const ICAV2_WES_EVENT_REQUEST_SUBMISSION_STATUS = 'Icav2WesRequest';
 export const ICAV2_WES_EVENT_STATE_CHANGE_EVENT_DETAIL_TYPE_EXTERNAL =
   'Icav2WesAnalysisStateChange';
+// The filemanager's object created events tick off the keys a filemanager sync is waiting on
+export const FILEMANAGER_EVENT_SOURCE = 'orcabus.filemanager';
+export const FILEMANAGER_OBJECT_STATE_CHANGE_DETAIL_TYPE = 'FileStateChange';
+export const FILEMANAGER_OBJECT_CREATED_EVENT_TYPE = 'Created';
 
 /* Bucket constants */
 export const S3_ARTEFACTS_BUCKET_NAME: Record<StageName, string> = {
@@ -36,10 +41,13 @@ export const S3_ARTEFACTS_BUCKET_NAME: Record<StageName, string> = {
 };
 export const PAYLOADS_KEY_PREFIX = 'analysis-payloads/';
 export const ERROR_LOGS_KEY_PREFIX = 'error-logs/';
+export const INGEST_ID_MANIFESTS_KEY_PREFIX = 'ingest-id-manifests/';
+export const ANALYSIS_EXPORTS_KEY_PREFIX = 'analysis-exports/';
 
 /* ICA Constants */
 export const ICAV2_ANALYSIS_STATE_CHANGE_JOB_EVENT_CODE = 'ICA_EXEC_028';
 export const ICAV2_WES_MANAGER_TAG_KEY = 'icav2_wes_orcabus_id';
+export const ICAV2_BYOB_KEY_PREFIX = 'byob-icav2/'; // Analysis outputs are written under this prefix
 
 /* SQS */
 // SHARED QUEUE PARAMS
@@ -50,6 +58,29 @@ export const DEFAULT_WES_REQUEST_QUEUE_TIMEOUT = Duration.minutes(15); // Max ti
 // WES Request
 export const DEFAULT_MAX_ICAV2_WES_REQUEST_API_CONCURRENCY = 5;
 export const DEFAULT_WES_REQUEST_SQS_QUEUE_NAME = 'Icav2WesRequestSqsQueue';
+// Submit the records of a batch concurrently from a single durable execution
+export const ENABLE_CONCURRENT_WES_REQUEST_SUBMISSION = true;
+export const DEFAULT_WES_REQUEST_BATCH_SIZE = 10;
+export const DEFAULT_WES_REQUEST_MAX_BATCHING_WINDOW = Duration.seconds(5);
+export const DEFAULT_MAX_CONCURRENT_WES_REQUEST_SUBMISSIONS = 10;
+
+// Payload archive
+// The launch lambda hands the launch payload off to the archiver rather than waiting on the S3 upload
+export const ENABLE_ASYNC_PAYLOAD_ARCHIVE = true;
+export const DEFAULT_PAYLOAD_ARCHIVE_SQS_QUEUE_NAME = 'Icav2WesPayloadArchiveSqsQueue';
+export const DEFAULT_PAYLOAD_ARCHIVE_QUEUE_TIMEOUT = Duration.minutes(6); // At least six times the lambda timeout
+export const DEFAULT_PAYLOAD_ARCHIVE_BATCH_SIZE = 25;
+export const DEFAULT_PAYLOAD_ARCHIVE_MAX_BATCHING_WINDOW = Duration.seconds(30);
+
+// Corrupted files
+// Number of files checked at once by each batch of the handle corrupted files step function
+export const DEFAULT_MAX_CONCURRENT_CORRUPTION_CHECKS = 16;
+// How long we trust the result of a corruption check for an unchanged file
+export const DEFAULT_CORRUPTION_CHECK_RESULTS_TTL = Duration.days(90);
+
+// Filemanager attributes
+// Number of output sub-prefixes crawled and patched at once
+export const DEFAULT_MAX_CONCURRENT_ATTRIBUTE_PARTITIONS = 8;
 
 // Launch ICA Analysis SQS (coming soon)
 // export const DEFAULT_LAUNCH_ICA_ANALYSIS_EVENT_PIPE_NAME = 'Icav2WesLaunchIcaAnalysisEventPipe';
@@ -80,6 +111,31 @@ export const TABLE_REMOVAL_POLICY = RemovalPolicy.RETAIN_ON_UPDATE_OR_DELETE; //
 /* Extra tables */
 export const PAYLOADS_TABLE_NAME = 'icav2WesManagerPayloadsTable';
 export const CALLBACK_TABLE_NAME = 'icav2WesManagerCallbackTable';
+export const SCHEDULER_TABLE_NAME = 'icav2WesManagerSchedulerTable';
+export const CACHE_TABLE_NAME = 'icav2WesManagerCacheTable';
+export const STATS_TABLE_NAME = 'icav2WesManagerStatsTable';
+
+/* Cache constants */
+// Pipeline definitions are immutable per pipeline id, so we can cache them for a while
+export const DEFAULT_PIPELINE_METADATA_CACHE_TTL = Duration.days(7);
+
+/* Scheduler constants */
+// Admission control for ICAv2 launches, analyses are held as PENDING until there is capacity
+export const ENABLE_ICAV2_LAUNCH_SCHEDULER = true;
+export const DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PROJECT = 100;
+export const DEFAULT_SCHEDULER_MAX_ACTIVE_ANALYSES_PER_PIPELINE = 50;
+export const DEFAULT_SCHEDULER_LAUNCH_RATE_PER_SECOND = 0.5;
+export const DEFAULT_SCHEDULER_LAUNCH_BURST = 5;
+export const DEFAULT_SCHEDULER_INTERVAL = Duration.minutes(1);
+
+/* Stats constants */
+// The status counters are kept up to date by the API, and rebuilt from a parallel scan of the analysis table
+export const DEFAULT_STATS_RECONCILIATION_INTERVAL = Duration.days(1);
+export const DEFAULT_STATS_RECONCILIATION_SCAN_SEGMENTS = 8;
+
+/* Export constants */
+// Number of workers in the parallel scan behind unfiltered listings and exports
+export const DEFAULT_PARALLEL_SCAN_SEGMENTS = 8;
 
 /* Event constants */
 export const EVENT_BUS_NAME_INTERNAL = 'OrcaBusICAv2WesManagerInternal'; // Events for internal use only, i.e handling ICAV2 Events
@@ -2,7 +2,14 @@ import { GlobalSecondaryIndexPropsV2 } from 'aws-cdk-lib/aws-dynamodb/lib/table-
 import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
 import { AttributeType } from 'aws-cdk-lib/aws-dynamodb';
 import { TABLE_REMOVAL_POLICY } from '../constants';
-import { BuildICAv2WesDbProps, CallbackTableProps, PayloadsTableProps } from './interfaces';
+import {
+  BuildICAv2WesDbProps,
+  CacheTableProps,
+  CallbackTableProps,
+  PayloadsTableProps,
+  SchedulerTableProps,
+  StatsTableProps,
+} from './interfaces';
 import { Construct } from 'constructs';
 import { RemovalPolicy } from 'aws-cdk-lib';
 
@@ -75,3 +82,49 @@ export function buildCallbackTable(scope: Construct, props: CallbackTableProps)
     },
   });
 }
+
+export function buildSchedulerTable(scope: Construct, props: SchedulerTableProps) {
+  new dynamodb.TableV2(scope, props.tableName, {
+    partitionKey: {
+      name: 'id',
+      type: AttributeType.STRING,
+    },
+    tableName: props.tableName,
+    // Slot counters and leases must survive a redeploy while analyses are running
+    removalPolicy: TABLE_REMOVAL_POLICY,
+    pointInTimeRecoverySpecification: {
+      pointInTimeRecoveryEnabled: true,
+    },
+  });
+}
+
+export function buildCacheTable(scope: Construct, props: CacheTableProps) {
+  new dynamodb.TableV2(scope, props.tableName, {
+    partitionKey: {
+      name: 'id',
+      type: AttributeType.STRING,
+    },
+    timeToLiveAttribute: 'ttl',
+    tableName: props.tableName,
+    // Everything in the cache can be regenerated
+    removalPolicy: RemovalPolicy.DESTROY,
+    pointInTimeRecoverySpecification: {
+      pointInTimeRecoveryEnabled: true,
+    },
+  });
+}
+
+export function buildStatsTable(scope: Construct, props: StatsTableProps) {
+  new dynamodb.TableV2(scope, props.tableName, {
+    partitionKey: {
+      name: 'id',
+      type: AttributeType.STRING,
+    },
+    tableName: props.tableName,
+    // The counters are rebuilt from the analysis table by the stats reconciler
+    removalPolicy: RemovalPolicy.DESTROY,
+    pointInTimeRecoverySpecification: {
+      pointInTimeRecoveryEnabled: true,
+    },
+  });
+}
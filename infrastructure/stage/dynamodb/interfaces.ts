@@ -15,3 +15,18 @@ export interface CallbackTableProps {
   /* The name of the table */
   tableName: string;
 }
+
+export interface SchedulerTableProps {
+  /* The name of the table */
+  tableName: string;
+}
+
+export interface CacheTableProps {
+  /* The name of the table */
+  tableName: string;
+}
+
+export interface StatsTableProps {
+  /* The name of the table */
+  tableName: string;
+}
@@ -1,9 +1,11 @@
 import {
   BuildEventBridgeRulesProps,
+  BuildFilemanagerObjectCreatedRuleProps,
   buildIcav2WesPostRequestRuleProps,
   eventBridgeRuleNameList,
   EventBridgeRuleObject,
   EventBridgeRuleProps,
+  FilemanagerObjectCreatedEventPatternProps,
   Icav2WesPostRequestEventPatternProps,
 } from './interfaces';
 import { Rule } from 'aws-cdk-lib/aws-events';
@@ -17,6 +19,19 @@ function buildIcav2WesPostRequestEventPattern(props: Icav2WesPostRequestEventPat
   };
 }
 
+function buildFilemanagerObjectCreatedEventPattern(
+  props: FilemanagerObjectCreatedEventPatternProps
+) {
+  return {
+    source: [props.filemanagerEventSource],
+    detailType: [props.filemanagerObjectStateChangeDetailType],
+    detail: {
+      eventType: [props.filemanagerObjectCreatedEventType],
+      key: [{ prefix: props.icav2ByobKeyPrefix }],
+    },
+  };
+}
+
 function buildEventRule(scope: Construct, props: EventBridgeRuleProps): Rule {
   return new events.Rule(scope, props.ruleName, {
     ruleName: props.ruleName,
@@ -36,6 +51,17 @@ function buildIcav2WesPostRequestRule(
   });
 }
 
+function buildFilemanagerObjectCreatedRule(
+  scope: Construct,
+  props: BuildFilemanagerObjectCreatedRuleProps
+): Rule {
+  return buildEventRule(scope, {
+    ruleName: props.ruleName,
+    eventPattern: buildFilemanagerObjectCreatedEventPattern(props),
+    eventBus: props.eventBus,
+  });
+}
+
 export function buildEventBridgeRules(
   scope: Construct,
   props: BuildEventBridgeRulesProps
@@ -55,6 +81,21 @@ export function buildEventBridgeRules(
         });
         break;
       }
+      case 'filemanagerObjectCreatedRule': {
+        eventBridgeObjects.push({
+          ruleName: eventBridgeRuleName,
+          ruleObject: buildFilemanagerObjectCreatedRule(scope, {
+            ruleName: eventBridgeRuleName,
+            eventBus: props.externalEventBus,
+            filemanagerEventSource: props.filemanagerEventSource,
+            filemanagerObjectStateChangeDetailType: props.filemanagerObjectStateChangeDetailType,
+            filemanagerObjectCreatedEventType: props.filemanagerObjectCreatedEventType,
+            icav2ByobKeyPrefix: props.icav2ByobKeyPrefix,
+          }),
+          eventBus: props.externalEventBus,
+        });
+        break;
+      }
     }
   }
   return eventBridgeObjects;
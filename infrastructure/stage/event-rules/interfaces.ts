@@ -2,14 +2,26 @@ import { EventPattern, IEventBus, Rule } from 'aws-cdk-lib/aws-events';
 
 export type EventBridgeRuleName =
   // External rule - for requests to run analyses
-  'icav2WesPostRequestRule';
+  | 'icav2WesPostRequestRule'
+  // External rule - for the filemanager ingestion events a filemanager sync is waiting on
+  | 'filemanagerObjectCreatedRule';
 
-export const eventBridgeRuleNameList: Array<EventBridgeRuleName> = ['icav2WesPostRequestRule'];
+export const eventBridgeRuleNameList: Array<EventBridgeRuleName> = [
+  'icav2WesPostRequestRule',
+  'filemanagerObjectCreatedRule',
+];
 
 export interface Icav2WesPostRequestEventPatternProps {
   icav2WesRequestDetailType: string;
 }
 
+export interface FilemanagerObjectCreatedEventPatternProps {
+  filemanagerEventSource: string;
+  filemanagerObjectStateChangeDetailType: string;
+  filemanagerObjectCreatedEventType: string;
+  icav2ByobKeyPrefix: string;
+}
+
 export interface EventBridgeRuleProps {
   ruleName: EventBridgeRuleName;
   eventBus: IEventBus;
@@ -27,6 +39,11 @@ export type buildIcav2WesPostRequestRuleProps = Omit<
   'eventPattern'
 >;
 
+export type BuildFilemanagerObjectCreatedRuleProps = Omit<
+  FilemanagerObjectCreatedEventPatternProps & EventBridgeRuleProps,
+  'eventPattern'
+>;
+
 export interface BuildEventBridgeRulesProps {
   /* Event Buses */
   internalEventBus: IEventBus;
@@ -38,4 +55,10 @@ export interface BuildEventBridgeRulesProps {
 
   /* Event Patterns - Wes Post Request rule */
   icav2WesRequestDetailType: string;
+
+  /* Event Patterns - Filemanager object created rule */
+  filemanagerEventSource: string;
+  filemanagerObjectStateChangeDetailType: string;
+  filemanagerObjectCreatedEventType: string;
+  icav2ByobKeyPrefix: string;
 }
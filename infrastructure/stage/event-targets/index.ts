@@ -2,6 +2,7 @@
 import * as eventsTargets from 'aws-cdk-lib/aws-events-targets';
 import * as events from 'aws-cdk-lib/aws-events';
 import {
+  AddLambdaAsEventBridgeTargetProps,
   AddSqsAsEventBridgeTargetProps,
   eventBridgeTargetsNameList,
   EventBridgeTargetsProps,
@@ -15,6 +16,16 @@ function buildSqsEventBridgeTargetWithInputAsDetail(props: AddSqsAsEventBridgeTa
   );
 }
 
+function buildLambdaEventBridgeTargetWithInputAsDetail(
+  props: AddLambdaAsEventBridgeTargetProps
+): void {
+  props.eventBridgeRuleObj.ruleObject.addTarget(
+    new eventsTargets.LambdaFunction(props.lambdaFunction, {
+      event: events.RuleTargetInput.fromEventPath('$.detail'),
+    })
+  );
+}
+
 export function buildAllEventBridgeTargets(props: EventBridgeTargetsProps): void {
   /* Iterate over each event bridge rule and add the target */
   for (const eventBridgeTargetsName of eventBridgeTargetsNameList) {
@@ -30,6 +41,17 @@ export function buildAllEventBridgeTargets(props: EventBridgeTargetsProps): void
         });
         break;
       }
+      case 'filemanagerObjectCreatedTargetToHandleFilemanagerEventLambda': {
+        buildLambdaEventBridgeTargetWithInputAsDetail(<AddLambdaAsEventBridgeTargetProps>{
+          eventBridgeRuleObj: props.eventBridgeRuleObjects.find(
+            (eventBridgeObject) => eventBridgeObject.ruleName === 'filemanagerObjectCreatedRule'
+          ),
+          lambdaFunction: props.lambdaObjects.find(
+            (lambdaObject) => lambdaObject.lambdaName === 'handleFilemanagerEvent'
+          )?.lambdaFunction,
+        });
+        break;
+      }
     }
   }
 }
@@ -1,18 +1,30 @@
 import { EventBridgeRuleObject } from '../event-rules/interfaces';
 import { IQueue } from 'aws-cdk-lib/aws-sqs';
+import { LambdaObject } from '../lambda/interfaces';
+import { IFunction } from 'aws-cdk-lib/aws-lambda';
 
 export type EventBridgeTargetsNameList =
   // Post Request to WES Lambda
-  'icav2WesPostRequestTargetToGenerateWesPostRequestSqsQueue';
+  | 'icav2WesPostRequestTargetToGenerateWesPostRequestSqsQueue'
+  // Filemanager object created to the filemanager event lambda
+  | 'filemanagerObjectCreatedTargetToHandleFilemanagerEventLambda';
 
 export const eventBridgeTargetsNameList: Array<EventBridgeTargetsNameList> = [
   // Post Request to WES Lambda
   'icav2WesPostRequestTargetToGenerateWesPostRequestSqsQueue',
+  // Filemanager object created to the filemanager event lambda
+  'filemanagerObjectCreatedTargetToHandleFilemanagerEventLambda',
 ];
 
 export interface EventBridgeTargetsProps {
   eventBridgeRuleObjects: EventBridgeRuleObject[];
   sqsQueues: IQueue[];
+  lambdaObjects: LambdaObject[];
+}
+
+export interface AddLambdaAsEventBridgeTargetProps {
+  lambdaFunction: IFunction;
+  eventBridgeRuleObj: EventBridgeRuleObject;
 }
 
 export interface AddSqsAsEventBridgeTargetProps {
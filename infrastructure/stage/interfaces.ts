@@ -12,6 +12,9 @@ export interface StatefulApplicationStackConfig extends cdk.StackProps {
   /* Extra tables */
   payloadsTableName: string;
   callbackTableName: string;
+  schedulerTableName: string;
+  cacheTableName: string;
+  statsTableName: string;
 
   /* Extra buckets */
   payloadsBucketName: string;
@@ -32,6 +35,9 @@ export interface StatefulApplicationStackConfig extends cdk.StackProps {
 
   /* External sqs name */
   icaExternalSqsQueueName: string;
+
+  /* Payload archive sqs name */
+  payloadArchiveSqsQueueName: string;
 }
 
 export interface StatelessApplicationStackConfig extends cdk.StackProps {
@@ -45,6 +51,9 @@ export interface StatelessApplicationStackConfig extends cdk.StackProps {
   /* Extra tables */
   payloadsTableName: string;
   callbackTableName: string;
+  schedulerTableName: string;
+  cacheTableName: string;
+  statsTableName: string;
 
   /* Extra buckets */
   payloadsBucketName: string;
@@ -56,10 +65,14 @@ export interface StatelessApplicationStackConfig extends cdk.StackProps {
   icav2WesRequestDetailType: string;
   icav2WesAnalysisStateChangeDetailType: string;
   eventSource: string;
+  filemanagerEventSource: string;
+  filemanagerObjectStateChangeDetailType: string;
+  filemanagerObjectCreatedEventType: string;
 
   /* External bucket stuff */
   testDataBucketName: string;
   referenceDataBucketName: string;
+  icav2ByobKeyPrefix: string;
 
   /* Internal event stuff */
   internalEventBusName: string;
@@ -67,6 +80,7 @@ export interface StatelessApplicationStackConfig extends cdk.StackProps {
   icav2WesManagerTagKey: string;
   icav2WesRequestSqsQueueName: string;
   icaExternalSqsQueueName: string;
+  payloadArchiveSqsQueueName: string;
 
   /* SSM - Secrets */
   hostedZoneSsmParameterName: string;
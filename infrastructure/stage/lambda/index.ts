@@ -7,8 +7,20 @@ import {
   lambdaToRequirementsMap,
 } from './interfaces';
 import {
+  DEFAULT_CORRUPTION_CHECK_RESULTS_TTL,
+  DEFAULT_MAX_CONCURRENT_CORRUPTION_CHECKS,
+  DEFAULT_MAX_CONCURRENT_ATTRIBUTE_PARTITIONS,
+  DEFAULT_MAX_CONCURRENT_WES_REQUEST_SUBMISSIONS,
   DEFAULT_MAX_ICA_STATE_CHANGE_API_CONCURRENCY,
   DEFAULT_MAX_ICAV2_WES_REQUEST_API_CONCURRENCY,
+  DEFAULT_PAYLOAD_ARCHIVE_BATCH_SIZE,
+  DEFAULT_PAYLOAD_ARCHIVE_MAX_BATCHING_WINDOW,
+  ENABLE_ASYNC_PAYLOAD_ARCHIVE,
+  DEFAULT_PIPELINE_METADATA_CACHE_TTL,
+  DEFAULT_WES_REQUEST_BATCH_SIZE,
+  DEFAULT_WES_REQUEST_MAX_BATCHING_WINDOW,
+  ENABLE_CONCURRENT_WES_REQUEST_SUBMISSION,
+  INGEST_ID_MANIFESTS_KEY_PREFIX,
   LAMBDA_DIR,
   STACK_PREFIX,
 } from '../constants';
@@ -50,9 +62,13 @@ function buildLambda(scope: Construct, props: BuildLambdaProps): LambdaObject {
     architecture: lambda.Architecture.ARM_64,
     index: lambdaNameToSnakeCase + '.py',
     handler: 'handler',
-    // We need a longer timeout for the launchIcav2AnalysisViaWrapica lambda
+    // We need a longer timeout for the launchIcav2AnalysisViaWrapica lambda,
+    // for the getCorruptedFileUris lambda, which checks a whole batch of files,
+    // and for the addPortalRunIdAttributes lambda, which crawls the whole output tree
     timeout:
-      props.lambdaName === 'launchIcav2AnalysisViaWrapica'
+      props.lambdaName === 'launchIcav2AnalysisViaWrapica' ||
+      props.lambdaName === 'getCorruptedFileUris' ||
+      props.lambdaName === 'addPortalRunIdAttributes'
         ? Duration.minutes(15)
         : Duration.seconds(60),
     // And if we have a lot of data to process, we need more memory
@@ -69,19 +85,97 @@ function buildLambda(scope: Construct, props: BuildLambdaProps): LambdaObject {
       : undefined,
   });
 
+  // Modules shared between the lambdas of this service
+  if (lambdaRequirements.needsIcav2WesManagerToolsLayer) {
+    lambdaFunction.addLayers(props.icav2WesManagerToolsLayer);
+  }
+
   // If the lambda has an SQS event source, we need to add this in
   // Generate Event Request uses the launch ICA Source Event Queue
   if (props.lambdaName === 'generateWesPostRequestFromEvent') {
+    // In concurrent mode, every record in the batch is submitted in parallel
+    // by a single durable execution, so we can take larger batches off the queue
+    lambdaFunction.addEnvironment(
+      'CONCURRENT_SUBMISSION_ENABLED',
+      String(ENABLE_CONCURRENT_WES_REQUEST_SUBMISSION)
+    );
+    lambdaFunction.addEnvironment(
+      'MAX_CONCURRENT_SUBMISSIONS',
+      String(DEFAULT_MAX_CONCURRENT_WES_REQUEST_SUBMISSIONS)
+    );
+
     // Find the SQS queue from the props
     lambdaFunction.currentVersion.addEventSource(
-      new SqsEventSource(props.generateWesPostRequestEventQueue, {
-        maxConcurrency: DEFAULT_MAX_ICAV2_WES_REQUEST_API_CONCURRENCY,
-        // Allow only one message per batch to be processed
-        batchSize: 1,
+      new SqsEventSource(
+        props.generateWesPostRequestEventQueue,
+        ENABLE_CONCURRENT_WES_REQUEST_SUBMISSION
+          ? {
+              maxConcurrency: DEFAULT_MAX_ICAV2_WES_REQUEST_API_CONCURRENCY,
+              batchSize: DEFAULT_WES_REQUEST_BATCH_SIZE,
+              maxBatchingWindow: DEFAULT_WES_REQUEST_MAX_BATCHING_WINDOW,
+              // Only retry the records that were invalid or failed to submit
+              reportBatchItemFailures: true,
+            }
+          : {
+              maxConcurrency: DEFAULT_MAX_ICAV2_WES_REQUEST_API_CONCURRENCY,
+              // Allow only one message per batch to be processed
+              batchSize: 1,
+              reportBatchItemFailures: true,
+            }
+      )
+    );
+  }
+
+  // The launch lambda hands the launch payload off to the archiver queue
+  if (props.lambdaName === 'launchIcav2AnalysisViaWrapica') {
+    lambdaFunction.addEnvironment(
+      'ASYNC_PAYLOAD_ARCHIVE_ENABLED',
+      String(ENABLE_ASYNC_PAYLOAD_ARCHIVE)
+    );
+    lambdaFunction.addEnvironment('PAYLOAD_ARCHIVE_QUEUE_URL', props.payloadArchiveQueue.queueUrl);
+    props.payloadArchiveQueue.grantSendMessages(lambdaFunction);
+  }
+
+  // The archiver takes batches of payloads off the archive queue
+  if (props.lambdaName === 'archiveAnalysisPayloads') {
+    lambdaFunction.currentVersion.addEventSource(
+      new SqsEventSource(props.payloadArchiveQueue, {
+        batchSize: DEFAULT_PAYLOAD_ARCHIVE_BATCH_SIZE,
+        maxBatchingWindow: DEFAULT_PAYLOAD_ARCHIVE_MAX_BATCHING_WINDOW,
+        // Only retry the payloads that failed
+        reportBatchItemFailures: true,
       })
     );
   }
 
+  // The batch corruption checker runs the checks in a thread pool
+  if (props.lambdaName === 'getCorruptedFileUris') {
+    lambdaFunction.addEnvironment(
+      'MAX_CONCURRENT_CORRUPTION_CHECKS',
+      String(DEFAULT_MAX_CONCURRENT_CORRUPTION_CHECKS)
+    );
+    lambdaFunction.addEnvironment(
+      'CORRUPTION_CHECK_RESULTS_TTL_SECONDS',
+      DEFAULT_CORRUPTION_CHECK_RESULTS_TTL.toSeconds().toString()
+    );
+  }
+
+  // The partitioned attributes mode crawls and patches the sub-prefixes in a thread pool
+  if (props.lambdaName === 'addPortalRunIdAttributes') {
+    lambdaFunction.addEnvironment(
+      'MAX_CONCURRENT_PARTITIONS',
+      String(DEFAULT_MAX_CONCURRENT_ATTRIBUTE_PARTITIONS)
+    );
+  }
+
+  // Large runs write their ingest ids to a manifest in the artefacts bucket
+  if (props.lambdaName === 'getOutputFileIngestIds') {
+    lambdaFunction.addEnvironment(
+      'S3_INGEST_ID_MANIFESTS_KEY_PREFIX',
+      INGEST_ID_MANIFESTS_KEY_PREFIX
+    );
+  }
+
   // ICA State change lambda
   if (props.lambdaName === 'handleIcaEvent') {
     // Add the step function
@@ -215,6 +309,26 @@ function buildLambda(scope: Construct, props: BuildLambdaProps): LambdaObject {
     lambdaFunction.addEnvironment('CALLBACK_DATABASE_NAME', props.callbackTable.tableName);
   }
 
+  if (lambdaRequirements.needsPayloadsDbPermissions) {
+    // Grant write permissions to record the archived payload uri
+    props.payloadsTable.grantReadWriteData(lambdaFunction);
+
+    // Add the PAYLOADS_TABLE_NAME environment variable
+    lambdaFunction.addEnvironment('PAYLOADS_TABLE_NAME', props.payloadsTable.tableName);
+  }
+
+  if (lambdaRequirements.needsCacheDbPermissions) {
+    // Grant read / write permissions to the shared cache table
+    props.cacheTable.grantReadWriteData(lambdaFunction);
+
+    // Add the CACHE_DATABASE_NAME environment variable
+    lambdaFunction.addEnvironment('CACHE_DATABASE_NAME', props.cacheTable.tableName);
+    lambdaFunction.addEnvironment(
+      'PIPELINE_METADATA_CACHE_TTL_SECONDS',
+      DEFAULT_PIPELINE_METADATA_CACHE_TTL.toSeconds().toString()
+    );
+  }
+
   /* Return the function */
   return {
     lambdaName: props.lambdaName,
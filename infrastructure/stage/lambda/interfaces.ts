@@ -2,6 +2,7 @@ import { PythonFunction } from '@aws-cdk/aws-lambda-python-alpha';
 import { IBucket } from 'aws-cdk-lib/aws-s3';
 import { IQueue } from 'aws-cdk-lib/aws-sqs';
 import { ITableV2 } from 'aws-cdk-lib/aws-dynamodb';
+import { ILayerVersion } from 'aws-cdk-lib/aws-lambda';
 import { SfnName } from '../step-functions/interfaces';
 
 export type LambdaName =
@@ -11,6 +12,7 @@ export type LambdaName =
   | 'generateWesPostRequestFromEvent'
   // Run analysis
   | 'launchIcav2AnalysisViaWrapica'
+  | 'archiveAnalysisPayloads'
   | 'unlockCallbackId'
   // Mid analysis
   | 'updateStatusOnWesApi'
@@ -24,6 +26,7 @@ export type LambdaName =
   // Handle Filemanager
   | 'addPortalRunIdAttributes'
   | 'filemanagerSync'
+  | 'handleFilemanagerEvent'
   // Handle task summaries
   | 'listTasksInAnalysis' // Not yet implemented
   | 'getAndRegisterAnalysisTasks' // Not yet implemented
@@ -31,9 +34,7 @@ export type LambdaName =
   // Handle corrupted files
   | 'getOutputFileIngestIds' // Not yet implemented
   | 'getMatchingIngestIds' // Not yet implemented
-  | 'isBamOrVcfFile' // Not yet implemented
-  | 'getFileUriFromIngestId' // Not yet implemented
-  | 'isFileCorrupted' // Not yet implemented
+  | 'getCorruptedFileUris'
   // Unlock callback id
   // Get Usage
   | 'collectNonPriceUsageMetrics' // Not yet implemented
@@ -50,6 +51,7 @@ export const lambdaNameList: Array<LambdaName> = [
   'generateWesPostRequestFromEvent',
   // Run analysis
   'launchIcav2AnalysisViaWrapica',
+  'archiveAnalysisPayloads',
   'unlockCallbackId',
   // Mid analysis
   'updateStatusOnWesApi',
@@ -63,6 +65,7 @@ export const lambdaNameList: Array<LambdaName> = [
   // Handle Filemanager
   'addPortalRunIdAttributes',
   'filemanagerSync',
+  'handleFilemanagerEvent',
   // Handle task summaries
   // 'listTasksInAnalysis', // Not yet implemented
   // 'getAndRegisterAnalysisTasks', // Not yet implemented
@@ -70,9 +73,7 @@ export const lambdaNameList: Array<LambdaName> = [
   // Handle corrupted files
   'getOutputFileIngestIds',
   'getMatchingIngestIds',
-  'isBamOrVcfFile',
-  'getFileUriFromIngestId',
-  'isFileCorrupted',
+  'getCorruptedFileUris',
   // Unlock callback id
   // Get Usage
   // 'collectNonPriceUsageMetrics',  // Not yet implemented
@@ -85,6 +86,7 @@ export const lambdaNameList: Array<LambdaName> = [
 export interface LambdaRequirementProps {
   needsIcav2ToolkitLayer?: boolean;
   needsOrcabusTookitLayer?: boolean;
+  needsIcav2WesManagerToolsLayer?: boolean;
   needsTestDataBucketPermissions?: boolean;
   needsReferenceDataBucketPermissions?: boolean;
   needsArtefactBucketPermissions?: boolean;
@@ -92,6 +94,8 @@ export interface LambdaRequirementProps {
   needsCallbackPermissions?: boolean;
   needsDurableExecutionPermissions?: boolean;
   needsCallbackDbPermissions?: boolean;
+  needsCacheDbPermissions?: boolean;
+  needsPayloadsDbPermissions?: boolean;
 }
 
 export type LambdaToRequirementsMapType = { [key in LambdaName]: LambdaRequirementProps };
@@ -113,9 +117,16 @@ export const lambdaToRequirementsMap: LambdaToRequirementsMapType = {
   launchIcav2AnalysisViaWrapica: {
     needsIcav2ToolkitLayer: true,
     needsOrcabusTookitLayer: true,
+    needsIcav2WesManagerToolsLayer: true,
     needsTestDataBucketPermissions: true,
     needsReferenceDataBucketPermissions: true,
     needsArtefactBucketPermissions: true,
+    needsCacheDbPermissions: true,
+  },
+  archiveAnalysisPayloads: {
+    needsArtefactBucketPermissions: true,
+    needsSqsEventSource: true,
+    needsPayloadsDbPermissions: true,
   },
   unlockCallbackId: {
     needsCallbackPermissions: true,
@@ -123,6 +134,7 @@ export const lambdaToRequirementsMap: LambdaToRequirementsMapType = {
   // Mid analysis
   updateStatusOnWesApi: {
     needsOrcabusTookitLayer: true,
+    needsIcav2WesManagerToolsLayer: true,
     needsArtefactBucketPermissions: true,
   },
   abortAnalysis: {
@@ -131,6 +143,7 @@ export const lambdaToRequirementsMap: LambdaToRequirementsMapType = {
   // ICA Event
   handleIcaEvent: {
     needsOrcabusTookitLayer: true,
+    needsIcav2WesManagerToolsLayer: true,
     needsSqsEventSource: true,
     needsDurableExecutionPermissions: true,
     needsCallbackDbPermissions: true,
@@ -140,6 +153,8 @@ export const lambdaToRequirementsMap: LambdaToRequirementsMapType = {
   getPipelineType: {
     needsOrcabusTookitLayer: true,
     needsIcav2ToolkitLayer: true,
+    needsIcav2WesManagerToolsLayer: true,
+    needsCacheDbPermissions: true,
   },
   copyNextflowFilesFromLogsUri: {
     needsIcav2ToolkitLayer: true,
@@ -147,10 +162,19 @@ export const lambdaToRequirementsMap: LambdaToRequirementsMapType = {
   // Handle Filemanager
   addPortalRunIdAttributes: {
     needsOrcabusTookitLayer: true,
+    needsIcav2ToolkitLayer: true,
+    needsIcav2WesManagerToolsLayer: true,
+    needsCacheDbPermissions: true,
   },
   filemanagerSync: {
     needsOrcabusTookitLayer: true,
     needsIcav2ToolkitLayer: true,
+    needsIcav2WesManagerToolsLayer: true,
+    needsCallbackDbPermissions: true,
+  },
+  handleFilemanagerEvent: {
+    needsIcav2WesManagerToolsLayer: true,
+    needsCallbackDbPermissions: true,
   },
   // Handle task summaries
   listTasksInAnalysis: {
@@ -165,18 +189,14 @@ export const lambdaToRequirementsMap: LambdaToRequirementsMapType = {
   // Handle corrupted files
   getOutputFileIngestIds: {
     needsOrcabusTookitLayer: true,
+    needsArtefactBucketPermissions: true,
   },
   getMatchingIngestIds: {
     needsOrcabusTookitLayer: true,
   },
-  isBamOrVcfFile: {
-    needsOrcabusTookitLayer: true,
-  },
-  getFileUriFromIngestId: {
-    needsOrcabusTookitLayer: true,
-  },
-  isFileCorrupted: {
+  getCorruptedFileUris: {
     needsOrcabusTookitLayer: true,
+    needsCacheDbPermissions: true,
   },
   // Unlock callback id
   // Get Usage
@@ -203,8 +223,12 @@ export interface BuildLambdaProps {
   errorLogsKeyPrefix: string;
   generateWesPostRequestEventQueue: IQueue;
   externalIcaEventQueue: IQueue;
+  payloadArchiveQueue: IQueue;
   callbackTable: ITableV2;
+  cacheTable: ITableV2;
+  payloadsTable: ITableV2;
   handleIcaStateChangeSfnName: SfnName;
+  icav2WesManagerToolsLayer: ILayerVersion;
 }
 
 export type BuildAllLambdasProps = Omit<BuildLambdaProps, 'lambdaName'>;
@@ -0,0 +1,14 @@
+import { PythonLayerVersion } from '@aws-cdk/aws-lambda-python-alpha';
+import * as lambda from 'aws-cdk-lib/aws-lambda';
+import { Construct } from 'constructs';
+import path from 'path';
+import { LAYERS_DIR } from '../constants';
+
+export function buildIcav2WesManagerToolsLayer(scope: Construct): PythonLayerVersion {
+  // Modules shared between the lambdas of this service, so there is a single copy of each
+  return new PythonLayerVersion(scope, 'icav2WesManagerToolsLayer', {
+    entry: path.join(LAYERS_DIR, 'icav2_wes_manager_tools_layer'),
+    compatibleRuntimes: [lambda.Runtime.PYTHON_3_14],
+    compatibleArchitectures: [lambda.Architecture.ARM_64],
+  });
+}
@@ -2,7 +2,12 @@ import * as s3 from 'aws-cdk-lib/aws-s3';
 import { Construct } from 'constructs';
 import { Bucket } from 'aws-cdk-lib/aws-s3';
 import { Duration } from 'aws-cdk-lib';
-import { ERROR_LOGS_KEY_PREFIX, PAYLOADS_KEY_PREFIX } from '../constants';
+import {
+  ANALYSIS_EXPORTS_KEY_PREFIX,
+  ERROR_LOGS_KEY_PREFIX,
+  INGEST_ID_MANIFESTS_KEY_PREFIX,
+  PAYLOADS_KEY_PREFIX,
+} from '../constants';
 
 function addPayloadsLifeCycleRuleToBucket(bucket: Bucket): void {
   bucket.addLifecycleRule({
@@ -22,6 +27,24 @@ function addErrorLogsLifeCycleRuleToBucket(bucket: Bucket): void {
   });
 }
 
+function addIngestIdManifestsLifeCycleRuleToBucket(bucket: Bucket): void {
+  bucket.addLifecycleRule({
+    id: 'DeleteIngestIdManifestsAfterOneWeek',
+    enabled: true,
+    expiration: Duration.days(7), // Only needed for the duration of the corrupted files check
+    prefix: INGEST_ID_MANIFESTS_KEY_PREFIX, // Apply to objects with the 'ingest-id-manifests/' prefix
+  });
+}
+
+function addAnalysisExportsLifeCycleRuleToBucket(bucket: Bucket): void {
+  bucket.addLifecycleRule({
+    id: 'DeleteAnalysisExportsAfterOneWeek',
+    enabled: true,
+    expiration: Duration.days(7), // Exports are shared as presigned urls, which expire well before this
+    prefix: ANALYSIS_EXPORTS_KEY_PREFIX, // Apply to objects with the 'analysis-exports/' prefix
+  });
+}
+
 function createS3Bucket(scope: Construct, bucketName: string): Bucket {
   // This is a placeholder function that simulates creating an S3 bucket.
   // In a real implementation, you would use the AWS SDK to create the bucket.
@@ -37,5 +60,7 @@ export function createArtefactsBucket(scope: Construct, bucketName: string): Buc
   // Add lifecycle rules to the bucket
   addPayloadsLifeCycleRuleToBucket(s3Bucket);
   addErrorLogsLifeCycleRuleToBucket(s3Bucket);
+  addIngestIdManifestsLifeCycleRuleToBucket(s3Bucket);
+  addAnalysisExportsLifeCycleRuleToBucket(s3Bucket);
   return s3Bucket;
 }
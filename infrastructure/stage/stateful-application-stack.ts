@@ -19,6 +19,7 @@ import { StatefulApplicationStackConfig } from './interfaces';
 import {
   DEFAULT_ICA_AWS_ACCOUNT_NUMBER,
   DEFAULT_ICA_STATE_CHANGE_MAX_TIMEOUT,
+  DEFAULT_PAYLOAD_ARCHIVE_QUEUE_TIMEOUT,
   DEFAULT_WES_REQUEST_QUEUE_TIMEOUT,
 } from './constants';
 import {
@@ -26,7 +27,14 @@ import {
   createMonitoredQueue,
   getTopicArnFromTopicName,
 } from './sqs';
-import { buildCallbackTable, buildICAv2WesDb, buildPayloadsTable } from './dynamodb';
+import {
+  buildCacheTable,
+  buildStatsTable,
+  buildCallbackTable,
+  buildICAv2WesDb,
+  buildPayloadsTable,
+  buildSchedulerTable,
+} from './dynamodb';
 import { createArtefactsBucket } from './s3';
 import { buildSchemas } from './event-schemas';
 import { Topic } from 'aws-cdk-lib/aws-sns';
@@ -88,6 +96,15 @@ export class StatefulApplicationStack extends GitStack {
       dlqMessageThreshold: 1,
     });
 
+    // Buffer to archive analysis launch payloads off the launch critical path
+    createMonitoredQueue(this, {
+      dlqMessageThreshold: 1,
+      queueName: props.payloadArchiveSqsQueueName,
+      queueVizTimeout: DEFAULT_PAYLOAD_ARCHIVE_QUEUE_TIMEOUT,
+      slackTopic: slackTopic,
+      receiveMessageWaitTime: Duration.seconds(20),
+    });
+
     // Build the ICAv2 WES database
     buildICAv2WesDb(this, {
       tableName: props.wesTableName,
@@ -103,6 +120,18 @@ export class StatefulApplicationStack extends GitStack {
       tableName: props.callbackTableName,
     });
 
+    buildSchedulerTable(this, {
+      tableName: props.schedulerTableName,
+    });
+
+    buildCacheTable(this, {
+      tableName: props.cacheTableName,
+    });
+
+    buildStatsTable(this, {
+      tableName: props.statsTableName,
+    });
+
     // Extra buckets
     createArtefactsBucket(this, props.payloadsBucketName);
 
@@ -24,8 +24,11 @@ import {
   buildApiGateway,
   buildApiIntegration,
   buildApiInterfaceLambda,
+  buildSchedulerLambda,
+  buildStatsReconcilerLambda,
 } from './api';
 import { buildAllEcsFargateTasks } from './ecs';
+import { buildIcav2WesManagerToolsLayer } from './layers';
 import { GitStack } from '@orcabus/platform-cdk-constructs/deployment-stack-pipeline';
 
 export type StatelessApplicationStackProps = StatelessApplicationStackConfig & cdk.StackProps;
@@ -51,6 +54,21 @@ export class StatelessApplicationStack extends GitStack {
       props.callbackTableName,
       props.callbackTableName
     );
+    const schedulerTable = dynamodb.TableV2.fromTableName(
+      this,
+      props.schedulerTableName,
+      props.schedulerTableName
+    );
+    const cacheTable = dynamodb.TableV2.fromTableName(
+      this,
+      props.cacheTableName,
+      props.cacheTableName
+    );
+    const statsTable = dynamodb.TableV2.fromTableName(
+      this,
+      props.statsTableName,
+      props.statsTableName
+    );
 
     // Extra buckets
     const payloadsBucket = s3.Bucket.fromBucketName(
@@ -112,6 +130,15 @@ export class StatelessApplicationStack extends GitStack {
       `arn:aws:sqs:${cdk.Aws.REGION}:${cdk.Aws.ACCOUNT_ID}:${props.icaExternalSqsQueueName}`
     );
 
+    const payloadArchiveSqsQueue: IQueue = sqs.Queue.fromQueueArn(
+      this,
+      props.payloadArchiveSqsQueueName,
+      `arn:aws:sqs:${cdk.Aws.REGION}:${cdk.Aws.ACCOUNT_ID}:${props.payloadArchiveSqsQueueName}`
+    );
+
+    // Build the shared modules layer
+    const icav2WesManagerToolsLayer = buildIcav2WesManagerToolsLayer(this);
+
     // Build the lambdas
     const lambdaObjects = buildAllLambdas(this, {
       artefactsBucket: payloadsBucket,
@@ -121,8 +148,12 @@ export class StatelessApplicationStack extends GitStack {
       testDataBucket: testDataBucket,
       generateWesPostRequestEventQueue: icav2WesRequestSqsQueue,
       externalIcaEventQueue: icaExternalSqsQueue,
+      payloadArchiveQueue: payloadArchiveSqsQueue,
       handleIcaStateChangeSfnName: 'handleIcav2AnalysisStateChange',
       callbackTable: callbackTable,
+      cacheTable: cacheTable,
+      payloadsTable: payloadsTable,
+      icav2WesManagerToolsLayer: icav2WesManagerToolsLayer,
     });
 
     // Build the ecs tasks
@@ -139,6 +170,7 @@ export class StatelessApplicationStack extends GitStack {
       eventSource: props.eventSource,
       payloadsTable: payloadsTable,
       callbackTable: callbackTable,
+      artefactsBucket: payloadsBucket,
       icaExternalSqsQueue: icaExternalSqsQueue,
     });
 
@@ -152,22 +184,32 @@ export class StatelessApplicationStack extends GitStack {
       icav2AnalysisStateChangeEventCode: props.icav2AnalysisStateChangeEventCode,
       icav2WesManagerTagKey: props.icav2WesManagerTagKey,
       icav2WesRequestDetailType: props.icav2WesRequestDetailType,
+      filemanagerEventSource: props.filemanagerEventSource,
+      filemanagerObjectStateChangeDetailType: props.filemanagerObjectStateChangeDetailType,
+      filemanagerObjectCreatedEventType: props.filemanagerObjectCreatedEventType,
+      icav2ByobKeyPrefix: props.icav2ByobKeyPrefix,
     });
 
     // Add the event-bridge rules
     buildAllEventBridgeTargets({
       eventBridgeRuleObjects: eventBridgeRuleObjects,
       sqsQueues: [icav2WesRequestSqsQueue],
+      lambdaObjects: lambdaObjects,
     });
 
     // Build the API interface lambda
-    const lambdaApi = buildApiInterfaceLambda(this, {
-      /* Lambda props */
-      lambdaName: 'icav2WesApiInterface',
-
+    const lambdaApiProps = {
       /* Table props */
       table: dynamodbTable,
       tableIndexNames: props.indexNames,
+      schedulerTable: schedulerTable,
+      statsTable: statsTable,
+
+      /* Bucket for exports */
+      artefactsBucket: payloadsBucket,
+
+      /* Shared modules layer */
+      icav2WesManagerToolsLayer: icav2WesManagerToolsLayer,
 
       /* Step functions triggered by the API */
       stepFunctions: stepFunctionObjects.filter((stepFunctionObject) =>
@@ -181,6 +223,22 @@ export class StatelessApplicationStack extends GitStack {
 
       /* SSM and Secrets */
       hostedZoneSsmParameter: hostedZoneSsmParameterObj,
+    };
+    const lambdaApi = buildApiInterfaceLambda(this, {
+      lambdaName: 'icav2WesApiInterface',
+      ...lambdaApiProps,
+    });
+
+    // Build the scheduler lambda, releases pending analyses when there is capacity
+    buildSchedulerLambda(this, {
+      lambdaName: 'icav2WesLaunchScheduler',
+      ...lambdaApiProps,
+    });
+
+    // Build the stats reconciler lambda, rebuilds the status counters behind the stats endpoint
+    buildStatsReconcilerLambda(this, {
+      lambdaName: 'icav2WesStatsReconciler',
+      ...lambdaApiProps,
     });
 
     // Build the API Gateway
@@ -139,6 +139,21 @@ function wireUpStateMachinePermissions(scope: Construct, props: SfnObjectProps):
     props.callbackTable.grantReadWriteData(props.stateMachineObj);
   }
 
+  if (sfnRequirements.needsArtefactBucketReadPermissions) {
+    props.artefactsBucket.grantRead(props.stateMachineObj);
+
+    NagSuppressions.addResourceSuppressions(
+      props.stateMachineObj,
+      [
+        {
+          id: 'AwsSolutions-IAM5',
+          reason: 'Read-only access to the objects in the artefacts bucket',
+        },
+      ],
+      true
+    );
+  }
+
   if (sfnRequirements.needsSetVisibilityTimeoutPermissions) {
     props.stateMachineObj.addToRolePolicy(
       new iam.PolicyStatement({
@@ -259,6 +274,17 @@ function wireUpStateMachinePermissions(scope: Construct, props: SfnObjectProps):
     );
   }
 
+  /* The handle filemanager step function waits on a task token for the filemanager sync */
+  /* Both the filemanager sync lambda and the filemanager event lambda may resume it */
+  if (props.stateMachineName === 'handleFilemanager') {
+    const filemanagerSyncLambdaObjects = props.lambdaFunctions.filter((lambdaObject) =>
+      ['filemanagerSync', 'handleFilemanagerEvent'].includes(lambdaObject.lambdaName)
+    );
+    for (const lambdaObject of filemanagerSyncLambdaObjects) {
+      props.stateMachineObj.grantTaskResponse(lambdaObject.lambdaFunction);
+    }
+  }
+
   /*
   Handle ICAv2 Analysis State Change also requires permissions to launch other objects
    */
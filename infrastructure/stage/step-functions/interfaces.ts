@@ -4,6 +4,7 @@ import { LambdaName, LambdaObject } from '../lambda/interfaces';
 import { ITableV2 } from 'aws-cdk-lib/aws-dynamodb';
 import { EcsTaskName, EcsTaskObject } from '../ecs/interfaces';
 import { IQueue } from 'aws-cdk-lib/aws-sqs';
+import { IBucket } from 'aws-cdk-lib/aws-s3';
 
 export type SfnName =
   | 'abortIcav2Analysis'
@@ -39,6 +40,8 @@ export interface BuildSfnsProps {
   eventSource: string;
   payloadsTable: ITableV2;
   callbackTable: ITableV2;
+  /* S3 Stuff */
+  artefactsBucket: IBucket;
   /* SQS Stuff */
   icaExternalSqsQueue: IQueue;
 }
@@ -62,9 +65,7 @@ export const stepFunctionToLambdaMap: { [key in SfnName]: Array<LambdaName> } =
     'filemanagerSync',
     'getMatchingIngestIds',
     'getOutputFileIngestIds',
-    'getFileUriFromIngestId',
-    'isBamOrVcfFile',
-    'isFileCorrupted',
+    'getCorruptedFileUris',
     'unlockCallbackId',
   ],
   launchIcav2Analysis: [
@@ -88,9 +89,7 @@ export const stepFunctionToLambdaMap: { [key in SfnName]: Array<LambdaName> } =
     'getIcav2WesObject',
     'getOutputFileIngestIds',
     'getMatchingIngestIds',
-    'isBamOrVcfFile',
-    'getFileUriFromIngestId',
-    'isFileCorrupted',
+    'getCorruptedFileUris',
   ],
   handleFilemanager: ['getIcav2WesObject', 'addPortalRunIdAttributes', 'filemanagerSync'],
   handleNextflowFiles: ['getIcav2WesObject', 'getPipelineType', 'copyNextflowFilesFromLogsUri'],
@@ -119,6 +118,7 @@ export interface SfnRequirementsProps {
   needsPayloadDbPermissions?: boolean;
   needsCallbackTablePermissions?: boolean;
   needsDistributedMapSupport?: boolean;
+  needsArtefactBucketReadPermissions?: boolean;
   needsEcsPermissions?: boolean;
   needsSetVisibilityTimeoutPermissions?: boolean;
   needsNestedSfnStartExecutionPermissions?: boolean;
@@ -146,6 +146,8 @@ export const sfnToRequirementsMap: SfnToRequirementsMapType = {
   getUsage: {}, // Just some lambdas
   handleCorruptedFiles: {
     needsDistributedMapSupport: true,
+    // The distributed map reads the ingest id manifest from the artefacts bucket
+    needsArtefactBucketReadPermissions: true,
     needsEcsPermissions: true,
   },
   handleFilemanager: {}, // Just some lambdas